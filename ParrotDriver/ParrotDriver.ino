@@ -35,6 +35,12 @@ const int HEAD_ROTATION_CENTER = 1500; // Center position
 const float HEAD_ROTATION_MIN_POS = 0.2;  // Don't go below 20%
 const float HEAD_ROTATION_MAX_POS = 0.8;  // Don't go above 80%
 
+// Pulse range head rotation really covers (the position limits applied to the
+// safety limits). Bottango registers the same range, so a handover between
+// direct control and gestures never snaps the head.
+const int HEAD_ROTATION_RANGE_MIN = 1140;  // 900 + 0.2 * 1200
+const int HEAD_ROTATION_RANGE_MAX = 1860;  // 900 + 0.8 * 1200
+
 // I2S Speaker pins - Updated for new ESP32-S3 wiring
 const int I2S_BCLK = 42;           // Was GPIO18
 const int I2S_LRC = 41;            // Was GPIO19
@@ -110,6 +116,15 @@ bool is_speaking = false;
 // Add a timestamp for animation updates
 unsigned long last_animation_update = 0;
 
+// Server gestures - Bottango drives the servos until the gesture ends
+unsigned long gesture_active_until = 0;
+bool bottango_driving = false;
+// Last pulse widths written by direct control, so Bottango takes over without a jump
+int mouth_pwm = 1700;
+int wing_pwm = 2000;
+int head_tilt_pwm = 1760;
+int head_rotation_pwm = 1500;
+
 // LED timing variables
 unsigned long mic_led_timer = 0;
 unsigned long speaker_led_timer = 0;
@@ -118,6 +133,23 @@ unsigned long speaker_led_timer = 0;
 uint8_t* stereo_audio_buffer = nullptr;
 const size_t STEREO_BUFFER_SIZE = 8192;  // Large enough for max audio chunks
 
+// Speaker queue - incoming audio is queued here and drained into I2S without
+// blocking, so the main loop keeps animating while audio plays. The queue
+// depth is reported to the server ("buffer:<bytes>") so it can pace sends.
+uint8_t* speaker_ring = nullptr;
+const size_t SPEAKER_RING_SIZE = 48000;  // 1 second of 24kHz mono PCM16
+size_t speaker_ring_head = 0;  // Next write position
+size_t speaker_ring_tail = 0;  // Next read position
+size_t speaker_ring_used = 0;
+size_t stereo_pending = 0;     // Converted stereo bytes waiting for I2S
+size_t stereo_offset = 0;      // Stereo bytes already written to I2S
+const size_t SPEAKER_MAX_CHUNK = 512;
+uint8_t speaker_chunk[SPEAKER_MAX_CHUNK];  // Whole samples copied out of the ring, across its wrap
+const unsigned long BUFFER_REPORT_INTERVAL = 50;  // ms between depth reports while playing
+const unsigned long LOOP_STALL_MS = 50;  // Loop iterations slower than this are reported on serial
+unsigned long last_buffer_report = 0;
+bool speaker_report_pending = false;  // Send one final report once the queue empties
+
 
 // Add I2S configuration functions
 void configureI2S() {
@@ -244,75 +276,109 @@ void audioWebSocketEvent(WStype_t type, uint8_t * payload, size_t length) {
             // Handle text messages (like ping from server)
             if (length > 0 && strncmp((char*)payload, "ping", 4) == 0) {
                 audioWebSocket.sendTXT("pong");
+            } else if (length > 0 && strncmp((char*)payload, "gesture,", 8) == 0) {
+                handleGestureBatch((char*)payload, length);
             }
             break;
             
         case WStype_BIN:
             if (isConfigured) {
-                // Simple flow control - if we're behind, send a status message
-                static unsigned long last_status_send = 0;
-                if (millis() - last_status_send > 100) {  // Send status every 100ms max
-                    audioWebSocket.sendTXT("buffer_ok");
-                    last_status_send = millis();
-                }
+                // Queue the audio; drainSpeakerBuffer() plays it from the main loop
+                enqueueSpeakerAudio(payload, length);
+                reportSpeakerBuffer();
                 
                 // Extend speaker LED timer instead of turning on immediately
                 speaker_led_timer = millis() + 500;  // Keep LED on for 500ms after last audio
                 digitalWrite(LED_SPEAKER, HIGH);  // Turn on speaker LED
-                
-                const size_t MAX_CHUNK = 512;
-                size_t processed = 0;
-                
-                while (processed < length) {
-                    is_speaking = true;
-                    size_t chunk_size = min(MAX_CHUNK, length - processed);
-                    
-                    // Calculate animation for this chunk
-                    calculateAnimationPositions(payload + processed, chunk_size);
-                    
-                    // Keep extending the LED timer as audio plays
-                    speaker_led_timer = millis() + 500;
-                    
-                    // Create stereo buffer using pre-allocated memory
-                    size_t stereo_length = chunk_size * 2;
-                    
-                    // Safety check - make sure we don't exceed buffer size
-                    if (stereo_length <= STEREO_BUFFER_SIZE && stereo_audio_buffer) {
-                        // Duplicate mono data to both channels with 2x volume gain
-                        for (size_t i = 0; i < chunk_size; i += 2) {
-                            // Apply 2x gain and clamp to prevent distortion
-                            int16_t sample_left = ((int16_t*)payload)[processed/2 + i/2] * 2;
-                            int16_t sample_right = sample_left;  // Mono to stereo
-                            
-                            // Clamp to 16-bit range to prevent overflow distortion
-                            sample_left = constrain(sample_left, -32768, 32767);
-                            sample_right = constrain(sample_right, -32768, 32767);
-                            
-                            // Copy amplified sample to left channel
-                            stereo_audio_buffer[i*2] = sample_left & 0xFF;
-                            stereo_audio_buffer[i*2 + 1] = (sample_left >> 8) & 0xFF;
-                            // Copy same amplified sample to right channel
-                            stereo_audio_buffer[i*2 + 2] = sample_right & 0xFF;
-                            stereo_audio_buffer[i*2 + 3] = (sample_right >> 8) & 0xFF;
-                        }
-                        
-                        // Direct I2S write
-                        size_t bytes_written = 0;
-                        i2s_write(I2S_PORT, stereo_audio_buffer, stereo_length, &bytes_written, portMAX_DELAY);
-                    }
-                    
-                    processed += chunk_size;
-                    if (processed < length) {
-                        delay(1);
-                    }
-                }
-                is_speaking = false;
-                // Don't turn off LED immediately - let the timer handle it
             }
             break;
     }
 }
 
+size_t speakerQueuedBytes() {
+    // Mono bytes still to be played, including the converted chunk in flight. A lone
+    // odd byte is half a sample waiting for the rest, not audio that will play.
+    return (speaker_ring_used & ~((size_t)1)) + (stereo_pending - stereo_offset) / 2;
+}
+
+void enqueueSpeakerAudio(uint8_t* data, size_t length) {
+    if (!speaker_ring) return;
+    
+    size_t space = SPEAKER_RING_SIZE - speaker_ring_used;
+    if (length > space) {
+        // Server pacing should prevent this; drop the overflow rather than block
+        Serial.println("Speaker queue overflow, dropped " + String(length - space) + " bytes");
+        length = space;
+    }
+    
+    size_t first = min(length, SPEAKER_RING_SIZE - speaker_ring_head);
+    memcpy(speaker_ring + speaker_ring_head, data, first);
+    memcpy(speaker_ring, data + first, length - first);
+    speaker_ring_head = (speaker_ring_head + length) % SPEAKER_RING_SIZE;
+    speaker_ring_used += length;
+}
+
+void reportSpeakerBuffer() {
+    if (millis() - last_buffer_report < BUFFER_REPORT_INTERVAL) return;
+    audioWebSocket.sendTXT("buffer:" + String(speakerQueuedBytes()));
+    last_buffer_report = millis();
+    speaker_report_pending = speakerQueuedBytes() > 0;
+}
+
+void drainSpeakerBuffer() {
+    while (true) {
+        if (stereo_offset >= stereo_pending) {
+            // Take the next whole mono samples; an odd trailing byte stays queued for its other half
+            size_t chunk_size = min(SPEAKER_MAX_CHUNK, speaker_ring_used) & ~((size_t)1);
+            if (chunk_size == 0) break;
+            size_t first = min(chunk_size, SPEAKER_RING_SIZE - speaker_ring_tail);
+            memcpy(speaker_chunk, speaker_ring + speaker_ring_tail, first);
+            memcpy(speaker_chunk + first, speaker_ring, chunk_size - first);
+            uint8_t* chunk = speaker_chunk;
+            is_speaking = true;
+            
+            // Calculate animation for this chunk
+            calculateAnimationPositions(chunk, chunk_size);
+            
+            // Keep extending the LED timer as audio plays
+            speaker_led_timer = millis() + 500;
+            
+            // Duplicate mono data to both channels with 2x volume gain
+            for (size_t i = 0; i < chunk_size; i += 2) {
+                // Apply 2x gain and clamp to prevent distortion
+                int32_t amplified = (int32_t)((int16_t*)chunk)[i/2] * 2;
+                int16_t sample = (int16_t)constrain(amplified, -32768, 32767);
+                
+                // Copy amplified sample to left and right channels
+                stereo_audio_buffer[i*2] = sample & 0xFF;
+                stereo_audio_buffer[i*2 + 1] = (sample >> 8) & 0xFF;
+                stereo_audio_buffer[i*2 + 2] = sample & 0xFF;
+                stereo_audio_buffer[i*2 + 3] = (sample >> 8) & 0xFF;
+            }
+            stereo_pending = chunk_size * 2;
+            stereo_offset = 0;
+            
+            speaker_ring_tail = (speaker_ring_tail + chunk_size) % SPEAKER_RING_SIZE;
+            speaker_ring_used -= chunk_size;
+        }
+        
+        // Non-blocking I2S write - whatever doesn't fit waits for the next loop
+        size_t bytes_written = 0;
+        i2s_write(I2S_PORT, stereo_audio_buffer + stereo_offset, stereo_pending - stereo_offset, &bytes_written, 0);
+        stereo_offset += bytes_written;
+        if (bytes_written == 0) break;
+    }
+    
+    if (speaker_ring_used < 2 && stereo_offset >= stereo_pending) {
+        is_speaking = false;
+    }
+    
+    // Keep the server informed while playing, plus once more when the queue empties
+    if (audioWebSocket.isConnected() && (speakerQueuedBytes() > 0 || speaker_report_pending)) {
+        reportSpeakerBuffer();
+    }
+}
+
 void micWebSocketEvent(WStype_t type, uint8_t * payload, size_t length) {
     switch(type) {
         case WStype_CONNECTED:
@@ -378,6 +444,72 @@ void testServos() {
     Serial.println("=== SERVO TEST COMPLETE ===\n");
 }
 
+void sendBottangoCommand(String cmd) {
+    // Add hash for Bottango
+    int hash = 0;
+    for (int i = 0; i < cmd.length(); i++) {
+        hash += cmd.charAt(i);
+    }
+    cmd += ",h" + String(hash);
+    char cmdBuffer[MAX_COMMAND_LENGTH];  // Safe buffer for command processing
+    cmd.toCharArray(cmdBuffer, sizeof(cmdBuffer));
+    BottangoCore::processWebSocketCommand(cmdBuffer);
+}
+
+void handoverToBottango() {
+    if (bottango_driving) return;
+    
+    // Release the pins from direct control and re-register the Bottango
+    // servos starting where direct control left them
+    if (servosAttached) {
+        mouthServo.detach();
+        headTiltServo.detach();
+        headRotationServo.detach();
+        wingServo.detach();
+        servosAttached = false;
+    }
+    BottangoCore::effectorPool.deregisterAll();
+    sendBottangoCommand("rSVPin," + String(HEAD_TILT_PIN) + ",850,2100,3000," + String(head_tilt_pwm));
+    sendBottangoCommand("rSVPin," + String(MOUTH_PIN) + ",1450,1700,3000," + String(mouth_pwm));
+    sendBottangoCommand("rSVPin," + String(WING_PIN) + ",1500,2000,3000," + String(wing_pwm));
+    sendBottangoCommand("rSVPin," + String(HEAD_ROTATION_PIN) + "," + String(HEAD_ROTATION_RANGE_MIN) + "," +
+                        String(HEAD_ROTATION_RANGE_MAX) + ",5000," + String(head_rotation_pwm));
+    bottango_driving = true;
+}
+
+void releaseFromBottango() {
+    if (!bottango_driving) return;
+    BottangoCore::effectorPool.deregisterAll();  // Detaches the Bottango servos
+    bottango_driving = false;
+    attachServosForControl();
+}
+
+// A gesture batch is one text frame of newline-separated lines:
+//   gesture,<duration ms>
+//   <hashed Bottango command>   (xC, tSYN, sC, ...)
+void handleGestureBatch(char* payload, size_t length) {
+    char line[MAX_COMMAND_LENGTH];
+    size_t start = 0;
+    
+    while (start < length) {
+        size_t end = start;
+        while (end < length && payload[end] != '\n') end++;
+        
+        size_t line_length = min(end - start, (size_t)(MAX_COMMAND_LENGTH - 1));
+        memcpy(line, payload + start, line_length);
+        line[line_length] = '\0';
+        
+        if (strncmp(line, "gesture,", 8) == 0) {
+            unsigned long until = millis() + atol(line + 8);
+            if (until > gesture_active_until) gesture_active_until = until;
+            handoverToBottango();
+        } else if (line_length > 0) {
+            BottangoCore::processWebSocketCommand(line);
+        }
+        start = end + 1;
+    }
+}
+
 void initializeServos() {
     // Test servos first
     testServos();
@@ -390,7 +522,8 @@ void initializeServos() {
         "rSVPin," + String(HEAD_TILT_PIN) + ",850,2100,3000,1760",   // Head tilt
         "rSVPin," + String(MOUTH_PIN) + ",1450,1700,3000,1700",      // Mouth
         "rSVPin," + String(WING_PIN) + ",1500,2000,3000,2000",       // Wing
-        "rSVPin," + String(HEAD_ROTATION_PIN) + ",1275,1725,5000,1500"  // Head rotation
+        "rSVPin," + String(HEAD_ROTATION_PIN) + "," + String(HEAD_ROTATION_RANGE_MIN) + "," +
+            String(HEAD_ROTATION_RANGE_MAX) + ",5000,1500"  // Head rotation
     };
     
     char cmdBuffer[MAX_COMMAND_LENGTH];  // Safe buffer for command processing
@@ -547,6 +680,12 @@ void animation_loop() {
     
     last_animation_update = current_time;
     
+    // Server gestures own the servos until they finish
+    if (bottango_driving) {
+        if (millis() < gesture_active_until) return;
+        releaseFromBottango();
+    }
+    
     // Attach servos for direct control
     attachServosForControl();
     
@@ -567,9 +706,12 @@ void animation_loop() {
     
     // DIRECT SERVO CONTROL - bypass Bottango
     // Map positions (0.0-1.0) to PWM values and write directly
-    mouthServo.writeMicroseconds(1450 + (int)(mouth_next_position * 250));  // 1450-1700
-    wingServo.writeMicroseconds(1500 + (int)(wing_next_position * 500));     // 1500-2000  
-    headTiltServo.writeMicroseconds(850 + (int)(head_tilt_next_position * 1250)); // 850-2100
+    mouth_pwm = 1450 + (int)(mouth_next_position * 250);  // 1450-1700
+    wing_pwm = 1500 + (int)(wing_next_position * 500);     // 1500-2000  
+    head_tilt_pwm = 850 + (int)(head_tilt_next_position * 1250); // 850-2100
+    mouthServo.writeMicroseconds(mouth_pwm);
+    wingServo.writeMicroseconds(wing_pwm);
+    headTiltServo.writeMicroseconds(head_tilt_pwm);
     
     // Head rotation with safety limits
     // First constrain the position to safe range
@@ -582,6 +724,7 @@ void animation_loop() {
     // Final safety check
     rotationPWM = constrain(rotationPWM, HEAD_ROTATION_MIN, HEAD_ROTATION_MAX);
     headRotationServo.writeMicroseconds(rotationPWM);
+    head_rotation_pwm = constrain(rotationPWM, HEAD_ROTATION_RANGE_MIN, HEAD_ROTATION_RANGE_MAX);  // Bottango's registered range
     
     return; // Skip the Bottango command sending below
     char cmdBuffer[MAX_COMMAND_LENGTH];
@@ -737,6 +880,14 @@ void setup() {
         Serial.println("Stereo audio buffer allocated: " + String(STEREO_BUFFER_SIZE) + " bytes");
     }
     
+    // Allocate speaker queue
+    speaker_ring = (uint8_t*)malloc(SPEAKER_RING_SIZE);
+    if (!speaker_ring) {
+        Serial.println("ERROR: Failed to allocate speaker queue!");
+        delay(5000);
+        ESP.restart();
+    }
+    
     
     // Initialize Bottango
     BottangoCore::bottangoSetup();
@@ -781,6 +932,7 @@ void checkWiFiConnection() {
 }
 
 void loop() {
+    unsigned long loop_start = millis();
     checkWiFiConnection();
     
     // Handle all WebSocket connections
@@ -799,6 +951,11 @@ void loop() {
         speaker_led_timer = 0;
     }
     
+    // Feed queued speaker audio to I2S without blocking
+    unsigned long drain_start = millis();
+    drainSpeakerBuffer();
+    unsigned long drain_ms = millis() - drain_start;
+    
     // Process Bottango commands
     BottangoCore::bottangoLoop();
     
@@ -895,5 +1052,11 @@ void loop() {
         BottangoCore::effectorPool.updateAllDriveTargets();
     }
     
+    // Report slow iterations for the server's serial telemetry
+    unsigned long loop_ms = millis() - loop_start;
+    if (loop_ms >= LOOP_STALL_MS) {
+        Serial.println("Loop stall: " + String(loop_ms) + " ms (speaker drain " + String(drain_ms) + " ms)");
+    }
+    
     delay(2);
 }
@@ -6,7 +6,7 @@
 #include "Time.h"
 #include "../BottangoArduinoCallbacks.h"
 
-#define MAX_NUM_CURVES 3
+#define MAX_NUM_CURVES 8 // Raised from 3 so a server gesture batch can hold several segments per servo
 
 class AbstractEffector
 {
@@ -0,0 +1,87 @@
+"""Capacity-aware admission of new parrots, and the load behind readiness probes"""
+
+from dataclasses import dataclass, asdict
+from typing import Optional, Tuple
+
+# Close code for a refused device (RFC 6455 "Try Again Later")
+TRY_AGAIN_LATER = 1013
+
+
+@dataclass
+class LoadSample:
+    """What the server is carrying right now"""
+    devices: int             # Distinct parrots connected
+    loop_lag_ms: Optional[float]  # Worst recent event-loop lag (None when not measured)
+    upstream_sessions: int   # Open realtime sessions (shared one plus any duet voices)
+    queued_ms: float         # Deepest backlog of unsent speaker audio
+
+
+class AdmissionController:
+    """Admits new devices only while every measured load stays inside its budget
+
+    A device already connected on one port is always admitted on the other,
+    so a parrot is never left with a mic but no speaker. Spare capacity is the
+    headroom on the tightest budget (0.0 = full, 1.0 = idle), which a fleet
+    can use to steer parrots to the least loaded instance.
+    """
+
+    def __init__(self, max_devices: int = 8, max_loop_lag_ms: float = 50.0,
+                 max_upstream_sessions: int = 4, max_queued_ms: float = 1000.0,
+                 redirect_url: str = ""):
+        self.max_devices = max_devices
+        self.max_loop_lag_ms = max_loop_lag_ms
+        self.max_upstream_sessions = max_upstream_sessions
+        self.max_queued_ms = max_queued_ms
+        self.redirect_url = redirect_url  # Where refused devices are pointed, if anywhere
+
+        # Metrics
+        self.admitted = 0
+        self.rejected = {}  # reason -> count
+
+    def overloaded(self, load: LoadSample) -> Optional[str]:
+        """The first budget a new device would break, or None"""
+        if load.devices >= self.max_devices:
+            return "devices"
+        if load.loop_lag_ms is not None and load.loop_lag_ms > self.max_loop_lag_ms:
+            return "loop_lag"
+        if load.upstream_sessions > self.max_upstream_sessions:
+            return "upstream_sessions"
+        if load.queued_ms > self.max_queued_ms:
+            return "speaker_queue"
+        return None
+
+    def admit(self, known_device: bool, load: LoadSample) -> Tuple[bool, str]:
+        """Decide on a new connection; returns (admitted, close reason)"""
+        reason = None if known_device else self.overloaded(load)
+        if reason is None:
+            self.admitted += 1
+            return True, ""
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        if self.redirect_url:
+            return False, f"redirect {self.redirect_url}"
+        return False, f"overloaded: {reason}"
+
+    def spare_capacity(self, load: LoadSample) -> float:
+        if self.overloaded(load):
+            return 0.0  # Also covers budgets set to 0, which have no headroom to divide
+        headroom = [
+            1.0 - load.devices / max(self.max_devices, 1),
+            1.0 - load.upstream_sessions / max(self.max_upstream_sessions, 1),
+            1.0 - load.queued_ms / max(self.max_queued_ms, 1e-9)
+        ]
+        if load.loop_lag_ms is not None:
+            headroom.append(1.0 - load.loop_lag_ms / max(self.max_loop_lag_ms, 1e-9))
+        return max(0.0, min(1.0, min(headroom)))
+
+    def report(self, load: LoadSample) -> dict:
+        reason = self.overloaded(load)
+        return {
+            "ready": reason is None,
+            "limited_by": reason,
+            "spare_capacity": round(self.spare_capacity(load), 3),
+            "spare_devices": max(0, self.max_devices - load.devices),
+            "load": asdict(load),
+            "unmeasured": ["loop_lag"] if load.loop_lag_ms is None else [],  # Budgets that can't apply
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected)
+        }
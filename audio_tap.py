@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""Live audio tap: fans each device's mic and speaker PCM out to monitoring clients
+
+Subscribers connect to /tap on the audio port. Every frame arrives as a text
+header, {"device": ..., "stream": "mic"|"speaker", "t": ..., "bytes": n},
+followed by one binary message with the raw 24kHz mono PCM16.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import wave
+from typing import Optional, Set
+
+MIC = "mic"
+SPEAKER = "speaker"
+STREAMS = (MIC, SPEAKER)
+
+
+class TapSubscriber:
+    """One monitoring client: a filter and a bounded queue of (device, stream, time, view)"""
+
+    def __init__(self, devices: Optional[Set[str]], streams: Set[str], max_frames: int):
+        self.devices = devices  # None: every device
+        self.streams = streams
+        self.queue = asyncio.Queue(maxsize=max_frames)
+        self.frames = 0
+        self.bytes = 0
+        self.evicted = False  # Fell max_frames behind and was cut off
+
+    def wants(self, device_id: str, stream: str) -> bool:
+        return stream in self.streams and (self.devices is None or device_id in self.devices)
+
+
+class AudioTap:
+    """Broadcasts audio frames to subscribers without copying or waiting
+
+    publish() is called from the live audio paths, so it never awaits and
+    never copies: each frame is wrapped in one memoryview that every matching
+    subscriber's queue shares. A subscriber whose queue is full has fallen
+    behind for good; it is evicted instead of slowing the publisher or
+    silently losing audio in the middle of its stream.
+    """
+
+    def __init__(self, max_frames: int = 64, clock=time.time):
+        self.max_frames = max_frames
+        self.clock = clock
+        self.subscribers: Set[TapSubscriber] = set()
+        self.evictions = 0
+
+    def subscribe(self, devices: Optional[Set[str]] = None, streams=STREAMS) -> TapSubscriber:
+        subscriber = TapSubscriber(devices, set(streams), self.max_frames)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: TapSubscriber):
+        self.subscribers.discard(subscriber)
+
+    def publish(self, device_id: str, stream: str, data):
+        if not self.subscribers:
+            return
+        view = None
+        now = self.clock()
+        for subscriber in list(self.subscribers):
+            if not subscriber.wants(device_id, stream):
+                continue
+            if view is None:
+                view = memoryview(data)
+            try:
+                subscriber.queue.put_nowait((device_id, stream, now, view))
+            except asyncio.QueueFull:
+                self.evict(subscriber)
+
+    def evict(self, subscriber: TapSubscriber):
+        subscriber.evicted = True
+        self.subscribers.discard(subscriber)
+        self.evictions += 1
+        # Wake the consumer so it sees the eviction instead of waiting on an idle stream
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(None)
+
+    async def serve(self, websocket, subscriber: TapSubscriber):
+        """Stream a subscriber's frames to a Starlette WebSocket until it disconnects or is evicted"""
+        try:
+            while True:
+                item = await subscriber.queue.get()
+                if item is None:
+                    await websocket.close(code=1008, reason="subscriber too slow")
+                    return
+                device_id, stream, timestamp, view = item
+                await websocket.send_text(json.dumps({"device": device_id, "stream": stream,
+                                                      "t": timestamp, "bytes": len(view)}))
+                await websocket.send_bytes(view)
+                subscriber.frames += 1
+                subscriber.bytes += len(view)
+        finally:
+            self.unsubscribe(subscriber)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": [{
+                "devices": sorted(s.devices) if s.devices is not None else "*",
+                "streams": sorted(s.streams),
+                "frames": s.frames,
+                "bytes": s.bytes,
+                "queued": s.queue.qsize()
+            } for s in self.subscribers],
+            "evictions": self.evictions
+        }
+
+
+async def monitor(url: str, wav_prefix: Optional[str]):
+    """Print levels per device and stream, optionally writing each to its own WAV file"""
+    import numpy as np
+    import websockets
+
+    files = {}
+    async with websockets.connect(url, max_size=None) as ws:
+        print(f"Tapping {url}")
+        header = None
+        async for message in ws:
+            if isinstance(message, str):
+                header = json.loads(message)
+                continue
+            if header is None:
+                continue
+            key = (header["device"], header["stream"])
+            samples = np.frombuffer(message, dtype=np.int16)
+            rms = float(np.sqrt(np.mean(samples.astype(np.float32) ** 2))) if len(samples) else 0.0
+            print(f"{key[0]:>15} {key[1]:7} {len(message):5d} B  {'#' * min(40, int(rms / 200)):<40} {rms:6.0f}")
+            if wav_prefix:
+                if key not in files:
+                    f = wave.open(f"{wav_prefix}_{key[0]}_{key[1]}.wav", "wb")
+                    f.setnchannels(1)
+                    f.setsampwidth(2)
+                    f.setframerate(24000)
+                    files[key] = f
+                files[key].writeframes(message)
+    for f in files.values():
+        f.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Listen in on the server's live audio tap")
+    parser.add_argument('--host', default='127.0.0.1', help='Server address (the tap only accepts local clients by default)')
+    parser.add_argument('--port', type=int, default=8001, help='Audio port')
+    parser.add_argument('--device', action='append', help='Device address to tap (repeatable; default all)')
+    parser.add_argument('--stream', choices=STREAMS, action='append', help='Stream to tap (default both)')
+    parser.add_argument('--wav', help='Write each device/stream to <prefix>_<device>_<stream>.wav')
+    args = parser.parse_args()
+
+    query = [f"device={d}" for d in args.device or []] + [f"stream={s}" for s in args.stream or []]
+    url = f"ws://{args.host}:{args.port}/tap" + ("?" + "&".join(query) if query else "")
+    try:
+        asyncio.run(monitor(url, args.wav))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+"""Autonomous behavior definitions and scheduling for RavenAutomation"""
+
+import bisect
+import heapq
+import json
+import os
+import random
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Any
+
+from clock import SystemClock
+
+# Frequencies are stored as integers in the cumulative tables so repeated
+# add/remove of weights never drifts the way float sums would
+WEIGHT_SCALE = 1_000_000
+
+DEFAULT_DEVICE = "default"
+
+
+@dataclass
+class ParrotBehavior:
+    name: str
+    prompt: str
+    frequency: float  # 0-1, how often this behavior should occur
+    min_silence: float  # minimum seconds of silence before this can trigger
+    last_used: float = 0  # timestamp of last use
+    cooldown: float = 30.0  # minimum seconds between uses
+
+
+DEFAULT_BEHAVIORS = [
+    {
+        "name": "squawk",
+        "prompt": "Make a squawk sound",
+        "frequency": 0.8,
+        "min_silence": 30.0,  # Wait 30 seconds of silence before eligible
+        "cooldown": 180.0  # Don't squawk more than once per 3 minutes
+    },
+    {
+        "name": "chirp",
+        "prompt": "Make a short chirp or tweet sound",
+        "frequency": 0.6,
+        "min_silence": 45.0,  # Wait 45 seconds of silence before eligible
+        "cooldown": 300.0  # Don't chirp more than once per 5 minutes
+    }
+]
+
+
+class CumulativeWeights:
+    """Fenwick tree of integer weights for O(log n) prefix sums and sampling"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.tree = [0] * (size + 1)
+        self.top_bit = 1 << max(0, size.bit_length() - 1) if size else 0
+
+    def add(self, index: int, delta: int):
+        """Add delta to the weight at index"""
+        i = index + 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def prefix(self, count: int) -> int:
+        """Sum of the first count weights"""
+        total = 0
+        i = count
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def find(self, target: int) -> int:
+        """Index of the weight containing target (0 <= target < total)"""
+        pos = 0
+        bit = self.top_bit
+        while bit:
+            nxt = pos + bit
+            if nxt <= self.size and self.tree[nxt] <= target:
+                pos = nxt
+                target -= self.tree[nxt]
+            bit >>= 1
+        return pos
+
+
+class BehaviorScheduler:
+    """Schedules one device's behaviors without scanning the whole list
+
+    Behaviors on cooldown wait in a heap keyed by cooldown expiry. Behaviors
+    off cooldown carry their weight in a cumulative table ordered by
+    min_silence, so the eligible set for a given silence is a prefix of that
+    table and a weighted pick is a single O(log n) search. Between calls the
+    scheduler remembers the earliest time anything could become eligible and
+    returns immediately before then.
+    """
+
+    def __init__(self, behaviors: List[ParrotBehavior], base_probability: float = 0.15,
+                 max_silence: float = 39.0, rng: Optional[random.Random] = None,
+                 now: Optional[float] = None):
+        self.base_probability = base_probability  # Base chance of any behavior triggering
+        self.max_silence = max_silence  # Probability increases after this much silence
+        self.rng = rng or random.Random()
+
+        self.behaviors = sorted(behaviors, key=lambda b: b.min_silence)
+        self._silence_keys = [b.min_silence for b in self.behaviors]
+        self._weights = [int(round(max(0.0, b.frequency) * WEIGHT_SCALE)) for b in self.behaviors]
+        self._table = CumulativeWeights(len(self.behaviors))
+        self._cooling: List[tuple] = []  # (cooldown expiry, index)
+        self._next_wake = 0.0
+
+        now = time.time() if now is None else now
+        for i, behavior in enumerate(self.behaviors):
+            if not self._weights[i]:
+                continue  # Zero-frequency behaviors can never be picked
+            ready_at = behavior.last_used + behavior.cooldown
+            if ready_at <= now:
+                self._table.add(i, self._weights[i])
+            else:
+                self._cooling.append((ready_at, i))
+        heapq.heapify(self._cooling)
+
+    def __len__(self):
+        return len(self.behaviors)
+
+    def _release_cooldowns(self, now: float):
+        """Move behaviors whose cooldown expired back into the weight table"""
+        cooling = self._cooling
+        while cooling and cooling[0][0] <= now:
+            _, index = heapq.heappop(cooling)
+            self._table.add(index, self._weights[index])
+
+    def next_eligible_time(self, last_interaction: float) -> float:
+        """Earliest time any behavior could become eligible (inf if never)"""
+        wake = float("inf")
+        if self._cooling:
+            wake = self._cooling[0][0]
+        if self._table.prefix(len(self.behaviors)) > 0:
+            first_ready = self._table.find(0)
+            wake = min(wake, last_interaction + self._silence_keys[first_ready])
+        return wake
+
+    def should_trigger_behavior(self, silence_duration: float,
+                                now: Optional[float] = None) -> Optional[ParrotBehavior]:
+        now = time.time() if now is None else now
+        if now < self._next_wake:
+            return None
+
+        self._release_cooldowns(now)
+
+        # Eligible behaviors are the ready ones with min_silence <= silence
+        eligible = bisect.bisect_right(self._silence_keys, silence_duration)
+        total = self._table.prefix(eligible)
+        if total <= 0:
+            self._next_wake = self.next_eligible_time(now - silence_duration)
+            return None
+
+        # Increase probability based on silence duration
+        probability_multiplier = min(3.0, 1.0 + (silence_duration / self.max_silence))
+        if self.rng.random() >= self.base_probability * probability_multiplier:
+            return None
+
+        index = self._table.find(int(self.rng.random() * total))
+        chosen = self.behaviors[index]
+        chosen.last_used = now
+        self._table.add(index, -self._weights[index])
+        heapq.heappush(self._cooling, (now + chosen.cooldown, index))
+        return chosen
+
+
+class BehaviorManager:
+    """Loads per-device behavior schedulers from a JSON config file
+
+    The file holds a default behavior list and optional per-device overrides:
+
+        {
+          "base_probability": 0.15,
+          "max_silence": 39.0,
+          "behaviors": [{"name": ..., "prompt": ..., "frequency": ...,
+                         "min_silence": ..., "cooldown": ...}],
+          "devices": {"192.168.1.50": {"behaviors": [...]}}
+        }
+
+    The file is re-read when its modification time changes; last-used times
+    carry over by behavior name so a reload never resets cooldowns.
+    """
+
+    def __init__(self, config_path: Optional[str] = None, rng: Optional[random.Random] = None,
+                 clock: Optional[SystemClock] = None):
+        self.config_path = config_path
+        self.rng = rng or random.Random()
+        self.clock = clock or SystemClock()
+        self.config: Dict[str, Any] = {}
+        self.schedulers: Dict[str, BehaviorScheduler] = {}
+        self._config_mtime: Optional[float] = None
+        self.load()
+
+    def load(self):
+        """(Re)load behavior definitions from the config file"""
+        config: Dict[str, Any] = {"behaviors": DEFAULT_BEHAVIORS}
+        mtime = None
+        if self.config_path and os.path.exists(self.config_path):
+            try:
+                mtime = os.path.getmtime(self.config_path)
+                with open(self.config_path) as f:
+                    config = json.load(f)
+                self._validate(config)
+            except (OSError, ValueError, TypeError) as e:
+                print(f"Error loading behaviors from {self.config_path}: {e}")
+                if self.config:
+                    self._config_mtime = mtime  # Don't retry until the file changes again
+                    return  # Keep running with the last good config
+                config = {"behaviors": DEFAULT_BEHAVIORS}
+
+        previous = self.schedulers
+        self.config = config
+        self._config_mtime = mtime
+        self.schedulers = {}
+        for device_id, scheduler in previous.items():
+            self.schedulers[device_id] = self._build_scheduler(device_id, scheduler)
+
+    @staticmethod
+    def _validate(config: Dict[str, Any]):
+        """Raise if the config or any behavior entry in it is malformed"""
+        if not isinstance(config, dict):
+            raise ValueError("expected a JSON object at the top level")
+        devices = config.get("devices", {})
+        if not isinstance(devices, dict):
+            raise ValueError("'devices' must be an object keyed by device address")
+        sections = [("top level", config)] + [(f"device {device_id}", section)
+                                              for device_id, section in devices.items()]
+        for where, section in sections:
+            if not isinstance(section, dict):
+                raise ValueError(f"{where} must be an object")
+            behaviors = section.get("behaviors", [])
+            if not isinstance(behaviors, list):
+                raise ValueError(f"'behaviors' in {where} must be a list")
+            for entry in behaviors:
+                if not isinstance(entry, dict):
+                    raise ValueError(f"behavior entries in {where} must be objects")
+                ParrotBehavior(**entry)
+
+    def reload_if_changed(self) -> bool:
+        """Reload the config file if it changed on disk"""
+        if not self.config_path:
+            return False
+        try:
+            mtime = os.path.getmtime(self.config_path)
+        except OSError:
+            return False
+        if mtime == self._config_mtime:
+            return False
+        self.load()
+        print(f"Reloaded behaviors from {self.config_path}")
+        return True
+
+    def _device_config(self, device_id: str) -> Dict[str, Any]:
+        device_config = dict(self.config)
+        device_config.update(self.config.get("devices", {}).get(device_id, {}))
+        return device_config
+
+    def _build_scheduler(self, device_id: str,
+                         previous: Optional[BehaviorScheduler] = None) -> BehaviorScheduler:
+        device_config = self._device_config(device_id)
+        last_used = {}
+        if previous:
+            last_used = {b.name: b.last_used for b in previous.behaviors}
+
+        behaviors = []
+        for entry in device_config.get("behaviors", DEFAULT_BEHAVIORS):
+            behavior = ParrotBehavior(**entry)
+            behavior.last_used = last_used.get(behavior.name, behavior.last_used)
+            behaviors.append(behavior)
+
+        return BehaviorScheduler(
+            behaviors,
+            base_probability=device_config.get("base_probability", 0.15),
+            max_silence=device_config.get("max_silence", 39.0),
+            rng=self.rng,
+            now=self.clock.time()
+        )
+
+    def scheduler_for(self, device_id: str = DEFAULT_DEVICE) -> BehaviorScheduler:
+        """Get (creating on first use) the scheduler for a device"""
+        scheduler = self.schedulers.get(device_id)
+        if scheduler is None:
+            scheduler = self._build_scheduler(device_id)
+            self.schedulers[device_id] = scheduler
+        return scheduler
+
+    def remove_device(self, device_id: str):
+        """Forget a device's scheduler"""
+        self.schedulers.pop(device_id, None)
+
+    def should_trigger_behavior(self, silence_duration: float, device_id: str = DEFAULT_DEVICE,
+                                now: Optional[float] = None) -> Optional[ParrotBehavior]:
+        now = self.clock.time() if now is None else now
+        return self.scheduler_for(device_id).should_trigger_behavior(silence_duration, now)
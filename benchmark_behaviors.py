@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the autonomous behavior scheduler
+Simulates a fleet of devices ticking once per simulated second and compares
+BehaviorScheduler against the original linear scan over every behavior
+"""
+import argparse
+import random
+import time
+
+from behaviors import BehaviorScheduler, ParrotBehavior
+
+
+def make_behaviors(count, rng):
+    """Generate a behavior list with spread-out silences and cooldowns"""
+    return [
+        ParrotBehavior(
+            name=f"behavior_{i}",
+            prompt=f"Do behavior {i}",
+            frequency=rng.uniform(0.1, 1.0),
+            min_silence=rng.uniform(10.0, 300.0),
+            cooldown=rng.uniform(60.0, 900.0)
+        )
+        for i in range(count)
+    ]
+
+
+def linear_scan(behaviors, silence_duration, current_time, rng,
+                base_probability=0.15, max_silence=39.0):
+    """The original BehaviorManager.should_trigger_behavior, minus logging"""
+    probability_multiplier = min(3.0, 1.0 + (silence_duration / max_silence))
+    eligible_behaviors = [
+        b for b in behaviors
+        if silence_duration >= b.min_silence and current_time - b.last_used >= b.cooldown
+    ]
+    if eligible_behaviors and rng.random() < base_probability * probability_multiplier:
+        chosen = rng.choices(eligible_behaviors, weights=[b.frequency for b in eligible_behaviors], k=1)[0]
+        chosen.last_used = current_time
+        return chosen
+    return None
+
+
+def run(devices, behaviors_per_device, seconds, interaction_interval, seed, naive):
+    rng = random.Random(seed)
+    fleets = [make_behaviors(behaviors_per_device, rng) for _ in range(devices)]
+    start_time = 1_000_000.0
+
+    if naive:
+        tick = lambda i, silence, now: linear_scan(fleets[i], silence, now, rng)
+    else:
+        schedulers = [BehaviorScheduler(b, rng=rng, now=start_time) for b in fleets]
+        tick = lambda i, silence, now: schedulers[i].should_trigger_behavior(silence, now)
+
+    # Each device hears someone speak at random intervals
+    last_interaction = [start_time - rng.uniform(0, interaction_interval) for _ in range(devices)]
+    next_interaction = [start_time + rng.expovariate(1.0 / interaction_interval) for _ in range(devices)]
+
+    fired = 0
+    calls = 0
+    started = time.perf_counter()
+    for second in range(seconds):
+        now = start_time + second
+        for i in range(devices):
+            if now >= next_interaction[i]:
+                last_interaction[i] = now
+                next_interaction[i] = now + rng.expovariate(1.0 / interaction_interval)
+            if tick(i, now - last_interaction[i], now):
+                last_interaction[i] = now  # A behavior resets the silence timer
+                fired += 1
+            calls += 1
+    elapsed = time.perf_counter() - started
+    return elapsed, calls, fired
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark autonomous behavior scheduling')
+    parser.add_argument('--devices', type=int, default=1000, help='Number of simulated devices')
+    parser.add_argument('--behaviors', type=int, default=100, help='Behaviors per device')
+    parser.add_argument('--seconds', type=int, default=120, help='Simulated seconds (one tick per second)')
+    parser.add_argument('--interaction-interval', type=float, default=600.0,
+                        help='Mean seconds between human interactions per device')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed')
+    parser.add_argument('--skip-naive', action='store_true', help='Skip the linear scan baseline')
+    args = parser.parse_args()
+
+    print(f"Behavior scheduler benchmark: {args.devices} devices x {args.behaviors} behaviors, "
+          f"{args.seconds} ticks")
+    print("=" * 60)
+
+    modes = [('scheduler', False)] if args.skip_naive else [('linear scan', True), ('scheduler', False)]
+    for name, naive in modes:
+        elapsed, calls, fired = run(args.devices, args.behaviors, args.seconds,
+                                    args.interaction_interval, args.seed, naive)
+        print(f"{name:12} - {elapsed:7.3f}s total, {elapsed / calls * 1e6:7.2f} us/tick, "
+              f"{calls / elapsed:10.0f} ticks/s, {fired} behaviors fired")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark for mic DSP offload
+Simulates many parrots streaming 40ms mic frames in real time and measures
+event-loop lag with the DSP chain on the loop versus in a DSPPool
+"""
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from benchmark_mic_dsp import synthetic_mic
+from dsp_pool import DSPPool
+from mic_dsp import MicDSPChain
+
+FRAME_SAMPLES = 960  # 40ms at 24kHz, as the ESP32 sends
+
+
+async def measure_lag(interval, stop, lags):
+    """Sleep for interval repeatedly and record how late each wakeup is"""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lags.append(loop.time() - expected)
+
+
+async def device(device_id, frames, process, stop, frame_period):
+    """One parrot's mic: a frame every frame_period, processed as it arrives"""
+    loop = asyncio.get_running_loop()
+    next_send = loop.time()
+    index = 0
+    while not stop.is_set():
+        await process(device_id, frames[index % len(frames)])
+        index += 1
+        next_send += frame_period
+        await asyncio.sleep(max(0.0, next_send - loop.time()))
+
+
+async def run(devices, seconds, workers, noise_reduction, rate):
+    chain_config = {"sample_rate": rate, "noise_reduction": noise_reduction}
+    audio = synthetic_mic(4.0, rate, seed=0)
+    frames = [audio[i:i + FRAME_SAMPLES].tobytes()
+              for i in range(0, len(audio) - FRAME_SAMPLES + 1, FRAME_SAMPLES)]
+
+    pool = None
+    if workers:
+        pool = DSPPool(workers=workers, chain_config=chain_config)
+        pool.start()
+        process = pool.process
+    else:
+        chains = {i: MicDSPChain(**chain_config) for i in range(devices)}
+
+        async def process(device_id, frame):
+            return chains[device_id].process(frame)
+
+    stop = asyncio.Event()
+    lags = []
+    tasks = [asyncio.create_task(measure_lag(0.005, stop, lags))]
+    tasks += [asyncio.create_task(device(i, frames, process, stop, FRAME_SAMPLES / rate))
+              for i in range(devices)]
+    await asyncio.sleep(seconds)
+    stop.set()
+    await asyncio.gather(*tasks)
+
+    dropped = pool.stats()["dropped"] if pool else 0
+    if pool:
+        pool.close()
+    return np.array(lags) * 1000, dropped
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark event-loop lag with and without DSP offload')
+    parser.add_argument('--devices', type=int, default=24, help='Simulated parrots')
+    parser.add_argument('--seconds', type=float, default=10.0, help='Duration of each run')
+    parser.add_argument('--workers', type=int, default=4, help='DSPPool worker processes')
+    parser.add_argument('--noise-reduction', action='store_true', help='Enable spectral noise reduction')
+    parser.add_argument('--rate', type=int, default=24000, help='Sample rate')
+    args = parser.parse_args()
+
+    print(f"DSP offload benchmark: {args.devices} devices, {args.seconds:.0f}s per run, "
+          f"noise reduction {'on' if args.noise_reduction else 'off'}")
+    print("=" * 60)
+
+    for workers in (0, args.workers):
+        start = time.perf_counter()
+        lags, dropped = asyncio.run(run(args.devices, args.seconds, workers, args.noise_reduction, args.rate))
+        label = f"{workers} workers" if workers else "on the loop"
+        print(f"{label:12} - loop lag p50 {np.percentile(lags, 50):6.2f} ms, "
+              f"p95 {np.percentile(lags, 95):6.2f} ms, p99 {np.percentile(lags, 99):6.2f} ms, "
+              f"max {lags.max():6.2f} ms, dropped {dropped} "
+              f"({time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
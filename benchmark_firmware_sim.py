@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the firmware motion simulator
+Builds a timeline of spoken replies and compiled gestures (as the server
+sends them), runs it through FirmwareSimulator and reports how long the
+simulation took against the simulated time, plus each servo's range, bound
+violations and speed-limit saturation
+"""
+import argparse
+import time
+
+import numpy as np
+
+from bottango_compiler import GestureCompiler, head_turn, nod, sequence, together, wing_flap
+from firmware_sim import FirmwareSimulator, SAMPLE_RATE
+
+
+def synthetic_reply(rng, seconds):
+    """Syllable-rate bursts of noisy harmonics at a speech-like level"""
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    voiced = np.sin(2 * np.pi * 150 * t) + 0.5 * np.sin(2 * np.pi * 300 * t) + 0.3 * rng.standard_normal(t.size)
+    envelope = np.clip(np.sin(2 * np.pi * rng.uniform(3, 5) * t), 0, None)
+    return (voiced * envelope * rng.uniform(1500, 6000)).clip(-32768, 32767).astype(np.int16)
+
+
+def timeline(minutes, seed):
+    rng = np.random.default_rng(seed)
+    compiler = GestureCompiler()
+    repertoire = [
+        head_turn(-1.0), head_turn(1.0), wing_flap(), nod(),
+        sequence(nod(1), head_turn(0.6), gap_ms=200), together(wing_flap(3), nod(2))
+    ]
+    speech, gestures = [], []
+    t = 5.0
+    while t < minutes * 60:
+        seconds = rng.uniform(2.0, 8.0)
+        speech.append((t, synthetic_reply(rng, seconds)))
+        if rng.random() < 0.6:
+            gesture = repertoire[rng.integers(len(repertoire))]
+            gestures.append((t + rng.uniform(0.0, seconds + 4.0), compiler.compile(gesture)))
+        t += seconds + rng.exponential(25.0)
+    return speech, gestures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the firmware motion simulator')
+    parser.add_argument('--minutes', type=float, default=60.0, help='Simulated duration')
+    parser.add_argument('--loop-ms', type=float, default=3.0, help='Firmware loop() period')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    args = parser.parse_args()
+
+    speech, gestures = timeline(args.minutes, args.seed)
+    simulator = FirmwareSimulator(loop_ms=args.loop_ms, seed=args.seed)
+    start = time.perf_counter()
+    result = simulator.run(args.minutes * 60, speech=speech, gestures=gestures)
+    elapsed = time.perf_counter() - start
+    report = result.report()
+
+    print(f"Firmware simulation: {args.minutes:.0f} min, {report['loops']} loops of {args.loop_ms:.1f}ms, "
+          f"{len(speech)} replies, {len(gestures)} gestures")
+    print("=" * 60)
+    print(f"simulated in {elapsed:.3f}s ({args.minutes * 60 / elapsed:.0f}x realtime); "
+          f"speaking {report['speaking_ms'] / 1000:.0f}s, gestures {report['gesture_ms'] / 1000:.0f}s")
+    for name, servo in report["servos"].items():
+        print(f"{name:13} range {servo['range'][0]}-{servo['range'][1]}us (bounds {servo['bounds'][0]}-"
+              f"{servo['bounds'][1]}), out of bounds {servo['violation_ms'] / 1000:6.1f}s "
+              f"(worst {servo['worst_violation_us']}us), speed-limited {servo['speed_limited_ms'] / 1000:5.1f}s, "
+              f"overspeed steps {servo['overspeed_steps']} ({servo['overspeed_lag_ms'] / 1000:.1f}s behind)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark for per-message keepalive overhead on device receive loops
+Runs N simulated device sockets (asyncio queues) receiving a stream of
+messages, once with asyncio.wait_for(..., timeout) around every receive as the
+endpoints used to, and once awaiting through a KeepaliveManager lease, and
+reports the event-loop time spent per message.
+"""
+import argparse
+import asyncio
+import time
+
+from keepalive import KeepaliveManager
+
+
+async def receive_loop(queue, mode, keepalive, counts, index):
+    lease = keepalive.register(f"device {index}", ping=None) if mode == "wheel" else None
+    while True:
+        if mode == "wait_for":
+            try:
+                message = await asyncio.wait_for(queue.get(), timeout=5.0)
+            except asyncio.TimeoutError:
+                continue
+        else:
+            message = await lease.wait(queue.get())
+        if message is None:
+            break
+        counts[index] += 1
+
+
+async def run(mode, connections, messages_per_connection, batch):
+    keepalive = KeepaliveManager()
+    if mode == "wheel":
+        keepalive.start()
+    queues = [asyncio.Queue() for _ in range(connections)]
+    counts = [0] * connections
+    tasks = [asyncio.create_task(receive_loop(q, mode, keepalive, counts, i)) for i, q in enumerate(queues)]
+    await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    for _ in range(0, messages_per_connection, batch):
+        for queue in queues:
+            for _ in range(batch):
+                queue.put_nowait(b"frame")
+        await asyncio.sleep(0)  # Let the receive loops drain, as between network reads
+        while any(not q.empty() for q in queues):
+            await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start
+
+    for queue in queues:
+        queue.put_nowait(None)
+    await asyncio.gather(*tasks)
+    await keepalive.stop()
+    return elapsed / sum(counts) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark keepalive overhead per received message')
+    parser.add_argument('--messages', type=int, default=200, help='Messages per connection')
+    parser.add_argument('--batch', type=int, default=1, help='Messages queued per connection per round')
+    args = parser.parse_args()
+
+    print(f"Keepalive benchmark: {args.messages} messages per connection")
+    print("=" * 60)
+    for connections in (10, 100, 500):
+        old = asyncio.run(run("wait_for", connections, args.messages, args.batch))
+        new = asyncio.run(run("wheel", connections, args.messages, args.batch))
+        print(f"{connections:4d} connections - wait_for {old:5.2f} us/msg, timer wheel {new:5.2f} us/msg "
+              f"({old / new:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
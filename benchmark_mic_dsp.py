@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the mic DSP chain
+Measures per-frame processing cost at 24 kHz for typical ESP32 frame sizes
+"""
+import argparse
+import time
+
+import numpy as np
+
+from mic_dsp import MicDSPChain
+
+
+def synthetic_mic(seconds, sample_rate, seed):
+    """Speech-band tones plus hum, DC offset and noise, like the raw INMP441 feed"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    audio = (
+        2500 * np.sin(2 * np.pi * 220 * t) * (np.sin(2 * np.pi * 0.5 * t) > 0)
+        + 800 * np.sin(2 * np.pi * 60 * t)
+        + 1500
+        + rng.normal(0, 300, t.size)
+    )
+    return np.clip(audio, -32768, 32767).astype(np.int16)
+
+
+def bench(frame_samples, audio, sample_rate, noise_reduction, repeats):
+    chain = MicDSPChain(sample_rate=sample_rate, noise_reduction=noise_reduction)
+    frames = [audio[i:i + frame_samples].tobytes()
+              for i in range(0, len(audio) - frame_samples + 1, frame_samples)]
+
+    timings = []
+    for _ in range(repeats):
+        for frame in frames:
+            start = time.perf_counter()
+            chain.process(frame)
+            timings.append(time.perf_counter() - start)
+    return np.array(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the mic DSP chain')
+    parser.add_argument('--seconds', type=float, default=10.0, help='Seconds of synthetic audio per run')
+    parser.add_argument('--repeats', type=int, default=3, help='Passes over the audio')
+    parser.add_argument('--rate', type=int, default=24000, help='Sample rate')
+    args = parser.parse_args()
+
+    audio = synthetic_mic(args.seconds, args.rate, seed=0)
+    print(f"Mic DSP benchmark at {args.rate} Hz ({args.seconds:.0f}s x {args.repeats})")
+    print("=" * 60)
+
+    for frame_samples in (480, 960, 1024):
+        frame_ms = frame_samples / args.rate * 1000
+        for noise_reduction in (False, True):
+            timings = bench(frame_samples, audio, args.rate, noise_reduction, args.repeats) * 1e6
+            label = "chain + NR" if noise_reduction else "chain"
+            print(f"{frame_samples:5d} samples ({frame_ms:4.1f} ms) {label:10} - "
+                  f"mean {timings.mean():6.1f} us, p50 {np.percentile(timings, 50):6.1f} us, "
+                  f"p99 {np.percentile(timings, 99):6.1f} us, "
+                  f"{timings.mean() / (frame_ms * 1000):.2%} of real time")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark for batched mic level metering
+Simulates a fleet of devices each delivering one mic frame per frame period
+into a single event loop, at its own phase as unsynchronized devices do, and
+compares per-frame metering (frame_level on each connection) against
+BatchedLevelMeter with a few tick lengths. Reports CPU cost per frame, the
+mean batch size and the latency the batching adds.
+"""
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from mic_meter import BatchedLevelMeter
+
+FRAME_SAMPLES = 1024  # What the firmware sends per mic read
+FRAME_SECONDS = FRAME_SAMPLES / 24000
+
+
+def make_frames(devices, seed):
+    rng = np.random.default_rng(seed)
+    return [(rng.standard_normal(FRAME_SAMPLES) * rng.uniform(100, 4000)).astype(np.int16).tobytes()
+            for _ in range(devices)]
+
+
+async def run_device(frame, phase, began, frames, measure, delays):
+    """One connection: a frame arrives every period at this device's phase and is metered"""
+    for k in range(frames):
+        due = began + phase + k * FRAME_SECONDS
+        wait = due - time.perf_counter()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        arrived = time.perf_counter()
+        await measure(frame)
+        delays.append(time.perf_counter() - arrived)
+
+
+async def run(devices, seconds, tick_ms, seed):
+    """tick_ms None meters every frame on its own"""
+    rng = np.random.default_rng(seed)
+    frames = make_frames(devices, seed)
+    meter = BatchedLevelMeter(tick_ms=tick_ms or 0.0, max_frames=max(devices, 1))
+
+    async def measure(frame):
+        if tick_ms is None:
+            BatchedLevelMeter.level(frame)
+        else:
+            await meter.measure(frame)
+
+    count = int(seconds / FRAME_SECONDS)
+    delays = []
+    began = time.perf_counter() + 0.05
+    cpu = time.process_time()
+    await asyncio.gather(*(run_device(frame, rng.uniform(0, FRAME_SECONDS), began, count, measure, delays)
+                           for frame in frames))
+    cpu = time.process_time() - cpu
+    return cpu / len(delays), np.array(delays), meter.stats()
+
+
+def analysis_only(devices, ticks, seed):
+    """The vectorized pass alone, against per-frame calls, without the event loop"""
+    frames = make_frames(devices, seed)
+    meter = BatchedLevelMeter(max_frames=max(devices, 1))
+    began = time.perf_counter()
+    for _ in range(ticks):
+        for frame in frames:
+            BatchedLevelMeter.level(frame)
+    per_frame = time.perf_counter() - began
+
+    began = time.perf_counter()
+    for _ in range(ticks):
+        for row, frame in enumerate(frames):
+            meter._block[row, :FRAME_SAMPLES] = np.frombuffer(frame, dtype=np.int16)
+            meter._lengths[row] = FRAME_SAMPLES
+        meter.analyze(devices)
+    batched = time.perf_counter() - began
+    return per_frame, batched
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark batched mic level metering')
+    parser.add_argument('--seconds', type=float, default=3.0, help='Simulated seconds per run')
+    parser.add_argument('--ticks', type=float, nargs='+', default=[0.0, 5.0, 10.0], help='Batch tick lengths (ms)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    args = parser.parse_args()
+
+    print(f"Mic level benchmark: {FRAME_SAMPLES}-sample frames every {FRAME_SECONDS * 1000:.1f} ms per device, "
+          f"arriving at random phases, {args.seconds:.0f}s per run")
+    print("=" * 60)
+    for devices in (1, 4, 16, 64, 256):
+        cpu, delays, _ = asyncio.run(run(devices, args.seconds, None, args.seed))
+        print(f"{devices:4d} devices - per-frame        {cpu * 1e6:6.1f} us/frame")
+        for tick in args.ticks:
+            cpu, delays, stats = asyncio.run(run(devices, args.seconds, tick, args.seed))
+            print(f"             batched {tick:4.1f} ms  {cpu * 1e6:6.1f} us/frame, mean batch "
+                  f"{stats['mean_batch']:5.1f}, added latency p99 {np.percentile(delays, 99) * 1000:5.2f} ms")
+        compute_frame, compute_batch = analysis_only(devices, 200, args.seed)
+        scale = 1e6 / (devices * 200)
+        print(f"             analysis alone: per-frame {compute_frame * scale:5.1f} us, "
+              f"vectorized {compute_batch * scale:5.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Benchmark for rate-limit-aware upstream scheduling
+Simulates many parrots sharing one API key's per-minute request and token
+budget. Users speak at random and each parrot fires autonomous behaviors
+when idle. Compares requesting everything immediately against UpstreamScheduler
+(autonomous floor, cached replays, bounded user waits), and reports user
+turns that were refused or delayed and how autonomous behaviors were served.
+"""
+import argparse
+import random
+
+from rate_limits import RateLimitTracker, UpstreamScheduler, ResponseCache, USER, AUTONOMOUS
+
+
+class VirtualTime:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class SimulatedApi:
+    """Per-minute request and token windows, reported like rate_limits.updated"""
+
+    def __init__(self, clock, requests_per_min, tokens_per_min):
+        self.clock = clock
+        self.limits = {"requests": requests_per_min, "tokens": tokens_per_min}
+        self.used = {"requests": 0, "tokens": 0}
+        self.window_start = 0.0
+
+    def _roll(self):
+        if self.clock() - self.window_start >= 60.0:
+            self.window_start += 60.0 * int((self.clock() - self.window_start) // 60.0)
+            self.used = {"requests": 0, "tokens": 0}
+
+    def request(self, tokens):
+        """Returns the events the server would send for one response.create"""
+        self._roll()
+        if self.used["requests"] + 1 > self.limits["requests"] or self.used["tokens"] + tokens > self.limits["tokens"]:
+            retry = 60.0 - (self.clock() - self.window_start)
+            return False, [{"type": "error", "error": {"code": "rate_limit_exceeded",
+                                                       "message": f"Rate limit reached. Please try again in {retry:.1f}s."}}]
+        self.used["requests"] += 1
+        self.used["tokens"] += tokens
+        reset = 60.0 - (self.clock() - self.window_start)
+        return True, [
+            {"type": "response.created"},
+            {"type": "rate_limits.updated", "rate_limits": [
+                {"name": name, "limit": self.limits[name], "remaining": self.limits[name] - self.used[name],
+                 "reset_seconds": reset} for name in self.limits]},
+            {"type": "response.done", "response": {"status": "completed", "usage": {"total_tokens": tokens}}}
+        ]
+
+
+def run(scheduled, args, seed):
+    rng = random.Random(seed)
+    clock = VirtualTime()
+    api = SimulatedApi(clock, args.requests_per_min, args.tokens_per_min)
+    tracker = RateLimitTracker(clock=clock)
+    scheduler = UpstreamScheduler(tracker, autonomous_floor=args.floor, max_user_wait=args.max_user_wait)
+    caches = [ResponseCache(rng=random.Random(seed + i)) for i in range(args.parrots)]
+    results = {"user_ok": 0, "user_refused": 0, "user_waited": 0.0, "auto_live": 0, "auto_cached": 0,
+               "auto_skipped": 0, "auto_refused": 0}
+
+    def send(tokens):
+        ok, events = api.request(tokens)
+        for event in events:
+            tracker.observe(event)
+        return ok
+
+    step = 0.5
+    while clock.now < args.minutes * 60.0:
+        for parrot in range(args.parrots):
+            if rng.random() < step / args.user_interval:
+                if scheduled:
+                    wait = min(tracker.seconds_until_available(), args.max_user_wait) if not scheduler.allow(USER) else 0.0
+                    results["user_waited"] += wait
+                    clock.now += wait  # Only this turn is held; approximates the per-turn delay
+                    ok = send(rng.randint(600, 1600))
+                    clock.now -= wait
+                else:
+                    ok = send(rng.randint(600, 1600))
+                results["user_ok" if ok else "user_refused"] += 1
+            if rng.random() < step / args.behavior_interval:
+                behavior = f"behavior-{rng.randrange(4)}"
+                cache = caches[parrot]
+                if scheduled and not scheduler.allow(AUTONOMOUS):
+                    if cache.pick(behavior):
+                        results["auto_cached"] += 1
+                    else:
+                        results["auto_skipped"] += 1
+                    continue
+                cache.start(behavior)
+                if send(rng.randint(400, 1200)):
+                    cache.add(b"\x00" * 4800)
+                    cache.finish()
+                    results["auto_live"] += 1
+                else:
+                    cache.abort()
+                    results["auto_refused"] += 1
+        clock.now += step
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark rate-limit-aware upstream scheduling')
+    parser.add_argument('--parrots', type=int, default=30, help='Parrots sharing the API key')
+    parser.add_argument('--minutes', type=float, default=30.0, help='Simulated duration')
+    parser.add_argument('--requests-per-min', type=int, default=100, help='Request budget per minute')
+    parser.add_argument('--tokens-per-min', type=int, default=120000, help='Token budget per minute')
+    parser.add_argument('--user-interval', type=float, default=45.0, help='Mean seconds between user turns per parrot')
+    parser.add_argument('--behavior-interval', type=float, default=30.0, help='Mean seconds between behaviors per parrot')
+    parser.add_argument('--floor', type=float, default=0.25, help='Headroom below which behaviors back off')
+    parser.add_argument('--max-user-wait', type=float, default=3.0, help='Longest a user turn is held')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    args = parser.parse_args()
+
+    print(f"Rate limit benchmark: {args.parrots} parrots, {args.requests_per_min} requests and "
+          f"{args.tokens_per_min} tokens per minute, {args.minutes:.0f} simulated minutes")
+    print("=" * 60)
+    for name, scheduled in (("unscheduled", False), ("scheduled", True)):
+        r = run(scheduled, args, args.seed)
+        users = r["user_ok"] + r["user_refused"]
+        behaviors = r["auto_live"] + r["auto_cached"] + r["auto_skipped"] + r["auto_refused"]
+        print(f"{name:11} - user turns refused {r['user_refused'] / max(users, 1):6.1%} of {users}, "
+              f"held {r['user_waited']:.0f}s total")
+        print(f"{'':11}   behaviors: live {r['auto_live']}, cached {r['auto_cached']}, "
+              f"skipped {r['auto_skipped']}, refused {r['auto_refused']} of {behaviors}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark for cassette replay of upstream realtime traffic
+Serves a cassette (or a synthesized conversation when none is given) from the
+local stand-in and drives OpenAIProxy against it, handling each event the way
+the server does. Reports replay wall time under original, gap-capped and
+no-wait timing, and event throughput with per-event handling cost.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from cassette import CassetteRecorder, CassetteServer, RECEIVED, SENT
+from openai import OpenAIProxy
+
+
+def synthesize(path, turns, seed):
+    """Write a plausible conversation: user speech, then a streamed spoken reply per turn"""
+    rng = random.Random(seed)
+    recorder = CassetteRecorder(path, backend="synthetic")
+    clock = 0.0
+
+    def at(offset, direction, event):
+        recorder.record(direction, json.dumps(event), at=offset)
+
+    at(0.05, RECEIVED, {"type": "session.created", "session": {}})
+    item = 0
+    for turn in range(turns):
+        clock += rng.uniform(2.0, 8.0)  # Room is quiet for a while
+        for _ in range(int(rng.uniform(1.0, 3.0) * 10)):  # 100 ms mic frames
+            clock += 0.1
+            at(clock, SENT, {"type": "input_audio_buffer.append",
+                             "audio": base64.b64encode(bytes(4800)).decode()})
+        item += 1
+        at(clock + 0.3, RECEIVED, {"type": "input_audio_buffer.committed", "item_id": f"item_{item}"})
+        at(clock + 0.6, RECEIVED, {"type": "conversation.item.input_audio_transcription.completed",
+                                   "item_id": f"item_{item}", "transcript": f"hello parrot {turn}"})
+        clock += 0.7
+        for _ in range(int(rng.uniform(1.5, 5.0) * 20)):  # Deltas arrive faster than real time
+            clock += 0.02
+            pcm = np.random.default_rng(turn).integers(-3000, 3000, 2400, dtype=np.int16).tobytes()
+            at(clock, RECEIVED, {"type": "response.audio.delta", "delta": base64.b64encode(pcm).decode()})
+        item += 1
+        at(clock + 0.05, RECEIVED, {"type": "response.audio_transcript.done", "item_id": f"item_{item}",
+                                    "transcript": "Squawk! Hello yourself."})
+        at(clock + 0.06, RECEIVED, {"type": "response.done", "response": {
+            "output": [{"id": f"item_{item}"}],
+            "usage": {"input_tokens": 400 + 150 * turn, "output_tokens": 120}}})
+    recorder.close()
+
+
+async def replay(path, speed, max_gap):
+    server = CassetteServer(path, speed=speed, max_gap=max_gap)
+    url = await server.start()
+    proxy = OpenAIProxy(url=url, record_dir="")
+    handled, audio_bytes, handling = 0, 0, []
+    start = time.perf_counter()
+    try:
+        await proxy.connect()
+        while True:
+            try:
+                message = await proxy.receive()
+            except Exception:
+                break
+            t0 = time.perf_counter()
+            event = json.loads(message)
+            proxy.track_event(event)
+            if event.get("type") == "response.audio.delta":
+                audio_bytes += len(memoryview(base64.b64decode(event["delta"])))
+            handling.append(time.perf_counter() - t0)
+            handled += 1
+    finally:
+        await proxy.disconnect()
+        await server.stop()
+    return time.perf_counter() - start, handled, audio_bytes, np.array(handling) * 1e6
+
+
+async def main_async(args):
+    path = args.cassette
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(), "synthetic.cassette.gz")
+        synthesize(path, args.turns, args.seed)
+    server = CassetteServer(path)
+    recorded = server.replies[-1][0] if server.replies else 0.0
+
+    print(f"Cassette replay benchmark: {len(server.replies)} events, {recorded:.1f}s recorded")
+    print("=" * 60)
+    modes = [("original", 1.0, None), (f"gaps<={args.max_gap:g}s", 1.0, args.max_gap), ("no waits", 0.0, None)]
+    if args.skip_original:
+        modes = modes[1:]
+    for label, speed, max_gap in modes:
+        wall, handled, audio_bytes, handling = await replay(path, speed, max_gap)
+        print(f"{label:12} - {wall:7.2f}s wall ({recorded / wall:6.1f}x), {handled / wall:8.0f} events/s, "
+              f"handling p50 {np.percentile(handling, 50):5.1f} us p99 {np.percentile(handling, 99):6.1f} us, "
+              f"{audio_bytes / 1024:.0f} KiB audio")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark replaying upstream traffic cassettes')
+    parser.add_argument('cassette', nargs='?', help='Cassette to replay (default: synthesize one)')
+    parser.add_argument('--turns', type=int, default=20, help='Turns in a synthesized conversation')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the synthesized conversation')
+    parser.add_argument('--max-gap', type=float, default=0.25, help='Gap cap for compressed timing')
+    parser.add_argument('--skip-original', action='store_true', help='Skip the real-time replay')
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark for serial telemetry ingestion
+Opens a pseudo-terminal per simulated ESP32, writes a realistic mix of
+firmware debug lines into each from a feeder thread, and reports how many
+lines per second the collector parses on the event loop, the CPU cost per
+line, and the memory the bounded timelines take
+"""
+import argparse
+import asyncio
+import os
+import threading
+import time
+
+from serial_telemetry import SerialTelemetryCollector, TelemetryStore, SERVER_MIC_GAP
+
+LINES = [
+    b"Idle animation running - positions: Mouth=0.12 Wing=0.05 Tilt=0.42 Rot=0.50\r\n",
+    b"Mic raw range: -8123456 to 7934567 (bytes: 4096)\r\n",
+    b"Loop stall: 84 ms (speaker drain 80 ms)\r\n",
+    b"Speaker queue overflow, dropped 512 bytes\r\n",
+    b"Microphone WebSocket Disconnected\r\n",
+    b"Microphone WebSocket Connected\r\n",
+    b"Sending: sCI,6,4096.00,h1234\r\n",
+]
+
+
+def feed(master, lines, done):
+    """Write lines into the pty as a device would, in bursts"""
+    payload = b"".join(LINES[i % len(LINES)] for i in range(lines))
+    view = memoryview(payload)
+    while view:
+        try:
+            written = os.write(master, view[:1024])
+        except BlockingIOError:
+            time.sleep(0.0005)
+            continue
+        view = view[written:]
+    done.set()
+
+
+async def run(devices, lines):
+    store = TelemetryStore(max_events=4096)
+    masters, ports = [], {}
+    for i in range(devices):
+        master, slave = os.openpty()
+        masters.append(master)
+        ports[os.ttyname(slave)] = f"10.0.0.{i + 1}"
+    collector = SerialTelemetryCollector(store, ports, retry_s=0.1)
+    collector.start()
+    await asyncio.sleep(0.05)
+
+    done = [threading.Event() for _ in masters]
+    began, cpu = time.perf_counter(), time.process_time()
+    feeders = [threading.Thread(target=feed, args=(m, lines, d), daemon=True) for m, d in zip(masters, done)]
+    for thread in feeders:
+        thread.start()
+    while store.lines < devices * lines:
+        await asyncio.sleep(0.01)
+        if time.perf_counter() - began > 60:
+            break
+    elapsed, cpu = time.perf_counter() - began, time.process_time() - cpu
+    for i in range(devices):
+        store.record(f"10.0.0.{i + 1}", SERVER_MIC_GAP, 250.0)
+    correlated = sum(len(store.correlate(device)) for device in list(store.rings))
+    await collector.stop()
+    for master in masters:
+        os.close(master)
+    return store.lines, elapsed, cpu, store.stats()["bytes"], correlated
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark serial telemetry ingestion over ptys')
+    parser.add_argument('--lines', type=int, default=20000, help='Lines written per device')
+    args = parser.parse_args()
+
+    print(f"Serial telemetry benchmark: {args.lines} lines per simulated device over a pty")
+    print("=" * 60)
+    for devices in (1, 4, 16):
+        lines, elapsed, cpu, memory, incidents = asyncio.run(run(devices, args.lines))
+        print(f"{devices:3d} devices - {lines / elapsed:8.0f} lines/s, {cpu / max(lines, 1) * 1e6:5.1f} us CPU per line "
+              f"(feeders included), {memory / 1024:.0f} KiB of timelines, {incidents} incidents correlated")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark for simulated-time runs of the server's autonomous behavior loop
+Runs AudioClient's behavior and speaking-state loops on a VirtualClock for a
+simulated day with occasional visitors, and reports what the parrot did and
+how much faster than real time it ran
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import random
+import time
+from collections import Counter
+
+from clock import VirtualClock
+from parrot_server import AudioClient
+
+
+class SimulatedUpstream:
+    """Stands in for OpenAIProxy: each prompt makes the parrot talk for a while"""
+
+    def __init__(self, client, rng):
+        self.client = client
+        self.rng = rng
+        self.ws = object()  # Looks connected
+        self.prompts = []
+
+    async def send_text(self, text):
+        now = self.client.clock.time()
+        self.prompts.append((now, text))
+        self.client.is_speaking = True
+        self.client.audio_end_time = now + self.rng.uniform(1.0, 4.0)
+
+
+async def visitors(client, rng, mean_gap):
+    """People wander by and talk now and then, resetting the silence timer"""
+    while client.running:
+        await client.clock.sleep(rng.expovariate(1.0 / mean_gap))
+        client.last_automation_input = client.clock.time()
+
+
+async def simulate(clock, hours, seed, mean_visitor_gap):
+    rng = random.Random(seed)
+    client = AudioClient(clock=clock)
+    client.behavior_manager.rng = rng
+    client.behavior_manager.schedulers.clear()
+    client.openai = SimulatedUpstream(client, rng)
+    client.active_audio_connections.add(object())  # One parrot connected all day
+
+    tasks = [
+        asyncio.create_task(client.manage_autonomous_behaviors()),
+        asyncio.create_task(client.manage_speaking_state()),
+        asyncio.create_task(visitors(client, rng, mean_visitor_gap))
+    ]
+    await asyncio.sleep(hours * 3600)
+    client.running = False
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    client.p.terminate()
+    return client.openai.prompts, clock.elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulate a day of autonomous behaviors in virtual time')
+    parser.add_argument('--hours', type=float, default=8.0, help='Simulated hours per run')
+    parser.add_argument('--runs', type=int, default=3, help='Independent runs (different seeds)')
+    parser.add_argument('--visitor-gap', type=float, default=900.0, help='Mean seconds between visitors')
+    parser.add_argument('--verbose', action='store_true', help="Show the server's own log output")
+    args = parser.parse_args()
+
+    print(f"Simulated day benchmark: {args.hours:.1f}h x {args.runs} runs")
+    print("=" * 60)
+    for seed in range(args.runs):
+        start = time.perf_counter()
+        output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+        with output:
+            clock = VirtualClock()
+            prompts, simulated = clock.run(simulate(clock, args.hours, seed, args.visitor_gap))
+        wall = time.perf_counter() - start
+        counts = Counter(text for _, text in prompts)
+        summary = ", ".join(f"{text.split(': ', 1)[-1][:24]!r} x{n}" for text, n in counts.most_common(3))
+        print(f"seed {seed}: {len(prompts):4d} behaviors in {simulated / 3600:.1f}h simulated, "
+              f"{wall:.2f}s wall ({simulated / wall:,.0f}x real time) - {summary}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark for speaker loudness normalization and limiting
+Feeds synthetic replies at very different levels through LoudnessNormalizer
+in realtime-API-sized chunks and reports output loudness spread, peaks
+against the ceiling, how much the firmware's 2x gain would clip, and the
+per-chunk processing cost
+"""
+import argparse
+import time
+
+import numpy as np
+
+from speaker_dsp import LoudnessNormalizer
+
+SAMPLE_RATE = 24000
+
+
+def synthetic_reply(seconds, dbfs, seed):
+    """Voiced harmonics under a syllable-rate envelope with gaps, scaled to an RMS level"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    pitch = 140 + 40 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 8)) + 0.2 * rng.standard_normal(t.size)
+    envelope = np.clip(np.sin(2 * np.pi * 4 * t), 0, None) * (np.sin(2 * np.pi * 0.4 * t) > -0.6)
+    audio = voiced * envelope
+    audio *= 32768 * 10 ** (dbfs / 20) / np.sqrt(np.mean(audio ** 2))
+    return np.clip(audio, -32768, 32767).astype(np.int16)
+
+
+def rms_dbfs(samples):
+    return 20 * np.log10(np.sqrt(np.mean(samples.astype(np.float64) ** 2)) / 32768 + 1e-12)
+
+
+def firmware_clipped(samples):
+    """Fraction of samples the firmware's 2x gain would clamp"""
+    return float(np.mean(np.abs(samples.astype(np.int32) * 2) > 32767))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark speaker loudness normalization')
+    parser.add_argument('--seconds', type=float, default=6.0, help='Length of each synthetic reply')
+    parser.add_argument('--chunk-ms', type=float, default=100.0, help='Delta size from the realtime API')
+    args = parser.parse_args()
+
+    chunk = int(SAMPLE_RATE * args.chunk_ms / 1000)
+    normalizer = LoudnessNormalizer(sample_rate=SAMPLE_RATE)
+    print(f"Speaker level benchmark: {args.seconds:.0f}s replies in {args.chunk_ms:.0f}ms chunks, "
+          f"latency {normalizer.stats()['latency_ms']:.1f}ms")
+    print("=" * 60)
+
+    inputs, outputs, timings = [], [], []
+    for seed, level in enumerate((-38, -30, -22, -14, -6)):
+        reply = synthetic_reply(args.seconds, level, seed)
+        out = []
+        for i in range(0, len(reply), chunk):
+            start = time.perf_counter()
+            out.append(normalizer.process_array(reply[i:i + chunk]))
+            timings.append(time.perf_counter() - start)
+        out.append(np.frombuffer(normalizer.flush(), dtype=np.int16))
+        out = np.concatenate(out)
+        settled = out[len(out) // 3:]  # After the gain has adapted to the new voice
+        inputs.append(rms_dbfs(reply))
+        outputs.append(rms_dbfs(settled))
+        print(f"input {rms_dbfs(reply):6.1f} dBFS (2x clips {firmware_clipped(reply):6.2%}) -> "
+              f"output {rms_dbfs(settled):6.1f} dBFS, peak {20 * np.log10(np.abs(out).max() / 32768):5.1f} dBFS "
+              f"(2x clips {firmware_clipped(out):6.2%})")
+
+    timings = np.array(timings) * 1e6
+    print("-" * 60)
+    print(f"loudness spread: input {max(inputs) - min(inputs):.1f} dB -> output {max(outputs) - min(outputs):.1f} dB")
+    print(f"per chunk: p50 {np.percentile(timings, 50):.0f} us, p99 {np.percentile(timings, 99):.0f} us "
+          f"({np.mean(timings) / (args.chunk_ms * 10):.2f}% of realtime)")
+
+
+if __name__ == "__main__":
+    main()
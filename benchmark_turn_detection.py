@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark for client-side end-of-turn detection
+Simulates speakers whose mid-turn pauses follow different distributions and
+whose voices fade at the end of a turn, feeds 40ms frames through
+TurnDetector at several aggressiveness settings, and reports the silence
+waited per turn (vs the server VAD's fixed 650ms) and the premature cut-off rate
+"""
+import argparse
+
+import numpy as np
+
+from turn_detector import TurnDetector, COMMIT
+
+FRAME_MS = 40.0
+SERVER_SILENCE_MS = 650.0
+
+
+def speaker_frames(rng, turns, pause_ms_mean, pause_ms_sd):
+    """Yield (voiced, level, is_turn_end) frames for a speaker taking turns"""
+    for _ in range(turns):
+        phrases = rng.integers(1, 4)
+        for phrase in range(phrases):
+            words = int(rng.uniform(0.8, 2.5) * 1000 / FRAME_MS)
+            final = phrase == phrases - 1
+            for i in range(words):
+                fade = 1.0 - 0.8 * max(0, i - words + 6) / 6 if final else 1.0  # Sentences trail off
+                yield True, 3000.0 * fade * rng.uniform(0.8, 1.2), False
+            if final:
+                break
+            pause = max(FRAME_MS, rng.normal(pause_ms_mean, pause_ms_sd))
+            for _ in range(int(pause / FRAME_MS)):
+                yield False, 200.0, False
+        # The reply: the parrot talks, the mic path is paused, then a gap before the next turn
+        yield None, 0.0, True
+        for _ in range(int(rng.uniform(1500, 4000) / FRAME_MS)):
+            yield False, 200.0, False
+
+
+def run(aggressiveness, pause_mean, pause_sd, turns, seed):
+    rng = np.random.default_rng(seed)
+    detector = TurnDetector(aggressiveness=aggressiveness, max_silence_ms=SERVER_SILENCE_MS)
+
+    def process(voiced, level):
+        # Every commit goes upstream here, as it does with one device and headroom to spare
+        event = detector.process(voiced, level, FRAME_MS)
+        if event == COMMIT:
+            detector.on_commit_sent()
+        return event
+
+    for voiced, level, turn_end in speaker_frames(rng, turns, pause_mean, pause_sd):
+        if turn_end:
+            # If nothing committed yet, the turn would still end at the server window
+            silence = 0.0
+            while process(False, 200.0) != COMMIT:
+                silence += FRAME_MS
+                if silence > SERVER_SILENCE_MS:
+                    break
+            detector.on_reply()
+            continue
+        process(voiced, level)
+    return detector.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark client-side end-of-turn detection')
+    parser.add_argument('--turns', type=int, default=300, help='Turns per simulated speaker')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    args = parser.parse_args()
+
+    speakers = {"brisk": (220, 60), "typical": (350, 100), "hesitant": (520, 150)}
+    print(f"Turn detection benchmark: {args.turns} turns per speaker, {FRAME_MS:.0f}ms frames, "
+          f"server VAD waits {SERVER_SILENCE_MS:.0f}ms")
+    print("=" * 60)
+    for name, (mean, sd) in speakers.items():
+        for aggressiveness in (0.0, 0.5, 1.0):
+            stats = run(aggressiveness, mean, sd, args.turns, args.seed)
+            waited = SERVER_SILENCE_MS - stats["latency_saved_ms_per_turn"]
+            print(f"{name:9} pauses ~{mean:3d}ms, aggressiveness {aggressiveness:.1f} - "
+                  f"waits {waited:5.0f}ms/turn (saves {stats['latency_saved_ms_per_turn']:5.0f}ms), "
+                  f"cut-offs {stats['cut_off_rate']:6.1%}, learned threshold {stats['threshold_ms']:.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
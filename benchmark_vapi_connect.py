@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Benchmark for VAPI backend connect latency
+Runs a local stand-in for the VAPI call API and call WebSocket, then times
+connect/disconnect cycles with per-request sessions, a pooled session, and a
+pooled session with pre-created calls. New TCP connections to the stand-in
+pay --setup-ms to emulate the DNS + TLS cost of the real API.
+"""
+import argparse
+import asyncio
+import itertools
+import time
+
+import numpy as np
+from aiohttp import web
+
+from vapi_backend import VAPIBackend
+
+
+def make_stand_in(api_delay, setup_delay):
+    """aiohttp app imitating POST /call, DELETE /call/{id} and the call WebSocket"""
+    ids = itertools.count(1)
+    seen_transports = set()
+
+    @web.middleware
+    async def connection_setup(request, handler):
+        transport = id(request.transport)
+        if transport not in seen_transports:
+            seen_transports.add(transport)
+            await asyncio.sleep(setup_delay)
+        return await handler(request)
+
+    async def create_call(request):
+        await asyncio.sleep(api_delay)
+        call_id = f"call-{next(ids)}"
+        host = request.host
+        return web.json_response({"id": call_id, "websocket_url": f"ws://{host}/ws/{call_id}"})
+
+    async def end_call(request):
+        await asyncio.sleep(api_delay)
+        return web.json_response({"ended": request.match_info["call_id"]})
+
+    async def call_socket(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        async for _ in ws:
+            pass
+        return ws
+
+    app = web.Application(middlewares=[connection_setup])
+    app.router.add_post("/call", create_call)
+    app.router.add_delete("/call/{call_id}", end_call)
+    app.router.add_get("/ws/{call_id}", call_socket)
+    return app
+
+
+class PerRequestSessionBackend(VAPIBackend):
+    """The original behavior: a new HTTP session per request, calls ended inline"""
+
+    async def _drop_session(self):
+        if self._http is not None:
+            await self._http.close()
+            self._http = None
+
+    async def _request_call(self):
+        try:
+            return await super()._request_call()
+        finally:
+            await self._drop_session()
+
+    async def _end_call(self, call_id):
+        try:
+            await super()._end_call(call_id)
+        finally:
+            await self._drop_session()
+
+    async def disconnect(self):
+        if self.ws:
+            await self.ws.close()
+            self.is_connected = False
+        if self.call_id:
+            await self._end_call(self.call_id)
+            self.call_id = None
+
+
+async def run(mode, cycles, base_url):
+    config = {"api_key": "bench", "assistant_id": "bench", "base_url": base_url,
+              "precreate_call": mode == "precreated"}
+    backend_cls = PerRequestSessionBackend if mode == "per-request" else VAPIBackend
+    backend = backend_cls(config)
+    backend.prepare()
+    await asyncio.sleep(0.5)  # Let a pre-created call land, as it would between conversations
+
+    connects, disconnects = [], []
+    for _ in range(cycles):
+        start = time.perf_counter()
+        await backend.connect()
+        connects.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await backend.disconnect()
+        disconnects.append(time.perf_counter() - start)
+        await asyncio.sleep(0.2)  # Idle gap between conversations
+    await backend.close()
+    return np.array(connects) * 1000, np.array(disconnects) * 1000
+
+
+async def main_async(args):
+    runner = web.AppRunner(make_stand_in(args.api_ms / 1000.0, args.setup_ms / 1000.0))
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", args.port)
+    await site.start()
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    print(f"VAPI connect benchmark: {args.cycles} cycles, API {args.api_ms:.0f}ms, "
+          f"connection setup {args.setup_ms:.0f}ms")
+    print("=" * 60)
+    try:
+        for mode in ("per-request", "pooled", "precreated"):
+            connects, disconnects = await run(mode, args.cycles, base_url)
+            print(f"{mode:12} - connect p50 {np.percentile(connects, 50):6.1f} ms, "
+                  f"p95 {np.percentile(connects, 95):6.1f} ms | "
+                  f"disconnect p50 {np.percentile(disconnects, 50):6.1f} ms")
+    finally:
+        await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark VAPI backend connect latency')
+    parser.add_argument('--cycles', type=int, default=20, help='Connect/disconnect cycles per mode')
+    parser.add_argument('--api-ms', type=float, default=80.0, help='Stand-in API processing time')
+    parser.add_argument('--setup-ms', type=float, default=120.0, help='Emulated DNS + TLS cost per new connection')
+    parser.add_argument('--port', type=int, default=8765, help='Port for the local stand-in')
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
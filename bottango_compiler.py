@@ -0,0 +1,243 @@
+"""Compiles high-level parrot gestures into batched Bottango curve commands"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+# Mirrors BottangoArduinoConfig.h / src/AbstractEffector.h in ParrotDriver
+COMPRESSED_SIGNAL_MAX = 8192  # Curve positions are sent as 0..COMPRESSED_SIGNAL_MAX
+MAX_COMMAND_LENGTH = 100      # Longest command (including hash) the driver accepts
+MAX_CURVES_PER_EFFECTOR = 8   # MAX_NUM_CURVES: curves an effector holds at once
+
+GESTURE_HEADER = "gesture"    # First line of a batch: "gesture,<duration ms>"
+
+
+@dataclass(frozen=True)
+class ServoBounds:
+    pin: int
+    min_signal: int           # Pulse width (us) at position 0
+    max_signal: int           # Pulse width (us) at position 1
+    max_signal_per_sec: int   # Bottango speed limit
+    rest: float               # Neutral position, 0..1
+
+    @property
+    def identifier(self) -> str:
+        # PinServoEffector identifies itself by its pin number
+        return str(self.pin)
+
+    def min_duration_ms(self, start: float, end: float) -> int:
+        """Shortest time the servo can travel between two positions"""
+        signal_delta = abs(end - start) * (self.max_signal - self.min_signal)
+        return int(-(-signal_delta * 1000 // self.max_signal_per_sec))
+
+
+# Signal bounds registered with rSVPin in ParrotDriver.ino
+PARROT_SERVOS: Dict[str, ServoBounds] = {
+    "head_tilt": ServoBounds(pin=5, min_signal=850, max_signal=2100, max_signal_per_sec=3000, rest=0.5),
+    "mouth": ServoBounds(pin=6, min_signal=1450, max_signal=1700, max_signal_per_sec=3000, rest=1.0),  # 1 = closed
+    "wing": ServoBounds(pin=3, min_signal=1500, max_signal=2000, max_signal_per_sec=3000, rest=0.05),
+    "head_rotation": ServoBounds(pin=8, min_signal=1140, max_signal=1860, max_signal_per_sec=5000, rest=0.5),
+}
+
+# Bezier control point fractions (x along the segment) for each easing
+EASINGS = {
+    "linear": (1 / 3, 1 / 3),
+    "ease_in_out": (0.42, 0.0),
+    "ease_out": (0.0, 0.0),
+}
+
+
+@dataclass(frozen=True)
+class Segment:
+    """One servo moving between two positions over a time span"""
+    servo: str
+    start_ms: int
+    duration_ms: int
+    start: float
+    end: float
+    easing: str = "ease_in_out"
+
+
+@dataclass(frozen=True)
+class Gesture:
+    """A named, hashable set of servo segments (usable as a cache key)"""
+    name: str
+    segments: Tuple[Segment, ...]
+
+    @property
+    def duration_ms(self) -> int:
+        return max((s.start_ms + s.duration_ms for s in self.segments), default=0)
+
+    def shifted(self, offset_ms: int) -> "Gesture":
+        return Gesture(self.name, tuple(
+            Segment(s.servo, s.start_ms + offset_ms, s.duration_ms, s.start, s.end, s.easing)
+            for s in self.segments
+        ))
+
+
+def _moves(servo: str, positions: List[float], step_ms: int, start_ms: int = 0,
+           easing: str = "ease_in_out") -> Tuple[Segment, ...]:
+    """Segments visiting each position in turn, step_ms apart"""
+    return tuple(
+        Segment(servo, start_ms + i * step_ms, step_ms, positions[i], positions[i + 1], easing)
+        for i in range(len(positions) - 1)
+    )
+
+
+def head_turn(direction: float, duration_ms: int = 600, hold_ms: int = 800) -> Gesture:
+    """Look left (-1) or right (+1) and come back to center"""
+    rest = PARROT_SERVOS["head_rotation"].rest
+    target = min(1.0, max(0.0, rest + 0.5 * direction))
+    segments = (
+        Segment("head_rotation", 0, duration_ms, rest, target),
+        Segment("head_rotation", duration_ms + hold_ms, duration_ms, target, rest),
+    )
+    return Gesture(f"head_turn({direction:+.2f})", segments)
+
+
+def wing_flap(count: int = 2, amplitude: float = 0.8, period_ms: int = 300) -> Gesture:
+    """Flap the wing count times"""
+    rest = PARROT_SERVOS["wing"].rest
+    peak = min(1.0, rest + amplitude)
+    positions = [rest] + [peak, rest] * count
+    return Gesture(f"wing_flap({count},{amplitude:.2f})", _moves("wing", positions, period_ms // 2))
+
+
+def nod(count: int = 2, depth: float = 0.3, period_ms: int = 400) -> Gesture:
+    """Nod the head count times"""
+    rest = PARROT_SERVOS["head_tilt"].rest
+    low = max(0.0, rest - depth)
+    positions = [rest] + [low, rest] * count
+    return Gesture(f"nod({count},{depth:.2f})", _moves("head_tilt", positions, period_ms // 2))
+
+
+def sequence(*gestures: Gesture, gap_ms: int = 0) -> Gesture:
+    """Play gestures one after another"""
+    segments = []
+    offset = 0
+    for gesture in gestures:
+        segments.extend(gesture.shifted(offset).segments)
+        offset += gesture.duration_ms + gap_ms
+    return Gesture("+".join(g.name for g in gestures), tuple(segments))
+
+
+def together(*gestures: Gesture) -> Gesture:
+    """Play gestures at the same time"""
+    return Gesture("&".join(g.name for g in gestures),
+                   tuple(s for g in gestures for s in g.segments))
+
+
+# Gestures the server can trigger by name (POST /gesture/<name>)
+GESTURES = {
+    "look_left": lambda: head_turn(-1.0),
+    "look_right": lambda: head_turn(1.0),
+    "wing_flap": wing_flap,
+    "nod": nod,
+}
+
+
+def with_checksum(command: str) -> str:
+    """Append the Bottango hash (sum of the command's characters)"""
+    return f"{command},h{sum(map(ord, command))}"
+
+
+@dataclass(frozen=True)
+class CompiledGesture:
+    name: str
+    duration_ms: int
+    commands: Tuple[str, ...]
+    batch: str  # One text frame, newline-separated
+
+    @property
+    def curve_count(self) -> int:
+        return sum(1 for c in self.commands if c.startswith("sC,"))
+
+
+class GestureCompiler:
+    """Compiles gestures to checksummed Bottango batches with an LRU cache
+
+    Each segment becomes a single sC Bezier curve instead of a stream of sCI
+    instant sets. Positions are clamped to 0..1 of the servo's registered
+    signal range, segments too fast for the servo's speed limit are
+    stretched (pushing that servo's later segments back so curves never
+    overlap), and a batch starts by clearing old curves and resetting the
+    driver clock so curve start times are relative to the batch's arrival.
+    """
+
+    def __init__(self, servos: Dict[str, ServoBounds] = None, cache_size: int = 128):
+        self.servos = servos or PARROT_SERVOS
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Gesture, CompiledGesture]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def compile(self, gesture: Gesture) -> CompiledGesture:
+        compiled = self._cache.get(gesture)
+        if compiled is not None:
+            self.hits += 1
+            self._cache.move_to_end(gesture)
+            return compiled
+
+        self.misses += 1
+        compiled = self._compile(gesture)
+        self._cache[gesture] = compiled
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return compiled
+
+    def _compile(self, gesture: Gesture) -> CompiledGesture:
+        curves_per_servo: Dict[str, int] = {}
+        free_at: Dict[str, int] = {}  # When each servo's last curve ends
+        commands = [with_checksum("xC"), with_checksum("tSYN,0")]
+        duration = 0
+
+        for segment in sorted(gesture.segments, key=lambda s: s.start_ms):
+            bounds = self.servos.get(segment.servo)
+            if bounds is None:
+                raise ValueError(f"Unknown servo '{segment.servo}' in gesture {gesture.name}")
+
+            count = curves_per_servo.get(segment.servo, 0) + 1
+            if count > MAX_CURVES_PER_EFFECTOR:
+                raise ValueError(f"Gesture {gesture.name} needs {count} curves on {segment.servo}; "
+                                 f"the driver holds {MAX_CURVES_PER_EFFECTOR}")
+            curves_per_servo[segment.servo] = count
+
+            start = min(1.0, max(0.0, segment.start))
+            end = min(1.0, max(0.0, segment.end))
+            span = max(segment.duration_ms, bounds.min_duration_ms(start, end), 1)
+            start_ms = max(segment.start_ms, free_at.get(segment.servo, 0))
+            free_at[segment.servo] = start_ms + span
+            commands.append(self._curve_command(bounds, start_ms, span, start, end, segment.easing))
+            duration = max(duration, start_ms + span)
+
+        batch = "\n".join([f"{GESTURE_HEADER},{duration}"] + commands)
+        return CompiledGesture(gesture.name, duration, tuple(commands), batch)
+
+    @staticmethod
+    def _curve_command(bounds: ServoBounds, start_ms: int, duration_ms: int,
+                       start: float, end: float, easing: str) -> str:
+        control_x, control_y = EASINGS.get(easing, EASINGS["ease_in_out"])
+        start_y = int(round(start * COMPRESSED_SIGNAL_MAX))
+        end_y = int(round(end * COMPRESSED_SIGNAL_MAX))
+        delta = end_y - start_y
+
+        # Control x is relative to the segment's start/end; control y is an offset from start/end y
+        start_control_x = int(round(duration_ms * control_x))
+        start_control_y = int(round(delta * control_y))
+        end_control_x = -start_control_x
+        end_control_y = -start_control_y
+
+        command = with_checksum(
+            f"sC,{bounds.identifier},{start_ms},{duration_ms},{start_y},{start_control_x},"
+            f"{start_control_y},{end_y},{end_control_x},{end_control_y}"
+        )
+        if len(command) >= MAX_COMMAND_LENGTH:
+            raise ValueError(f"Command too long for the driver: {command}")
+        return command
+
+    def stats(self) -> dict:
+        return {
+            "cached": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses
+        }
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""Record upstream realtime traffic to cassettes and replay it from a local stand-in
+
+A cassette is a gzip-compressed JSON-lines file. The first line is a header;
+every other line is one WebSocket message: [offset_ms, direction, kind, data]
+where direction is "s" (we sent) or "r" (we received), kind is "t" for text
+or "b" for binary (base64 data), and offset_ms counts from the connection.
+"""
+
+import argparse
+import asyncio
+import base64
+import gzip
+import json
+import os
+import time
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+import websockets
+
+CASSETTE_VERSION = 1
+SENT = "s"
+RECEIVED = "r"
+
+
+class CassetteRecorder:
+    """Appends timestamped messages to a cassette file"""
+
+    def __init__(self, path: str, backend: str = "openai", url: str = ""):
+        self.path = path
+        self.started = time.monotonic()
+        self.count = 0
+        self._file = gzip.open(path, "wt", encoding="utf-8", compresslevel=6)
+        self._write({"cassette": CASSETTE_VERSION, "backend": backend, "url": url,
+                     "created": datetime.now().isoformat()})
+
+    def _write(self, entry):
+        self._file.write(json.dumps(entry, separators=(",", ":")))
+        self._file.write("\n")
+
+    def record(self, direction: str, message, at: Optional[float] = None):
+        """Append a message; at overrides its offset in seconds (for synthesized cassettes)"""
+        if self._file is None:
+            return
+        if at is None:
+            at = time.monotonic() - self.started
+        offset = round(at * 1000.0, 1)
+        if isinstance(message, (bytes, bytearray, memoryview)):
+            self._write([offset, direction, "b", base64.b64encode(message).decode()])
+        else:
+            self._write([offset, direction, "t", message])
+        self.count += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class RecordingSocket:
+    """Wraps a websockets connection, recording every message that passes through"""
+
+    def __init__(self, ws, recorder: CassetteRecorder):
+        self.ws = ws
+        self.recorder = recorder
+
+    async def send(self, message):
+        self.recorder.record(SENT, message)
+        await self.ws.send(message)
+
+    async def recv(self):
+        message = await self.ws.recv()
+        self.recorder.record(RECEIVED, message)
+        return message
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return await self.recv()
+        except websockets.exceptions.ConnectionClosedOK:
+            raise StopAsyncIteration
+
+    async def close(self):
+        try:
+            await self.ws.close()
+        finally:
+            self.recorder.close()
+
+    def __getattr__(self, name):
+        return getattr(self.ws, name)
+
+
+def recording_path(record_dir: str, backend: str) -> str:
+    os.makedirs(record_dir, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    return os.path.join(record_dir, f"{backend}_{stamp}.cassette.gz")
+
+
+def wrap_for_recording(ws, record_dir: Optional[str], backend: str, url: str = ""):
+    """Return ws wrapped to record into a new cassette in record_dir, or ws unchanged"""
+    if not record_dir:
+        return ws
+    recorder = CassetteRecorder(recording_path(record_dir, backend), backend=backend, url=url)
+    print(f"Recording {backend} traffic to {recorder.path}")
+    return RecordingSocket(ws, recorder)
+
+
+def load_cassette(path: str) -> Tuple[dict, List[list]]:
+    """Read a cassette into (header, messages)"""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        header = json.loads(f.readline())
+        messages = [json.loads(line) for line in f if line.strip()]
+    return header, messages
+
+
+def _decode(entry):
+    _, _, kind, data = entry
+    return base64.b64decode(data) if kind == "b" else data
+
+
+class CassetteServer:
+    """Local WebSocket stand-in that plays a cassette's received side to each client
+
+    speed scales the recorded gaps (2.0 = twice as fast, 0 = as fast as
+    possible) and max_gap caps any single wait, which squeezes out long
+    silences while keeping bursts like audio deltas realistic. Messages the
+    client sends are read and counted but not checked.
+    """
+
+    def __init__(self, path: str, speed: float = 1.0, max_gap: Optional[float] = None):
+        self.header, messages = load_cassette(path)
+        self.replies = [(entry[0] / 1000.0, _decode(entry)) for entry in messages if entry[1] == RECEIVED]
+        self.expected_sent = sum(1 for entry in messages if entry[1] == SENT)
+        self.speed = speed
+        self.max_gap = max_gap
+        self.sessions = 0
+        self.client_messages = 0
+        self._server = None
+
+    def schedule(self) -> List[float]:
+        """Send times (seconds from connect) for each reply under the timing options"""
+        times, now, previous = [], 0.0, 0.0
+        for offset, _ in self.replies:
+            gap = max(offset - previous, 0.0)
+            previous = max(offset, previous)
+            if self.speed > 0:
+                gap /= self.speed
+            else:
+                gap = 0.0
+            if self.max_gap is not None:
+                gap = min(gap, self.max_gap)
+            now += gap
+            times.append(now)
+        return times
+
+    async def _drain(self, ws):
+        try:
+            async for _ in ws:
+                self.client_messages += 1
+        except websockets.exceptions.ConnectionClosed:
+            pass
+
+    async def _handler(self, ws, *args):
+        self.sessions += 1
+        reader = asyncio.create_task(self._drain(ws))
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        try:
+            for send_at, (_, message) in zip(self.schedule(), self.replies):
+                delay = start + send_at - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                await ws.send(message)
+            await ws.close()
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            await reader
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start serving; returns the ws:// URL to point a client at"""
+        self._server = await websockets.serve(self._handler, host, port, max_size=None)
+        port = self._server.sockets[0].getsockname()[1]
+        return f"ws://{host}:{port}"
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+
+def describe(path: str) -> str:
+    header, messages = load_cassette(path)
+    sent = [m for m in messages if m[1] == SENT]
+    received = [m for m in messages if m[1] == RECEIVED]
+    duration = messages[-1][0] / 1000.0 if messages else 0.0
+    types = {}
+    for entry in received:
+        if entry[2] == "t":
+            event_type = json.loads(entry[3]).get("type", "?")
+            types[event_type] = types.get(event_type, 0) + 1
+    lines = [f"{path}: {header.get('backend')} recorded {header.get('created')}",
+             f"  {len(sent)} sent, {len(received)} received over {duration:.1f}s "
+             f"({os.path.getsize(path) / 1024:.0f} KiB)"]
+    lines += [f"  {count:6d} {event_type}" for event_type, count in sorted(types.items(), key=lambda kv: -kv[1])]
+    return "\n".join(lines)
+
+
+async def _serve_forever(args):
+    server = CassetteServer(args.cassette, speed=args.speed, max_gap=args.max_gap)
+    url = await server.start(port=args.port)
+    print(f"Replaying {args.cassette} at {url} (speed {args.speed}, max gap {args.max_gap})")
+    print(f"Point the server at it with OPENAI_REALTIME_URL={url}")
+    await asyncio.Future()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect or replay realtime traffic cassettes')
+    sub = parser.add_subparsers(dest='command', required=True)
+    info = sub.add_parser('info', help='Summarize a cassette')
+    info.add_argument('cassette')
+    serve = sub.add_parser('serve', help='Serve a cassette from a local WebSocket stand-in')
+    serve.add_argument('cassette')
+    serve.add_argument('--port', type=int, default=9100, help='Port to listen on')
+    serve.add_argument('--speed', type=float, default=1.0, help='Timing multiplier (0 = no waits)')
+    serve.add_argument('--max-gap', type=float, default=None, help='Cap on any single wait in seconds')
+    args = parser.parse_args()
+
+    if args.command == 'info':
+        print(describe(args.cassette))
+    else:
+        asyncio.run(_serve_forever(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Injectable clocks: real time, or simulated time that skips idle waits"""
+
+import asyncio
+import selectors
+import time
+
+
+class SystemClock:
+    """Wall-clock time and real sleeps"""
+
+    def time(self) -> float:
+        return time.time()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    async def sleep(self, seconds: float):
+        await asyncio.sleep(seconds)
+
+
+class VirtualClock(SystemClock):
+    """Simulated time driven by a VirtualTimeEventLoop
+
+    time() and monotonic() advance only when the loop has nothing ready to
+    run and jumps to its next timer, so an eight-hour day of sleeps, cooldowns
+    and silence timeouts runs as fast as the code between them. sleep() is
+    plain asyncio.sleep: the loop's own clock is the virtual one.
+    """
+
+    def __init__(self, start: float = 1_700_000_000.0):
+        self.start = start
+        self.elapsed = 0.0
+
+    def time(self) -> float:
+        return self.start + self.elapsed
+
+    def monotonic(self) -> float:
+        return self.elapsed
+
+    def advance(self, seconds: float):
+        if seconds > 0:
+            self.elapsed += seconds
+
+    def new_event_loop(self) -> "VirtualTimeEventLoop":
+        return VirtualTimeEventLoop(self)
+
+    def run(self, coro):
+        """asyncio.run() in simulated time"""
+        with asyncio.Runner(loop_factory=self.new_event_loop) as runner:
+            return runner.run(coro)
+
+
+class _VirtualSelector(selectors.DefaultSelector):
+    """Polls real I/O without blocking, and fast-forwards the clock instead of waiting"""
+
+    def __init__(self, clock: VirtualClock):
+        super().__init__()
+        self.clock = clock
+
+    def select(self, timeout=None):
+        events = super().select(0)
+        if events or timeout == 0:
+            return events
+        if timeout is None:
+            # Nothing scheduled: only real I/O can make progress
+            return super().select(None)
+        self.clock.advance(timeout)
+        return []
+
+
+class VirtualTimeEventLoop(asyncio.SelectorEventLoop):
+    """Event loop whose time() is a VirtualClock"""
+
+    def __init__(self, clock: VirtualClock):
+        super().__init__(_VirtualSelector(clock))
+        self.clock = clock
+
+    def time(self) -> float:
+        return self.clock.monotonic()
@@ -1,6 +1,7 @@
 """Configuration for voice backends"""
 
 import os
+import json
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -8,6 +9,11 @@ load_dotenv()
 # Voice backend selection: 'openai' or 'vapi'
 VOICE_BACKEND = os.getenv('VOICE_BACKEND', 'openai').lower()
 
+# Upstream traffic recording, shared by every backend (cassette.py replays the files offline); empty: don't record
+PARROT_RECORD_DIR = os.getenv('PARROT_RECORD_DIR', '')
+# Point at a local cassette replay server instead of the real API
+OPENAI_REALTIME_URL = os.getenv('OPENAI_REALTIME_URL')
+
 # OpenAI Configuration
 OPENAI_CONFIG = {
     'api_key': os.getenv('OPENAI_API_KEY'),
@@ -25,7 +31,9 @@ Key personality:
 - You're a companion, not an entertainer
 
 Focus on them, not yourself. Be helpful and attentive.""",
-    'tools': []
+    'tools': [],
+    'realtime_url': OPENAI_REALTIME_URL,
+    'record_dir': PARROT_RECORD_DIR
 }
 
 # VAPI Configuration
@@ -33,6 +41,11 @@ VAPI_CONFIG = {
     'api_key': os.getenv('VAPI_API_KEY'),
     'public_key': os.getenv('VAPI_PUBLIC_KEY'),
     'assistant_id': os.getenv('VAPI_ASSISTANT_ID'),
+    'base_url': os.getenv('VAPI_BASE_URL', 'https://api.vapi.ai'),
+    # Keep a call created ahead of time so connect only opens the WebSocket
+    'precreate_call': os.getenv('VAPI_PRECREATE_CALL', 'false').lower() == 'true',
+    'precreated_call_ttl': float(os.getenv('VAPI_PRECREATED_CALL_TTL', '60')),
+    'record_dir': PARROT_RECORD_DIR,
     # Optional: Override assistant settings
     'assistant_config': {
         'voice': {
@@ -60,6 +73,182 @@ AUDIO_CONFIG = {
     'format': 'pcm16'
 }
 
+# Local silence gate on the upstream mic path
+SILENCE_GATE_CONFIG = {
+    'enabled': os.getenv('SILENCE_GATE_ENABLED', 'true').lower() == 'true',
+    'pre_roll_ms': float(os.getenv('SILENCE_GATE_PRE_ROLL_MS', '500')),  # Matches server VAD prefix_padding_ms
+    'hangover_ms': float(os.getenv('SILENCE_GATE_HANGOVER_MS', '1000'))  # Must exceed server VAD silence_duration_ms
+}
+
+# Mic DSP chain applied to ESP32 audio before it goes upstream
+MIC_DSP_CONFIG = {
+    'enabled': os.getenv('MIC_DSP_ENABLED', 'true').lower() == 'true',
+    'highpass_hz': float(os.getenv('MIC_DSP_HIGHPASS_HZ', '100')),
+    'hum_hz': float(os.getenv('MIC_DSP_HUM_HZ', '60')),  # 50 in most of Europe/Asia, 0 disables
+    'agc_target_dbfs': float(os.getenv('MIC_DSP_AGC_TARGET_DBFS', '-26')),
+    'agc_max_gain': float(os.getenv('MIC_DSP_AGC_MAX_GAIN', '8')),
+    'noise_reduction': os.getenv('MIC_DSP_NOISE_REDUCTION', 'false').lower() == 'true',
+    'workers': int(os.getenv('MIC_DSP_WORKERS', '0'))  # Worker processes for DSP; 0 runs it on the event loop
+}
+
+# Speaker flow control: audio queued ahead on the device (bounds interruption latency)
+SPEAKER_FLOW_CONFIG = {
+    'target_ms': float(os.getenv('SPEAKER_TARGET_BUFFER_MS', '200'))
+}
+
+
+def _json_object_env(name):
+    """A JSON object from the environment; anything malformed is ignored with a warning"""
+    raw = os.getenv(name, '{}')
+    try:
+        value = json.loads(raw)
+    except ValueError as e:
+        print(f"Warning: ignoring {name}, not valid JSON ({e})")
+        return {}
+    if not isinstance(value, dict):
+        print(f"Warning: ignoring {name}, expected a JSON object")
+        return {}
+    return value
+
+
+def _speaker_chunk_devices():
+    """SPEAKER_CHUNK_DEVICES with unknown keys and non-numeric sizes dropped, each with a warning"""
+    devices = {}
+    for device_id, sizes in _json_object_env('SPEAKER_CHUNK_DEVICES').items():
+        if not isinstance(sizes, dict):
+            print(f"Warning: ignoring SPEAKER_CHUNK_DEVICES entry for {device_id}, expected a JSON object")
+            continue
+        devices[device_id] = {}
+        for key, value in sizes.items():
+            if key not in ('min_bytes', 'max_bytes', 'fast_start_ms'):
+                print(f"Warning: ignoring SPEAKER_CHUNK_DEVICES {device_id}.{key}, not a chunk size")
+            elif isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+                print(f"Warning: ignoring SPEAKER_CHUNK_DEVICES {device_id}.{key}, expected a positive number")
+            else:
+                devices[device_id][key] = value
+    return devices
+
+
+# Downlink frame sizing: small frames for a fast first syllable, growing as the device buffer fills
+SPEAKER_CHUNK_CONFIG = {
+    'min_bytes': int(os.getenv('SPEAKER_CHUNK_MIN_BYTES', '960')),  # 20ms at 24kHz
+    'max_bytes': int(os.getenv('SPEAKER_CHUNK_MAX_BYTES', '4096')),
+    'fast_start_ms': float(os.getenv('SPEAKER_CHUNK_FAST_START_MS', '60')),
+    # Per-device overrides keyed by device address, e.g. {"192.168.1.50": {"max_bytes": 2048}}
+    'devices': _speaker_chunk_devices()
+}
+
+# Close the upstream session after a quiet spell; local VAD reopens it (autonomous behaviors pause meanwhile)
+HIBERNATION_CONFIG = {
+    'enabled': os.getenv('HIBERNATION_ENABLED', 'true').lower() == 'true',
+    'idle_timeout': float(os.getenv('HIBERNATE_AFTER_SECONDS', '300')),
+    'wake_buffer_ms': float(os.getenv('HIBERNATION_WAKE_BUFFER_MS', '3000'))  # Speech held while the session reopens
+}
+
+# Mic level metering when the DSP chain is off: frames from all devices are measured in one batch per tick
+MIC_LEVEL_CONFIG = {
+    'batched': os.getenv('MIC_LEVEL_BATCHED', 'true').lower() == 'true',
+    'tick_ms': float(os.getenv('MIC_LEVEL_TICK_MS', '5')),  # Devices aren't in step, so a batch needs a window to fill
+    'min_devices': int(os.getenv('MIC_LEVEL_MIN_DEVICES', '16')),  # Below this, batches of ~1 cost more than they save
+    'max_frames': int(os.getenv('MIC_LEVEL_MAX_FRAMES', '64'))  # A full batch is measured at once
+}
+
+# Serial telemetry from ESP32s plugged into the server (USB), correlated with server-side events
+SERIAL_TELEMETRY_CONFIG = {
+    'ports': os.getenv('SERIAL_TELEMETRY_PORTS', ''),  # "/dev/ttyUSB0=192.168.1.50,/dev/ttyUSB1" (IP learned if omitted)
+    'baud': int(os.getenv('SERIAL_TELEMETRY_BAUD', '115200')),
+    'max_events': int(os.getenv('SERIAL_TELEMETRY_MAX_EVENTS', '4096')),  # Per device
+    'retention_s': float(os.getenv('SERIAL_TELEMETRY_RETENTION_S', '3600')),
+    'mic_gap_ms': float(os.getenv('SERIAL_TELEMETRY_MIC_GAP_MS', '200'))  # Mic frame gaps recorded as server events
+}
+
+# Rate-limit-aware scheduling of responses across all sessions on the API key
+RATE_LIMIT_CONFIG = {
+    'autonomous_floor': float(os.getenv('RATE_LIMIT_AUTONOMOUS_FLOOR', '0.25')),  # Behaviors pause below this headroom
+    'max_user_wait': float(os.getenv('RATE_LIMIT_MAX_USER_WAIT', '3')),  # Longest a user turn is held for a reset
+    'cached_variants': int(os.getenv('RATE_LIMIT_CACHED_VARIANTS', '3'))  # Takes kept per behavior for replay
+}
+
+# Mic audio while the parrot talks is dropped (it is mostly the parrot's own voice),
+# except frames louder than this, which reach the server VAD so people can interrupt
+BARGE_IN_CONFIG = {
+    'threshold': float(os.getenv('BARGE_IN_THRESHOLD', '3000'))  # RMS; 0 drops everything during replies
+}
+
+# End-of-turn detection: 'server' (realtime API VAD) or 'client' (decided here from mic frames)
+TURN_DETECTION_CONFIG = {
+    'mode': os.getenv('TURN_DETECTION', 'server').lower(),
+    'aggressiveness': float(os.getenv('TURN_AGGRESSIVENESS', '0.3')),  # 0 = patient, 1 = commit at the first likely pause
+    'min_silence_ms': float(os.getenv('TURN_MIN_SILENCE_MS', '200')),
+    'premature_window_ms': float(os.getenv('TURN_PREMATURE_WINDOW_MS', '1200'))  # Speech this soon after a commit = cut-off
+}
+
+# Loudness normalization and limiting of reply audio before it goes to the speakers
+SPEAKER_LEVEL_CONFIG = {
+    'enabled': os.getenv('SPEAKER_LEVEL_ENABLED', 'true').lower() == 'true',
+    'target_dbfs': float(os.getenv('SPEAKER_LEVEL_TARGET_DBFS', '-20')),
+    'max_gain': float(os.getenv('SPEAKER_LEVEL_MAX_GAIN', '4')),
+    'ceiling_dbfs': float(os.getenv('SPEAKER_LEVEL_CEILING_DBFS', '-6.5')),  # Firmware doubles samples after this
+    'lookahead_ms': float(os.getenv('SPEAKER_LEVEL_LOOKAHEAD_MS', '5'))  # Added latency
+}
+
+# Device socket keepalive (one shared timer wheel)
+KEEPALIVE_CONFIG = {
+    'ping_after': float(os.getenv('KEEPALIVE_PING_AFTER', '5')),  # Idle seconds before the speaker socket is pinged
+    'dead_after': float(os.getenv('KEEPALIVE_DEAD_AFTER', '15')),  # Idle seconds before a socket is dropped
+    'tick': float(os.getenv('KEEPALIVE_TICK', '0.5'))
+}
+
+# Admission control for new parrots (readiness at /readyz on the audio port)
+ADMISSION_CONFIG = {
+    'enabled': os.getenv('ADMISSION_ENABLED', 'true').lower() == 'true',
+    'max_devices': int(os.getenv('ADMISSION_MAX_DEVICES', '8')),
+    'max_loop_lag_ms': float(os.getenv('ADMISSION_MAX_LOOP_LAG_MS', '50')),  # Worst lag over the last ~2s
+    'max_upstream_sessions': int(os.getenv('ADMISSION_MAX_UPSTREAM_SESSIONS', '4')),
+    'max_queued_ms': float(os.getenv('ADMISSION_MAX_QUEUED_MS', '1000')),  # Unsent speaker audio on any device
+    'redirect_url': os.getenv('ADMISSION_REDIRECT_URL', '')  # Sent as the close reason to refused devices
+}
+
+# Live audio tap (/tap on the audio port) for monitoring tools
+AUDIO_TAP_CONFIG = {
+    'enabled': os.getenv('AUDIO_TAP_ENABLED', 'true').lower() == 'true',
+    'queue_frames': int(os.getenv('AUDIO_TAP_QUEUE_FRAMES', '64')),  # A subscriber this far behind is dropped
+    'allow_remote': os.getenv('AUDIO_TAP_ALLOW_REMOTE', 'false').lower() == 'true'  # Loopback clients only by default
+}
+
+# Upstream traffic recording for the server's own OpenAI session
+UPSTREAM_RECORDING_CONFIG = {
+    'record_dir': PARROT_RECORD_DIR,
+    'openai_url': OPENAI_REALTIME_URL or 'wss://api.openai.com/v1/realtime?protocol_version=2&model=gpt-4o-realtime-preview'
+}
+
+# Realtime conversation compaction for long-running sessions
+CONVERSATION_CONTEXT_CONFIG = {
+    'budget_tokens': int(os.getenv('CONTEXT_BUDGET_TOKENS', '8000')),  # Compact once a turn's input exceeds this
+    'target_ratio': float(os.getenv('CONTEXT_TARGET_RATIO', '0.6')),  # ...down to this fraction of the budget
+    'keep_recent': int(os.getenv('CONTEXT_KEEP_RECENT_ITEMS', '8')),
+    'autonomous_max_age': float(os.getenv('CONTEXT_AUTONOMOUS_MAX_AGE', '300')),
+    'summarize': os.getenv('CONTEXT_SUMMARIZE', 'true').lower() == 'true'
+}
+
+# Event-loop instrumentation (lag sampling, stall stacks, coroutine timings)
+INSTRUMENTATION_CONFIG = {
+    'enabled': os.getenv('INSTRUMENTATION_ENABLED', 'true').lower() == 'true',
+    'lag_interval_ms': float(os.getenv('LOOP_LAG_INTERVAL_MS', '50')),
+    'slow_callback_ms': float(os.getenv('SLOW_CALLBACK_MS', '100'))  # Loop stalls longer than this are captured
+}
+
+# /debug/* routes (loop stats, the profiler, per-device state), duet control and gestures are unauthenticated
+DEBUG_ROUTES_CONFIG = {
+    'allow_remote': os.getenv('DEBUG_ROUTES_ALLOW_REMOTE', 'false').lower() == 'true'  # Loopback clients only by default
+}
+
+# Parrot-to-parrot duet used when POST /duet/start has no body
+DUET_FILE = os.getenv('PARROT_DUET_FILE', 'duet.json')
+
+# Autonomous behavior definitions (reloaded live when the file changes)
+BEHAVIORS_FILE = os.getenv('PARROT_BEHAVIORS_FILE', 'behaviors.json')
+
 def get_voice_backend_config():
     """Get configuration for the selected voice backend"""
     if VOICE_BACKEND == 'vapi':
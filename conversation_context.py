@@ -0,0 +1,242 @@
+"""Tracks realtime conversation items and compacts the context when it grows too large"""
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional
+
+AUTONOMOUS_PREFIX = "autonomous_command:"
+SUMMARY_ID_PREFIX = "ctx_summary_"
+
+# Rough realtime token rates, used until response.done reports real usage
+USER_AUDIO_TOKENS_PER_SEC = 10.0
+ASSISTANT_AUDIO_TOKENS_PER_SEC = 20.0
+PCM16_BYTES_PER_SEC = 24000 * 2
+
+
+def _text_tokens(text: str) -> float:
+    return len(text) / 4.0
+
+
+@dataclass
+class ContextItem:
+    item_id: str
+    role: str
+    created: float
+    text: str = ""
+    audio_seconds: float = 0.0
+    autonomous: bool = False
+    summary: bool = False
+
+    @property
+    def tokens(self) -> float:
+        rate = USER_AUDIO_TOKENS_PER_SEC if self.role == "user" else ASSISTANT_AUDIO_TOKENS_PER_SEC
+        if self.audio_seconds:
+            return self.audio_seconds * rate + 4
+        return _text_tokens(self.text) + 4
+
+
+@dataclass
+class ContextStats:
+    compactions: int = 0
+    items_deleted: int = 0
+    tokens_freed: float = 0.0
+    last_input_tokens: int = 0
+    peak_input_tokens: int = 0
+
+
+class ConversationContext:
+    """Mirror of the server-side conversation, in order, with size estimates
+
+    Items are learned from server events. Once a response finishes and the
+    reported input tokens exceed budget_tokens, compact() plans
+    conversation.item.delete events: stale autonomous commands first, then
+    the oldest turns, always keeping the last keep_recent items. Transcripts
+    of deleted turns are folded into one summary item at the start of the
+    conversation so the parrot keeps the gist.
+    """
+
+    def __init__(self, budget_tokens: int = 8000, target_ratio: float = 0.6, keep_recent: int = 8,
+                 autonomous_max_age: float = 300.0, summarize: bool = True, summary_chars: int = 1200):
+        self.budget_tokens = budget_tokens
+        self.target_tokens = int(budget_tokens * target_ratio)
+        self.keep_recent = keep_recent
+        self.autonomous_max_age = autonomous_max_age
+        self.summarize = summarize
+        self.summary_chars = summary_chars
+
+        self.items: "OrderedDict[str, ContextItem]" = OrderedDict()
+        self.summary_text = ""
+        self.summary_count = 0
+        self.summarized_until: Optional[float] = None  # Turns logged before this are in the summary
+        self.response_active = False
+        self.measured_tokens: Optional[float] = None
+        self.speech_start_ms = 0
+        self.stats = ContextStats()
+
+    def reset(self):
+        """Forget item ids (a new session starts with an empty conversation)
+
+        The summary text is kept; restore_events() puts it back into the new session,
+        and summarized_until tells the replay which logged turns it already covers.
+        """
+        self.items.clear()
+        self.response_active = False
+        self.measured_tokens = None
+
+    def restore_events(self) -> List[dict]:
+        """Events that re-create the summary item in a new session, if there is one"""
+        return [self._summary_item_event()] if self.summary_text else []
+
+    def record_event(self, event: dict):
+        event_type = event.get("type", "")
+
+        if event_type == "conversation.item.created":
+            self._add_item(event.get("item", {}))
+        elif event_type == "conversation.item.deleted":
+            self.items.pop(event.get("item_id"), None)
+        elif event_type == "conversation.item.input_audio_transcription.completed":
+            item = self.items.get(event.get("item_id"))
+            if item:
+                item.text = event.get("transcript", "").strip()
+        elif event_type == "input_audio_buffer.speech_started":
+            self.speech_start_ms = event.get("audio_start_ms", 0)
+        elif event_type == "input_audio_buffer.speech_stopped":
+            # speech_stopped names the item that conversation.item.created will announce next
+            item_id = event.get("item_id")
+            if item_id:
+                item = self.items.setdefault(item_id, ContextItem(item_id, "user", time.time()))
+                item.audio_seconds = max(0, event.get("audio_end_ms", 0) - self.speech_start_ms) / 1000.0
+        elif event_type == "response.audio.delta":
+            item = self.items.get(event.get("item_id"))
+            if item:
+                item.audio_seconds += len(event.get("delta", "")) * 3 / 4 / PCM16_BYTES_PER_SEC
+        elif event_type == "response.audio_transcript.done":
+            item = self.items.get(event.get("item_id"))
+            if item:
+                item.text = event.get("transcript", "").strip()
+        elif event_type == "response.created":
+            self.response_active = True
+        elif event_type == "response.done":
+            self.response_active = False
+            usage = (event.get("response") or {}).get("usage") or {}
+            if usage:
+                input_tokens = int(usage.get("input_tokens", 0))
+                self.measured_tokens = input_tokens + int(usage.get("output_tokens", 0))
+                self.stats.last_input_tokens = input_tokens
+                self.stats.peak_input_tokens = max(self.stats.peak_input_tokens, input_tokens)
+
+    def _add_item(self, item: dict):
+        item_id = item.get("id")
+        if not item_id:
+            return
+        text = ""
+        for part in item.get("content") or []:
+            text += part.get("text") or part.get("transcript") or ""
+        existing = self.items.get(item_id)
+        if existing:
+            existing.text = existing.text or text
+            existing.role = item.get("role", existing.role)
+            return
+        self.items[item_id] = ContextItem(
+            item_id=item_id,
+            role=item.get("role", item.get("type", "")),
+            created=time.time(),
+            text=text,
+            autonomous=text.startswith(AUTONOMOUS_PREFIX),
+            summary=item_id.startswith(SUMMARY_ID_PREFIX)
+        )
+
+    @property
+    def estimated_tokens(self) -> float:
+        return sum(item.tokens for item in self.items.values())
+
+    @property
+    def context_tokens(self) -> float:
+        """Best current size: the last reported usage, else the local estimate"""
+        return self.measured_tokens if self.measured_tokens is not None else self.estimated_tokens
+
+    def compact(self, now: Optional[float] = None) -> List[dict]:
+        """Client events that shrink the context, or [] if it is within budget"""
+        if self.response_active or self.context_tokens <= self.budget_tokens:
+            return []
+        now = time.time() if now is None else now
+
+        ordered = [item for item in self.items.values() if not item.summary]
+        protected = {item.item_id for item in ordered[-self.keep_recent:]}
+        stale_autonomous = [item for item in ordered
+                            if item.autonomous and item.item_id not in protected
+                            and now - item.created > self.autonomous_max_age]
+        others = [item for item in ordered if item.item_id not in protected and not item.autonomous]
+
+        excess = self.context_tokens - self.target_tokens
+        victims = []
+        for item in stale_autonomous + others:
+            if excess <= 0 and not item.autonomous:
+                break
+            victims.append(item)
+            excess -= item.tokens
+
+        if not victims:
+            return []
+
+        events = [{"type": "conversation.item.delete", "item_id": item.item_id} for item in victims]
+        freed = sum(item.tokens for item in victims)
+        if self.summarize:
+            events.extend(self._summary_events([item for item in victims if not item.autonomous]))
+
+        for item in victims:
+            self.items.pop(item.item_id, None)
+        if self.summary_text:
+            # Every surviving turn was created after this, so anything logged earlier was folded in
+            self.summarized_until = min((item.created for item in self.items.values() if not item.summary),
+                                        default=now)
+        self.stats.compactions += 1
+        self.stats.items_deleted += len(victims)
+        self.stats.tokens_freed += freed
+        if self.measured_tokens is not None:
+            self.measured_tokens = max(0.0, self.measured_tokens - freed)
+        return events
+
+    def _summary_events(self, deleted: List[ContextItem]) -> List[dict]:
+        lines = [f"{'They' if item.role == 'user' else 'You'} said: {item.text}"
+                 for item in deleted if item.text]
+        if not lines:
+            return []
+        self.summary_text = " ".join(filter(None, [self.summary_text] + lines))[-self.summary_chars:]
+
+        old_summaries = [item for item in self.items.values() if item.summary]
+        events = [{"type": "conversation.item.delete", "item_id": item.item_id} for item in old_summaries]
+        for item in old_summaries:
+            del self.items[item.item_id]
+        events.append(self._summary_item_event())
+        return events
+
+    def _summary_item_event(self) -> dict:
+        self.summary_count += 1
+        summary_id = f"{SUMMARY_ID_PREFIX}{self.summary_count}"
+        return {
+            "type": "conversation.item.create",
+            "previous_item_id": "root",
+            "item": {
+                "id": summary_id,
+                "type": "message",
+                "role": "system",
+                "content": [{"type": "input_text",
+                             "text": f"Summary of the earlier conversation: {self.summary_text}"}]
+            }
+        }
+
+    def report(self) -> dict:
+        return {
+            "items": len(self.items),
+            "autonomous_items": sum(1 for item in self.items.values() if item.autonomous),
+            "context_tokens": int(self.context_tokens),
+            "estimated_tokens": int(self.estimated_tokens),
+            "budget_tokens": self.budget_tokens,
+            "last_input_tokens": self.stats.last_input_tokens,
+            "peak_input_tokens": self.stats.peak_input_tokens,
+            "compactions": self.stats.compactions,
+            "items_deleted": self.stats.items_deleted,
+            "tokens_freed": int(self.stats.tokens_freed)
+        }
@@ -0,0 +1,337 @@
+"""Offloads per-device mic DSP to worker processes over shared-memory rings"""
+
+import asyncio
+import multiprocessing as mp
+import time
+from collections import deque
+from multiprocessing import shared_memory
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+# Ring message kinds
+FRAME = 0
+RESET = 1
+REMOVE = 2
+STOP = 3
+
+_META_FIELDS = 4  # kind, device, seq, length
+_NOTIFY_EVERY = 8  # Wake the loop at least this often while a worker has a backlog
+
+
+class SharedRing:
+    """Single-producer, single-consumer ring of fixed-size slots in shared memory
+
+    Layout: head and tail counters, then per-slot metadata (kind, device,
+    seq, length), a per-slot float (the frame's level), and the slot
+    payloads. The producer fills a slot before advancing head and the
+    consumer copies it out before advancing tail, so neither side locks.
+    """
+
+    def __init__(self, slots: int, slot_bytes: int, name: Optional[str] = None):
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        size = 16 + slots * (_META_FIELDS * 8 + 8 + slot_bytes)
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+            self.owner = True
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+
+        buf = self.shm.buf
+        self.counters = np.ndarray((2,), dtype=np.int64, buffer=buf, offset=0)
+        offset = 16
+        self.meta = np.ndarray((slots, _META_FIELDS), dtype=np.int64, buffer=buf, offset=offset)
+        offset += slots * _META_FIELDS * 8
+        self.levels = np.ndarray((slots,), dtype=np.float64, buffer=buf, offset=offset)
+        offset += slots * 8
+        self.data = np.ndarray((slots, slot_bytes), dtype=np.uint8, buffer=buf, offset=offset)
+        if self.owner:
+            self.counters[:] = 0
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def __len__(self) -> int:
+        return int(self.counters[0] - self.counters[1])
+
+    def put(self, kind: int, device: int, seq: int, payload=b"", level: float = 0.0) -> bool:
+        """Write one message; returns False if the ring is full"""
+        head = int(self.counters[0])
+        if head - int(self.counters[1]) >= self.slots:
+            return False
+        payload = np.frombuffer(payload, dtype=np.uint8)
+        if payload.size > self.slot_bytes:
+            raise ValueError(f"Frame of {payload.size} bytes exceeds the {self.slot_bytes}-byte slot")
+        slot = head % self.slots
+        self.data[slot, :payload.size] = payload
+        self.meta[slot] = (kind, device, seq, payload.size)
+        self.levels[slot] = level
+        self.counters[0] = head + 1
+        return True
+
+    def get(self) -> Optional[Tuple[int, int, int, float, bytes]]:
+        """Read one message as (kind, device, seq, level, payload), or None if empty"""
+        tail = int(self.counters[1])
+        if tail >= int(self.counters[0]):
+            return None
+        slot = tail % self.slots
+        kind, device, seq, length = (int(v) for v in self.meta[slot])
+        message = (kind, device, seq, float(self.levels[slot]), self.data[slot, :length].tobytes())
+        self.counters[1] = tail + 1
+        return message
+
+    def close(self):
+        # Drop the numpy views first or the buffer can't be released
+        self.counters = self.meta = self.levels = self.data = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _worker_main(in_name: str, out_name: str, slots: int, slot_bytes: int,
+                 wake, notify, chain_config: dict):
+    """Worker process: runs one MicDSPChain per device assigned to it"""
+    from mic_dsp import MicDSPChain
+
+    inbox = SharedRing(slots, slot_bytes, name=in_name)
+    outbox = SharedRing(slots, slot_bytes, name=out_name)
+    chains: Dict[int, MicDSPChain] = {}
+    unnotified = 0
+
+    try:
+        while True:
+            wake.acquire()
+            message = inbox.get()
+            if message is None:
+                continue
+            kind, device, seq, _, payload = message
+
+            if kind == STOP:
+                break
+            if kind in (RESET, REMOVE):
+                if kind == REMOVE:
+                    chains.pop(device, None)
+                elif device in chains:
+                    chains[device].reset()
+                if len(inbox) == 0:
+                    notify.send_bytes(b"!")  # Lets the loop send any control messages it had to hold back
+                continue
+
+            chain = chains.get(device)
+            if chain is None:
+                chain = chains[device] = MicDSPChain(**chain_config)
+            out = chain.process_array(np.frombuffer(payload, dtype=np.int16))
+            while not outbox.put(FRAME, device, seq, out, chain.level):
+                # The loop is behind draining results; give it a moment
+                notify.send_bytes(b"!")
+                time.sleep(0.001)
+
+            unnotified += 1
+            if len(inbox) == 0 or unnotified >= _NOTIFY_EVERY:
+                notify.send_bytes(b"!")
+                unnotified = 0
+    finally:
+        inbox.close()
+        outbox.close()
+
+
+class DSPPool:
+    """Runs per-device mic DSP chains in worker processes
+
+    Frames go to workers through shared-memory rings rather than pickled
+    queues; a semaphore wakes the worker and a one-byte pipe message wakes
+    the event loop when results are ready. Each device sticks to one worker
+    (the least loaded when it first appears) so its filter state never moves,
+    unless its worker dies. RESET and REMOVE messages that find the ring full
+    wait in a backlog and are sent ahead of the device's next frame.
+    """
+
+    def __init__(self, workers: int = 2, chain_config: Optional[dict] = None,
+                 slots: int = 64, max_frame_bytes: int = 8192):
+        self.worker_count = workers
+        self.chain_config = chain_config or {}
+        self.slots = slots
+        self.max_frame_bytes = max_frame_bytes
+
+        self._ctx = mp.get_context("spawn")  # Forking a process with live sockets and threads is unsafe
+        self._workers = []
+        self._device_keys: Dict[str, Tuple[int, int]] = {}  # device id -> (worker, key)
+        self._next_key = 0
+        self._seq = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        # Metrics
+        self.frames = 0
+        self.dropped = 0
+        self.deferred_controls = 0
+
+    def start(self):
+        """Spawn the workers; call from the event loop that will use the pool"""
+        self._loop = asyncio.get_running_loop()
+        for index in range(self.worker_count):
+            inbox = SharedRing(self.slots, self.max_frame_bytes)
+            outbox = SharedRing(self.slots, self.max_frame_bytes)
+            wake = self._ctx.Semaphore(0)
+            recv_conn, send_conn = self._ctx.Pipe(duplex=False)
+            process = self._ctx.Process(
+                target=_worker_main,
+                args=(inbox.name, outbox.name, self.slots, self.max_frame_bytes,
+                      wake, send_conn, self.chain_config),
+                daemon=True,
+                name=f"mic-dsp-{index}"
+            )
+            process.start()
+            send_conn.close()
+            self._loop.add_reader(recv_conn.fileno(), self._on_results, index)
+            self._workers.append({
+                "process": process, "inbox": inbox, "outbox": outbox, "wake": wake,
+                "conn": recv_conn, "devices": 0, "pending": {}, "alive": True, "backlog": deque()
+            })
+
+    def _assign(self, device_id: str) -> Optional[Tuple[int, int]]:
+        """The device's (worker, key), moving it off a dead worker; None if none are alive"""
+        assigned = self._device_keys.get(device_id)
+        if assigned is not None and not self._workers[assigned[0]]["alive"]:
+            del self._device_keys[device_id]
+            self._workers[assigned[0]]["devices"] -= 1
+            assigned = None
+        if assigned is None:
+            alive = [i for i, worker in enumerate(self._workers) if worker["alive"]]
+            if not alive:
+                return None
+            index = min(alive, key=lambda i: self._workers[i]["devices"])
+            self._workers[index]["devices"] += 1
+            assigned = self._device_keys[device_id] = (index, self._next_key)
+            self._next_key += 1
+        return assigned
+
+    def _send(self, index: int, kind: int, key: int, seq: int = 0, payload=b"") -> bool:
+        worker = self._workers[index]
+        if not worker["inbox"].put(kind, key, seq, payload):
+            return False
+        worker["wake"].release()
+        return True
+
+    def _send_control(self, index: int, kind: int, key: int):
+        """Send a RESET or REMOVE, queueing it behind earlier ones if the ring is full"""
+        worker = self._workers[index]
+        if not worker["alive"]:
+            return
+        if worker["backlog"] or not self._send(index, kind, key):
+            worker["backlog"].append((kind, key))
+            self.deferred_controls += 1
+
+    def _flush_backlog(self, index: int) -> bool:
+        """Send queued control messages; returns True once none are left"""
+        backlog = self._workers[index]["backlog"]
+        while backlog:
+            if not self._send(index, *backlog[0]):
+                return False
+            backlog.popleft()
+        return True
+
+    async def process(self, device_id: str, frame: bytes) -> Optional[Tuple[bytes, float]]:
+        """Run a PCM16 frame through the device's chain; returns (audio, pre-AGC level)
+
+        Returns None if the device's worker is too far behind to take the frame
+        or no worker is alive; the caller should carry on with the raw frame.
+        """
+        assigned = self._assign(device_id)
+        if assigned is None or not self._flush_backlog(assigned[0]):
+            self.dropped += 1
+            return None
+        index, key = assigned
+        self._seq += 1
+        seq = self._seq
+        pending = self._workers[index]["pending"]
+        future = self._loop.create_future()
+        pending[seq] = future
+        if not self._send(index, FRAME, key, seq, frame):
+            del pending[seq]
+            self.dropped += 1
+            return None
+        self.frames += 1
+        return await future
+
+    def _on_results(self, index: int):
+        worker = self._workers[index]
+        conn = worker["conn"]
+        try:
+            while conn.poll():
+                conn.recv_bytes()
+        except (EOFError, OSError):
+            # The worker died; its outstanding frames count as dropped rather than hang
+            self._loop.remove_reader(conn.fileno())
+            worker["alive"] = False
+            worker["backlog"].clear()
+            print(f"Mic DSP worker {index} exited")
+            for future in worker["pending"].values():
+                if not future.done():
+                    future.set_result(None)
+            self.dropped += len(worker["pending"])
+            worker["pending"].clear()
+            return
+        while True:
+            message = worker["outbox"].get()
+            if message is None:
+                break
+            _, _, seq, level, payload = message
+            future = worker["pending"].pop(seq, None)
+            if future is not None and not future.done():
+                future.set_result((payload, level))
+        self._flush_backlog(index)  # The worker has made room
+
+    def reset(self, device_id: str):
+        """Clear a device's filter state (e.g. after a stream gap)"""
+        if device_id in self._device_keys:
+            index, key = self._device_keys[device_id]
+            self._send_control(index, RESET, key)
+
+    def remove(self, device_id: str):
+        """Drop a device's chain when it disconnects"""
+        assigned = self._device_keys.pop(device_id, None)
+        if assigned:
+            index, key = assigned
+            self._workers[index]["devices"] -= 1
+            self._send_control(index, REMOVE, key)
+
+    def close(self):
+        for worker in self._workers:
+            if worker["alive"]:
+                self._send_stop(worker)
+        for worker in self._workers:
+            worker["process"].join(timeout=2.0)
+            if worker["process"].is_alive():
+                worker["process"].terminate()
+            try:
+                self._loop.remove_reader(worker["conn"].fileno())
+            except (ValueError, OSError):
+                pass
+            worker["conn"].close()
+            worker["inbox"].close()
+            worker["outbox"].close()
+            for future in worker["pending"].values():
+                if not future.done():
+                    future.cancel()
+        self._workers = []
+
+    @staticmethod
+    def _send_stop(worker):
+        if worker["inbox"].put(STOP, 0, 0):
+            worker["wake"].release()
+        else:
+            worker["process"].terminate()
+
+    def stats(self) -> dict:
+        return {
+            "workers": len(self._workers),
+            "devices_per_worker": [w["devices"] for w in self._workers],
+            "frames": self.frames,
+            "dropped": self.dropped,
+            "dead_workers": sum(not w["alive"] for w in self._workers),
+            "deferred_controls": self.deferred_controls,
+            "in_flight": sum(len(w["pending"]) for w in self._workers)
+        }
@@ -0,0 +1,455 @@
+"""Offline model of the firmware's motion path, for regression-testing motion changes
+
+Mirrors ParrotDriver.ino's loop(): speaker chunks drained through
+calculateAnimationPositions, animation_loop / updateIdleAnimation writing
+servos directly, and gesture batches handed to Bottango, whose
+PinServoEffectors (LoopDrivenEffector) follow FloatBezierCurves under the
+speed limit registered with rSVPin. Every stage is evaluated as arrays over
+loop iterations; only the (few) discrete idle-timer events and the spans
+where the speed limit bites are stepped individually.
+
+The loop is modelled at a fixed period (loop_ms), Arduino random() is
+replaced by a seeded generator, and idle timers fire on the first idle loop
+at or after an interval drawn from the same hazard the firmware's redrawn
+random() thresholds produce.
+"""
+
+import random
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Tuple, Union
+
+import numpy as np
+from scipy import signal
+
+from bottango_compiler import COMPRESSED_SIGNAL_MAX, PARROT_SERVOS, CompiledGesture, ServoBounds
+
+SAMPLE_RATE = 24000
+CHUNK_SAMPLES = 256            # SPEAKER_MAX_CHUNK bytes of PCM16 per drain step
+PERCENTILE_INDEX = CHUNK_SAMPLES * 80 // 100
+ENERGY_SMOOTHING = 0.5
+
+# animation_loop's direct writes: position 0..1 -> base + (int)(position * span)
+DIRECT_PWM = {"mouth": (1450, 250), "wing": (1500, 500), "head_tilt": (850, 1250)}
+HEAD_ROTATION_MIN, HEAD_ROTATION_MAX = 900, 2100
+HEAD_ROTATION_MIN_POS, HEAD_ROTATION_MAX_POS = 0.2, 0.8
+INITIAL_PWM = {"mouth": 1700, "wing": 2000, "head_tilt": 1760, "head_rotation": 1500}
+
+# updateIdleAnimation timers: fire once millis() - last >= random(low, high)
+IDLE_TIMERS = {"small": (800, 2500), "medium": (3000, 8000), "large": (15000, 25000), "wing": (1500, 4000)}
+MOUTH_TWITCH_CHANCE = 8 / 1000  # Per idle loop
+
+SpeechInput = Tuple[float, np.ndarray]                      # (start seconds, int16 reply audio)
+GestureInput = Tuple[float, Union[CompiledGesture, str]]    # (arrival seconds, compiled gesture or batch text)
+
+
+@dataclass
+class _Curve:
+    start_ms: int
+    duration_ms: int
+    start_y: float
+    start_control_x: float
+    start_control_y: float
+    end_y: float
+    end_control_x: float
+    end_control_y: float
+
+    @property
+    def end_ms(self) -> int:
+        return self.start_ms + self.duration_ms
+
+    def values(self, x: np.ndarray) -> np.ndarray:
+        """FloatBezierCurve::getValue for curve-relative times x (ms), as movement 0..1"""
+        p0, p1 = 0.0, float(self.start_control_x)
+        p2, p3 = float(self.duration_ms + self.end_control_x), float(self.duration_ms)
+        lower = np.zeros(len(x))
+        upper = np.ones(len(x))
+        for _ in range(24):  # Bisection on u, as Evaluate() does, to well under its 1ms tolerance
+            u = (lower + upper) / 2
+            v = 1 - u
+            bx = v ** 3 * p0 + 3 * v * v * u * p1 + 3 * v * u * u * p2 + u ** 3 * p3
+            above = bx > x
+            upper = np.where(above, u, upper)
+            lower = np.where(above, lower, u)
+        u = (lower + upper) / 2
+        v = 1 - u
+        q0, q1 = self.start_y, self.start_y + self.start_control_y
+        q2, q3 = self.end_y + self.end_control_y, self.end_y
+        return (v ** 3 * q0 + 3 * v * v * u * q1 + 3 * v * u * u * q2 + u ** 3 * q3) / COMPRESSED_SIGNAL_MAX
+
+
+def parse_batch(batch: str) -> Tuple[int, List[List[str]]]:
+    """Split a gesture batch into its duration and Bottango commands (hashes dropped)"""
+    duration = 0
+    commands = []
+    for line in batch.splitlines():
+        fields = line.strip().split(",")
+        if not fields[0]:
+            continue
+        if fields[0] == "gesture":
+            duration = int(fields[1])
+            continue
+        if fields[-1].startswith("h"):
+            fields = fields[:-1]
+        commands.append(fields)
+    return duration, commands
+
+
+def lerp_signal(bounds: ServoBounds, movement: np.ndarray) -> np.ndarray:
+    """AbstractEffector::lerpSignal"""
+    mapped = np.round((bounds.max_signal - bounds.min_signal) * movement + bounds.min_signal)
+    return np.clip(mapped, bounds.min_signal, bounds.max_signal).astype(np.int64)
+
+
+@dataclass
+class SimulationResult:
+    loop_ms: float
+    servos: Dict[str, ServoBounds]
+    signals: Dict[str, np.ndarray]   # Pulse width written each loop (us)
+    limited: Dict[str, np.ndarray]   # Loops where Bottango's speed limit held the servo back
+    bottango: np.ndarray             # Loops where a gesture owned the servos
+    speaking: np.ndarray             # Loops with speaker audio queued
+
+    @property
+    def times_ms(self) -> np.ndarray:
+        return np.arange(len(self.bottango)) * self.loop_ms
+
+    def step_limit(self, name: str) -> int:
+        """Most signal the registered speed allows per loop"""
+        return int(self.loop_ms * 1000) // (1000000 // self.servos[name].max_signal_per_sec)
+
+    def report(self) -> dict:
+        servos = {}
+        for name, pwm in self.signals.items():
+            bounds = self.servos[name]
+            below = np.maximum(bounds.min_signal - pwm, 0)
+            above = np.maximum(pwm - bounds.max_signal, 0)
+            steps = np.abs(np.diff(pwm))
+            overspeed = steps > self.step_limit(name)
+            servos[name] = {
+                "range": [int(pwm.min()), int(pwm.max())],
+                "bounds": [bounds.min_signal, bounds.max_signal],
+                "violation_ms": round(float(np.count_nonzero(below | above)) * self.loop_ms, 1),
+                "worst_violation_us": int(max(below.max(), above.max())),
+                "speed_limited_ms": round(float(np.count_nonzero(self.limited[name])) * self.loop_ms, 1),
+                "overspeed_steps": int(np.count_nonzero(overspeed)),
+                "overspeed_lag_ms": round(float((steps[overspeed] - self.step_limit(name)).sum())
+                                          * (1000000 // bounds.max_signal_per_sec) / 1000.0, 1),
+                "travel_us": int(steps.sum())
+            }
+        return {
+            "simulated_s": round(len(self.bottango) * self.loop_ms / 1000.0, 1),
+            "loops": len(self.bottango),
+            "gesture_ms": round(float(np.count_nonzero(self.bottango)) * self.loop_ms, 1),
+            "speaking_ms": round(float(np.count_nonzero(self.speaking)) * self.loop_ms, 1),
+            "servos": servos
+        }
+
+
+class FirmwareSimulator:
+    """Simulates what the firmware writes to each servo for a timeline of server commands"""
+
+    def __init__(self, loop_ms: float = 3.0, seed: int = 0, servos: Dict[str, ServoBounds] = None):
+        self.loop_ms = loop_ms
+        self.seed = seed
+        self.servos = servos or PARROT_SERVOS
+        self.by_pin = {str(b.pin): name for name, b in self.servos.items()}
+
+    def _tick(self, ms):
+        return np.ceil(np.asarray(ms, dtype=np.float64) / self.loop_ms - 1e-9).astype(np.int64)
+
+    # Speaker path: drainSpeakerBuffer -> calculateAnimationPositions
+
+    def _speech(self, speech: Sequence[SpeechInput], n: int, rng: np.random.Generator):
+        speaking = np.zeros(n, dtype=bool)
+        ticks, amplitudes = [], []
+        playing_until = 0.0
+        for start_s, audio in sorted(speech, key=lambda s: s[0]):
+            audio = np.asarray(audio, dtype=np.int16)
+            if audio.size == 0:
+                continue
+            start_ms = max(start_s * 1000.0, playing_until)
+            playing_until = start_ms + audio.size * 1000.0 / SAMPLE_RATE
+            speaking[min(n, int(self._tick(start_ms))):min(n, int(self._tick(playing_until)))] = True
+
+            full = audio.size // CHUNK_SAMPLES
+            magnitude = np.abs(audio.astype(np.int32))
+            amp = np.partition(magnitude[:full * CHUNK_SAMPLES].reshape(full, CHUNK_SAMPLES),
+                               PERCENTILE_INDEX, axis=1)[:, PERCENTILE_INDEX].astype(np.float64)
+            tail = magnitude[full * CHUNK_SAMPLES:]
+            if tail.size:
+                index = tail.size * 80 // 100
+                amp = np.append(amp, np.partition(tail, index)[index])
+            offsets = np.arange(len(amp)) * CHUNK_SAMPLES * 1000.0 / SAMPLE_RATE
+            ticks.append(self._tick(start_ms + offsets))
+            amplitudes.append(amp)
+
+        if not ticks:
+            empty = np.zeros(0)
+            return speaking, np.zeros(0, dtype=np.int64), {name: empty for name in INITIAL_PWM}
+        ticks = np.concatenate(ticks)
+        amp = np.concatenate(amplitudes)
+        keep = ticks < n
+        ticks, amp = ticks[keep], amp[keep]
+
+        current = np.minimum(1.0, amp / 2000.0)
+        energy = signal.lfilter([1.0 - ENERGY_SMOOTHING], [1.0, -ENERGY_SMOOTHING], current)
+        count = len(amp)
+        positions = {
+            "mouth": np.where(amp > 800, rng.integers(0, 50, count) / 100.0, 1.0),
+            "wing": np.clip(0.2 + energy * 1.2 * 0.8 + rng.integers(-10, 10, count) / 100.0, 0.0, 1.0),
+            "head_tilt": 0.4 + energy * 0.3 * 0.6,
+            "head_rotation": np.clip(0.5 + energy * 0.3 * rng.integers(-10, 10, count) / 100.0,
+                                     HEAD_ROTATION_MIN_POS + 0.05, HEAD_ROTATION_MAX_POS - 0.05)
+        }
+        return speaking, ticks, positions
+
+    # Idle path: updateIdleAnimation on loops that are neither speaking nor gesturing
+
+    def _timer_intervals(self, low: int, high: int) -> np.ndarray:
+        """CDF over loops-since-last-fire of when a timer with redrawn random(low, high) fires"""
+        elapsed = np.floor(np.arange(int(np.ceil(high / self.loop_ms)) + 2) * self.loop_ms)
+        hazard = np.clip((elapsed - low + 1) / (high - low), 0.0, 1.0)
+        survive = np.concatenate(([1.0], np.cumprod(1.0 - hazard)[:-1]))
+        return np.cumsum(hazard * survive)
+
+    def _idle(self, idle: np.ndarray, speech_ticks, speech_tilt, rng: np.random.Generator, draw: random.Random):
+        n = len(idle)
+        index = np.where(idle, np.arange(n), n)
+        next_idle = np.minimum.accumulate(index[::-1])[::-1]
+
+        events = []
+        for order, (name, (low, high)) in enumerate(IDLE_TIMERS.items()):
+            cdf = self._timer_intervals(low, high)
+            last = 0
+            while True:
+                intervals = np.searchsorted(cdf, rng.random(256))
+                for interval in intervals:
+                    candidate = last + int(interval)
+                    if candidate >= n or next_idle[candidate] >= n:
+                        break
+                    last = int(next_idle[candidate])
+                    events.append((last, order, name))
+                else:
+                    continue
+                break
+        events.sort()
+
+        sets = {name: ([], []) for name in INITIAL_PWM}
+
+        def put(name, tick, value):
+            sets[name][0].append(tick)
+            sets[name][1].append(value)
+
+        # head_tilt_next_position drifts with small adjustments, so the latest write (speech or idle) matters
+        tilt, tilt_tick = 0.0, -1
+        latest_speech = np.searchsorted(speech_ticks, [e[0] for e in events], side="right") - 1
+        for (tick, _, name), chunk in zip(events, latest_speech):
+            if chunk >= 0 and speech_ticks[chunk] > tilt_tick:
+                tilt = float(speech_tilt[chunk])
+            if name == "small":
+                tilt = min(0.7, max(0.3, tilt + draw.randrange(-5, 5) / 100.0))
+                put("head_tilt", tick, tilt)
+                if draw.randrange(100) < 25:
+                    put("wing", tick, draw.randrange(8, 20) / 100.0)
+            elif name == "medium":
+                put("head_rotation", tick, draw.randrange(35, 65) / 100.0)
+                if draw.randrange(100) < 40:
+                    tilt = 0.35 + draw.randrange(0, 30) / 100.0
+                    put("head_tilt", tick, tilt)
+                if draw.randrange(100) < 25:
+                    put("wing", tick, draw.randrange(10, 30) / 100.0)
+            elif name == "large":
+                put("head_rotation", tick, draw.randrange(30, 70) / 100.0)
+                tilt = 0.3 + draw.randrange(0, 35) / 100.0
+                put("head_tilt", tick, tilt)
+                if draw.randrange(100) < 50:
+                    put("wing", tick, draw.randrange(20, 40) / 100.0)
+            else:
+                low = draw.randrange(100) < 40
+                put("wing", tick, draw.randrange(0, 25 if low else 10) / 100.0)
+            tilt_tick = tick
+
+        idle_ticks = np.flatnonzero(idle)
+        twitches = idle_ticks[rng.random(len(idle_ticks)) < MOUTH_TWITCH_CHANCE]
+        mouth = (np.concatenate((np.array(sets["mouth"][0], dtype=np.int64), twitches)),
+                 np.concatenate((np.array(sets["mouth"][1]), rng.integers(0, 18, len(twitches)) / 100.0)))
+        result = {name: (np.array(t, dtype=np.int64), np.array(v, dtype=np.float64)) for name, (t, v) in sets.items()}
+        result["mouth"] = mouth
+        return result
+
+    def _direct_pwm(self, name: str, position: np.ndarray) -> np.ndarray:
+        if name == "head_rotation":
+            safe = np.clip(position, HEAD_ROTATION_MIN_POS, HEAD_ROTATION_MAX_POS)
+            return np.clip(HEAD_ROTATION_MIN + np.trunc(safe * (HEAD_ROTATION_MAX - HEAD_ROTATION_MIN)),
+                           HEAD_ROTATION_MIN, HEAD_ROTATION_MAX).astype(np.int64)
+        base, span = DIRECT_PWM[name]
+        return (base + np.trunc(position * span)).astype(np.int64)
+
+    # Bottango path: LoopDrivenEffector following curves under the speed limit
+
+    @staticmethod
+    def _slew(desired: np.ndarray, start: int, first_step: int, step: int):
+        """speedLimitSingal applied every loop; returns (output, limited mask)"""
+        n = len(desired)
+        out = desired.copy()
+        limited = np.zeros(n, dtype=bool)
+        prev, allowance, k = start, first_step, 0
+        while k < n:
+            jumps = np.abs(np.diff(desired[k:], prepend=prev))
+            if jumps[0] <= allowance:
+                over = np.flatnonzero(jumps[1:] > step)
+                if not len(over):
+                    break
+                v = k + 1 + int(over[0])
+                prev, allowance = int(out[v - 1]), step
+            else:
+                v = k
+            direction = 1 if desired[v] > prev else -1
+            # Ramp at the limit until the desired signal is within one step of it
+            window = 64
+            while True:
+                t = np.arange(min(window, n - v))
+                ramp = prev + direction * (allowance + step * t)
+                caught = np.flatnonzero(direction * desired[v:v + len(t)] <= direction * ramp)
+                if len(caught) or v + len(t) >= n:
+                    break
+                window *= 4
+            end = v + (int(caught[0]) if len(caught) else len(t))
+            out[v:end] = ramp[:end - v]
+            limited[v:end] = True
+            if end >= n:
+                break
+            prev = int(out[end - 1])
+            allowance, k = step, end
+            # Within reach: the limiter passes the target straight through
+            if abs(int(desired[end]) - prev) <= allowance:
+                prev, k = int(desired[end]), end + 1
+        return out, limited
+
+    def _drive(self, bounds: ServoBounds, curves: List[_Curve], clock_ms: np.ndarray,
+               t_us: np.ndarray, state: dict):
+        """One servo over the loops of one gesture; state carries signal and last change time"""
+        n = len(clock_ms)
+        desired = np.full(n, np.nan)
+        if curves:
+            last = max(curves, key=lambda c: c.end_ms)
+            desired[clock_ms > last.end_ms] = float(lerp_signal(bounds, np.array([last.end_y / COMPRESSED_SIGNAL_MAX]))[0])
+            for curve in reversed(curves):  # The first curve in progress wins
+                active = (clock_ms >= curve.start_ms) & (clock_ms <= curve.end_ms)
+                if active.any():
+                    desired[active] = lerp_signal(bounds, curve.values((clock_ms[active] - curve.start_ms).astype(float)))
+
+        min_us = 1000000 // bounds.max_signal_per_sec
+        step = int(self.loop_ms * 1000) // min_us
+        out = np.empty(n, dtype=np.int64)
+        limited = np.zeros(n, dtype=bool)
+        held = np.isnan(desired)
+        edges = np.flatnonzero(np.diff(np.concatenate(([True], held, [True])).astype(np.int8)))
+        out[:] = state["signal"]
+        position = 0
+        for run_start, run_end in zip(edges[::2], edges[1::2]):
+            out[position:run_start] = state["signal"]  # No curve to follow: the target stays put
+            first_step = int(t_us[run_start] - state["changed_us"]) // min_us
+            values, clipped = self._slew(desired[run_start:run_end].astype(np.int64), state["signal"], first_step, step)
+            out[run_start:run_end] = values
+            limited[run_start:run_end] = clipped
+            changes = np.flatnonzero(np.diff(values, prepend=state["signal"]))
+            if len(changes):
+                state["changed_us"] = int(t_us[run_start + changes[-1]])
+            state["signal"] = int(values[-1])
+            position = run_end
+        out[position:] = state["signal"]
+        return out, limited
+
+    def _schedule(self, gestures: Sequence[GestureInput], n: int) -> List[tuple]:
+        """(tick, commands, handover, end tick) for each gesture, as handleGestureBatch and animation_loop see them"""
+        parsed = sorted(((int(self._tick(t * 1000.0)), parse_batch(g.batch if isinstance(g, CompiledGesture) else g))
+                         for t, g in gestures), key=lambda g: g[0])
+        parsed = [g for g in parsed if g[0] < n]
+        schedule = []
+        until, release = -1, -1
+        for tick, (duration, commands) in parsed:
+            # Still driving on the loop the previous gesture would have been released: no re-registration
+            handover = not schedule or tick > release
+            until = max(until, int(tick * self.loop_ms) + duration)
+            release = int(np.ceil(until / self.loop_ms - 1e-9))
+            while release * self.loop_ms < until:  # First loop where millis() >= gesture_active_until
+                release += 1
+            if schedule and not handover:
+                schedule[-1][3] = tick
+            schedule.append([tick, commands, handover, min(release, n)])
+        for entry in schedule:
+            entry[3] = max(entry[0], entry[3])
+        return schedule
+
+    def _gestures(self, schedule: List[tuple], n: int, direct: Dict[str, np.ndarray],
+                  signals: Dict[str, np.ndarray], limited: Dict[str, np.ndarray]):
+        states: Dict[str, dict] = {}
+        curves: Dict[str, List[_Curve]] = {}
+        sync_ms = 0
+        for tick, commands, handover, end in schedule:
+            arrival_ms = int(tick * self.loop_ms)
+            if handover:
+                # handoverToBottango: re-register each servo where direct control left it
+                before = {name: (int(direct[name][tick - 1]) if tick > 0 else INITIAL_PWM[name]) for name in self.servos}
+                rotation = self.servos["head_rotation"]
+                before["head_rotation"] = int(np.clip(before["head_rotation"], rotation.min_signal, rotation.max_signal))
+                states = {name: {"signal": before[name], "changed_us": int(tick * self.loop_ms * 1000)}
+                          for name in self.servos}
+                curves = {}
+
+            for fields in commands:
+                if fields[0] == "xC":
+                    curves = {}
+                elif fields[0] == "tSYN":
+                    sync_ms = arrival_ms - int(fields[1])
+                elif fields[0] in ("sC", "sCI") and fields[1] in self.by_pin:
+                    name = self.by_pin[fields[1]]
+                    if fields[0] == "sC":
+                        curve = _Curve(*[int(v) for v in fields[2:10]])
+                    else:
+                        movement = int(float(fields[2]))
+                        curve = _Curve(arrival_ms - sync_ms, 0, movement, 0, 0, movement, 0, 0)
+                    curves[name] = (curves.get(name, []) + [curve])[-8:]  # MAX_NUM_CURVES
+
+            span = np.arange(tick, end)
+            if not len(span):
+                continue
+            clock_ms = np.floor(span * self.loop_ms).astype(np.int64) - sync_ms
+            t_us = (span * self.loop_ms * 1000).astype(np.int64)
+            for name, bounds in self.servos.items():
+                out, clipped = self._drive(bounds, curves.get(name, []), clock_ms, t_us, states[name])
+                signals[name][span] = out
+                limited[name][span] = clipped
+
+    def run(self, duration_s: float, speech: Sequence[SpeechInput] = (),
+            gestures: Sequence[GestureInput] = ()) -> SimulationResult:
+        n = int(duration_s * 1000.0 / self.loop_ms)
+        rng = np.random.default_rng(self.seed)
+        draw = random.Random(self.seed)
+
+        # Gesture windows first, since they pause the idle animation
+        schedule = self._schedule(gestures, n)
+        bottango = np.zeros(n, dtype=bool)
+        for tick, _, _, end in schedule:
+            bottango[tick:end] = True
+
+        speaking, speech_ticks, speech_positions = self._speech(speech, n, rng)
+        idle_sets = self._idle(~speaking & ~bottango, speech_ticks, speech_positions["head_tilt"], rng, draw)
+
+        direct, signals, limited = {}, {}, {}
+        loops = np.arange(n)
+        for name in self.servos:
+            ticks = np.concatenate(([-1], speech_ticks, idle_sets[name][0]))
+            values = np.concatenate(([0.0], speech_positions[name], idle_sets[name][1]))
+            order = np.concatenate(([0], np.zeros(len(speech_ticks), dtype=np.int64),
+                                    np.ones(len(idle_sets[name][0]), dtype=np.int64)))
+            sort = np.lexsort((np.arange(len(ticks)), order, ticks))
+            ticks, values = ticks[sort], values[sort]
+            position = values[np.searchsorted(ticks, loops, side="right") - 1]
+            direct[name] = self._direct_pwm(name, position)
+            signals[name] = direct[name].copy()
+            limited[name] = np.zeros(n, dtype=bool)
+
+        self._gestures(schedule, n, direct, signals, limited)
+        return SimulationResult(self.loop_ms, self.servos, signals, limited, bottango, speaking)
@@ -0,0 +1,108 @@
+"""Idle hibernation of the upstream session with voice-triggered wake"""
+
+import time
+from collections import deque
+from typing import List
+
+# Hibernation states
+AWAKE = "awake"              # Session wanted; audio flows upstream
+HIBERNATING = "hibernating"  # Session closed after a quiet spell
+WAKING = "waking"            # Voice heard; session reopening, audio buffered
+
+
+class Hibernation:
+    """Decides when the upstream session may sleep and holds audio while it wakes
+
+    Local VAD feeds on_voice(). After idle_timeout without voice (and
+    nothing playing) the session is closed. The next voiced frame starts a
+    wake: the caller asks the supervisor to reconnect and routes audio into
+    buffer() until the session is ready, then sends drain() ahead of live
+    audio. The buffer keeps the newest buffer_ms, which with the silence
+    gate's pre-roll covers the first words of a typical connect.
+    """
+
+    def __init__(self, idle_timeout: float = 300.0, buffer_ms: float = 3000.0,
+                 sample_rate: int = 24000, sample_width: int = 2, clock=time.time):
+        self.idle_timeout = idle_timeout
+        self.buffer_limit = int(sample_rate * sample_width * buffer_ms / 1000.0)
+        self.bytes_per_second = sample_rate * sample_width
+        self.clock = clock
+
+        self.state = AWAKE
+        self.last_activity = clock()
+        self.frames = deque()
+        self.buffered_bytes = 0
+
+        # Metrics
+        self.hibernations = 0
+        self.wakes = 0
+        self.dropped_bytes = 0
+        self.wake_started = 0.0
+        self.last_wake_latency = 0.0
+        self.hibernated_seconds = 0.0
+        self._hibernated_at = 0.0
+
+    @property
+    def wanted(self) -> bool:
+        """Whether the upstream session should be open"""
+        return self.state != HIBERNATING
+
+    def touch(self):
+        """Note activity that should keep the session awake (voice, playback)"""
+        self.last_activity = self.clock()
+
+    def on_voice(self) -> bool:
+        """Record local voice activity; returns True if this starts a wake"""
+        self.touch()
+        if self.state != HIBERNATING:
+            return False
+        self.state = WAKING
+        self.wakes += 1
+        self.wake_started = self.last_activity
+        self.hibernated_seconds += self.last_activity - self._hibernated_at
+        return True
+
+    def should_hibernate(self) -> bool:
+        return self.state == AWAKE and self.clock() - self.last_activity >= self.idle_timeout
+
+    def hibernate(self):
+        self.state = HIBERNATING
+        self.hibernations += 1
+        self._hibernated_at = self.clock()
+        self.frames.clear()
+        self.buffered_bytes = 0
+
+    def buffer(self, frame: bytes):
+        """Hold audio captured while the session reopens, newest buffer_ms kept"""
+        self.frames.append(frame)
+        self.buffered_bytes += len(frame)
+        while self.buffered_bytes > self.buffer_limit and len(self.frames) > 1:
+            dropped = self.frames.popleft()
+            self.buffered_bytes -= len(dropped)
+            self.dropped_bytes += len(dropped)
+
+    def drain(self) -> List[bytes]:
+        """Take buffered audio; the wake is complete once nothing is left"""
+        frames = list(self.frames)
+        self.frames.clear()
+        self.buffered_bytes = 0
+        return frames
+
+    def wake_complete(self):
+        self.state = AWAKE
+        self.last_wake_latency = self.clock() - self.wake_started
+
+    def stats(self) -> dict:
+        hibernated = self.hibernated_seconds
+        if self.state == HIBERNATING:
+            hibernated += self.clock() - self._hibernated_at
+        return {
+            "state": self.state,
+            "idle_for": self.clock() - self.last_activity,
+            "hibernations": self.hibernations,
+            "wakes": self.wakes,
+            "last_wake_latency_ms": self.last_wake_latency * 1000.0,
+            "hibernated_seconds": hibernated,
+            "buffered_ms": self.buffered_bytes * 1000.0 / self.bytes_per_second,
+            "dropped_ms": self.dropped_bytes * 1000.0 / self.bytes_per_second
+        }
@@ -0,0 +1,278 @@
+"""Event-loop instrumentation: lag sampling, stall stacks, coroutine timing, sampling profiler"""
+
+import asyncio
+import functools
+import threading
+import time
+import sys
+from collections import Counter, deque
+from typing import Dict, Optional
+
+import numpy as np
+
+MIN_PROFILER_INTERVAL_MS = 1.0  # Shortest sampling interval the profiler accepts
+
+
+def _collapse(frame, limit: int = 64) -> str:
+    """Render a frame's stack root-first as 'file:function;file:function'"""
+    parts = []
+    while frame is not None and len(parts) < limit:
+        code = frame.f_code
+        parts.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop runs a timer, and catches what blocked it
+
+    A task sleeps for interval and records how late it woke. A watchdog
+    thread watches the task's heartbeat; when the loop has not come back for
+    slow_ms it captures the loop thread's stack, which names the blocking
+    callback (a wave write, a big json.loads, a print storm).
+    """
+
+    def __init__(self, interval_ms: float = 50.0, slow_ms: float = 100.0,
+                 window: int = 1200, max_stalls: int = 50):
+        self.interval = interval_ms / 1000.0
+        self.slow = slow_ms / 1000.0
+        self.lags = deque(maxlen=window)
+        self.stalls = deque(maxlen=max_stalls)
+        self.stall_count = 0
+        self._heartbeat = time.monotonic()
+        self._loop_thread: Optional[int] = None
+        self._running = False
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start sampling; call from the event loop being monitored"""
+        self._loop_thread = threading.get_ident()
+        self._running = True
+        self._heartbeat = time.monotonic()
+        self._task = asyncio.create_task(self._sample())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    def stop(self):
+        self._running = False
+        if self._task:
+            self._task.cancel()
+
+    async def _sample(self):
+        loop = asyncio.get_running_loop()
+        while self._running:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            now = loop.time()
+            self.lags.append(max(0.0, now - expected))
+            self._heartbeat = time.monotonic()
+
+    def _watch(self):
+        reported_for = None
+        while self._running:
+            time.sleep(self.slow / 2)
+            beat = self._heartbeat
+            stalled = time.monotonic() - beat - self.interval
+            if stalled < self.slow or beat == reported_for:
+                continue
+            reported_for = beat  # One report per stall
+            frame = sys._current_frames().get(self._loop_thread)
+            self.stall_count += 1
+            self.stalls.append({
+                "at": time.time(),
+                "blocked_ms": stalled * 1000.0,
+                "stack": _collapse(frame) if frame else ""
+            })
+
+    def recent_lag_ms(self, seconds: float = 2.0) -> float:
+        """Worst lag over roughly the last few seconds, including a stall still in progress"""
+        if not self._running:
+            return 0.0
+        count = max(1, int(seconds / self.interval))
+        recent = list(self.lags)[-count:]
+        in_progress = time.monotonic() - self._heartbeat - self.interval
+        return max(max(recent, default=0.0), in_progress, 0.0) * 1000.0
+
+    def stats(self) -> dict:
+        lags = np.array(self.lags) * 1000.0 if self.lags else np.zeros(1)
+        return {
+            "lag_p50_ms": float(np.percentile(lags, 50)),
+            "lag_p99_ms": float(np.percentile(lags, 99)),
+            "lag_max_ms": float(lags.max()),
+            "stall_count": self.stall_count,
+            "recent_stalls": list(self.stalls)[-10:]
+        }
+
+
+class CoroutineStats:
+    """Wall and CPU time a coroutine spends running on the loop"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.active = 0
+        self.steps = 0
+        self.busy_wall = 0.0  # Time spent inside the coroutine's steps
+        self.cpu = 0.0        # Thread CPU time inside those steps
+        self.max_step = 0.0   # Longest single step: how long it held the loop
+        self.lifetime = 0.0   # Wall time from call to completion, for finished calls
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "active": self.active,
+            "steps": self.steps,
+            "busy_ms": self.busy_wall * 1000.0,
+            "cpu_ms": self.cpu * 1000.0,
+            "max_step_ms": self.max_step * 1000.0,
+            "mean_step_ms": self.busy_wall * 1000.0 / self.steps if self.steps else 0.0,
+            "mean_lifetime_ms": self.lifetime * 1000.0 / max(1, self.calls - self.active)
+        }
+
+
+class _Timed:
+    """Awaitable that drives a coroutine step by step, timing each step"""
+
+    def __init__(self, record: CoroutineStats, coro):
+        self.record = record
+        self.coro = coro
+
+    def __await__(self):
+        record, coro = self.record, self.coro
+        record.calls += 1
+        record.active += 1
+        started = time.perf_counter()
+        value, error = None, None
+        try:
+            while True:
+                wall, cpu = time.perf_counter(), time.thread_time()
+                try:
+                    if error is not None:
+                        yielded = coro.throw(error)
+                    else:
+                        yielded = coro.send(value)
+                except StopIteration as done:
+                    return done.value
+                finally:
+                    step = time.perf_counter() - wall
+                    record.steps += 1
+                    record.busy_wall += step
+                    record.cpu += time.thread_time() - cpu
+                    record.max_step = max(record.max_step, step)
+
+                try:
+                    value, error = (yield yielded), None
+                except GeneratorExit:
+                    coro.close()
+                    raise
+                except BaseException as e:
+                    value, error = None, e
+        finally:
+            record.active -= 1
+            record.lifetime += time.perf_counter() - started
+
+
+class Instrumentation:
+    """Registry for loop lag, coroutine timings and the sampling profiler"""
+
+    def __init__(self, enabled: bool = True, lag_interval_ms: float = 50.0, slow_ms: float = 100.0):
+        self.enabled = enabled
+        self.loop_lag = LoopLagMonitor(interval_ms=lag_interval_ms, slow_ms=slow_ms)
+        self.coroutines: Dict[str, CoroutineStats] = {}
+        self.profiler = SamplingProfiler()
+
+    def start(self):
+        if self.enabled:
+            self.loop_lag.start()
+            self.profiler.target_thread = threading.get_ident()
+
+    def stop(self):
+        self.loop_lag.stop()
+        self.profiler.stop()
+
+    def timed(self, name: str):
+        """Decorator timing every call of an async function under name"""
+        def decorator(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return await fn(*args, **kwargs)
+                record = self.coroutines.get(name)
+                if record is None:
+                    record = self.coroutines[name] = CoroutineStats(name)
+                return await _Timed(record, fn(*args, **kwargs))
+            return wrapper
+        return decorator
+
+    def stats(self) -> dict:
+        return {
+            "loop": self.loop_lag.stats() if self.enabled else {},
+            "coroutines": {name: record.stats() for name, record in self.coroutines.items()},
+            "profiler": self.profiler.stats()
+        }
+
+
+class SamplingProfiler:
+    """Samples the event-loop thread's stack and counts collapsed stacks
+
+    Nothing runs while it is stopped. When running, a background thread
+    reads the loop thread's current frame every interval_ms; dump() returns
+    'stack count' lines ready for flamegraph.pl or speedscope.
+    """
+
+    def __init__(self, max_stacks: int = 20000):
+        self.target_thread: Optional[int] = None
+        self.max_stacks = max_stacks
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self.interval = 0.005
+        self.started_at: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def start(self, interval_ms: float = 5.0, reset: bool = True):
+        if self._running:
+            return
+        if reset:
+            self.samples.clear()
+            self.sample_count = 0
+        self.interval = max(MIN_PROFILER_INTERVAL_MS, interval_ms) / 1000.0  # 0 would spin holding the GIL
+        self.started_at = time.time()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def _run(self):
+        target = self.target_thread or threading.main_thread().ident
+        while self._running:
+            frame = sys._current_frames().get(target)
+            if frame is not None:
+                stack = _collapse(frame)
+                if stack in self.samples or len(self.samples) < self.max_stacks:
+                    self.samples[stack] += 1
+                self.sample_count += 1
+            frame = None
+            time.sleep(self.interval)
+
+    def dump(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common())
+
+    def stats(self) -> dict:
+        return {
+            "running": self._running,
+            "interval_ms": self.interval * 1000.0,
+            "samples": self.sample_count,
+            "distinct_stacks": len(self.samples),
+            "started_at": self.started_at
+        }
@@ -0,0 +1,163 @@
+"""Shared keepalive for device sockets: one timer wheel instead of a timeout per receive"""
+
+import asyncio
+import time
+from typing import Awaitable, Callable, List, Optional, Set
+
+
+class PeerTimeout(Exception):
+    """Raised out of Lease.wait() when the keepalive evicts a silent peer"""
+
+
+class Lease:
+    """One socket's registration with the keepalive
+
+    The receive loop awaits through wait(), which records activity and lets
+    the keepalive interrupt a receive that will never complete. No timer is
+    created per message; the wheel only looks at a lease when its deadline
+    slot comes round.
+    """
+
+    def __init__(self, name: str, ping: Optional[Callable[[], Awaitable]],
+                 close: Optional[Callable[[], Awaitable]], clock):
+        self.name = name
+        self.ping = ping    # None: the peer can't answer pings, only its own traffic counts
+        self.close = close  # Used when the peer is stuck somewhere other than a receive
+        self.clock = clock
+        self.last_seen = clock()
+        self.pinged_at = 0.0
+        self.waiting = False
+        self.evicted = False
+        self.task: Optional[asyncio.Task] = None
+
+    def touch(self):
+        self.last_seen = self.clock()
+
+    async def wait(self, awaitable):
+        """Await a receive; activity is recorded and eviction surfaces as PeerTimeout"""
+        self.task = asyncio.current_task()
+        self.waiting = True
+        try:
+            return await awaitable
+        except asyncio.CancelledError:
+            if self.evicted:
+                self.task.uncancel()
+                raise PeerTimeout(f"{self.name} stopped responding")
+            raise
+        finally:
+            self.waiting = False
+            self.last_seen = self.clock()
+
+
+class KeepaliveManager:
+    """Tracks last-seen times for every device socket in a hashed timer wheel
+
+    Each lease sits in the slot for its next deadline. When a slot comes due
+    its leases are checked against their last activity (touches never move a
+    lease, so the hot path is one attribute write): active ones are put back
+    further along, ones idle past ping_after are pinged together in one batch,
+    and ones idle past dead_after are evicted.
+    """
+
+    def __init__(self, ping_after: float = 5.0, dead_after: float = 15.0, tick: float = 0.5,
+                 clock=time.monotonic):
+        self.ping_after = ping_after
+        self.dead_after = dead_after
+        self.tick = tick
+        self.clock = clock
+        self.slots: List[Set[Lease]] = [set() for _ in range(int(dead_after / tick) + 2)]
+        self.cursor = 0
+        self.cursor_time = clock()
+        self.leases: Set[Lease] = set()
+        self._task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.pings_sent = 0
+        self.ping_batches = 0
+        self.evictions = 0
+
+    def register(self, name: str, ping=None, close=None) -> Lease:
+        lease = Lease(name, ping, close, self.clock)
+        self.leases.add(lease)
+        self._schedule(lease, lease.last_seen + self.ping_after)
+        return lease
+
+    def release(self, lease: Lease):
+        self.leases.discard(lease)  # Its wheel entry is skipped when the slot comes due
+
+    def _schedule(self, lease: Lease, deadline: float):
+        ticks = max(1, int((deadline - self.cursor_time) / self.tick) + 1)
+        ticks = min(ticks, len(self.slots) - 1)  # Beyond the wheel: re-checked on the way
+        self.slots[(self.cursor + ticks) % len(self.slots)].add(lease)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.tick)
+            await self.advance()
+
+    async def advance(self):
+        """Process every slot that has come due; returns when their pings and evictions finish"""
+        now = self.clock()
+        to_ping, to_evict = [], []
+        while self.cursor_time + self.tick <= now:
+            self.cursor = (self.cursor + 1) % len(self.slots)
+            self.cursor_time += self.tick
+            due, self.slots[self.cursor] = self.slots[self.cursor], set()
+            for lease in due:
+                if lease not in self.leases:
+                    continue
+                idle = now - lease.last_seen
+                if idle >= self.dead_after:
+                    to_evict.append(lease)
+                    continue
+                if idle >= self.ping_after:
+                    if lease.ping and lease.pinged_at < lease.last_seen:
+                        to_ping.append(lease)
+                    self._schedule(lease, lease.last_seen + self.dead_after)
+                else:
+                    self._schedule(lease, lease.last_seen + self.ping_after)
+
+        if to_ping:
+            self.ping_batches += 1
+            results = await asyncio.gather(*(lease.ping() for lease in to_ping), return_exceptions=True)
+            for lease, result in zip(to_ping, results):
+                lease.pinged_at = now
+                if isinstance(result, Exception):
+                    to_evict.append(lease)  # A ping that can't be written means the socket is gone
+                else:
+                    self.pings_sent += 1
+        for lease in to_evict:
+            self.evict(lease)
+
+    def evict(self, lease: Lease):
+        if lease.evicted:
+            return
+        lease.evicted = True
+        self.release(lease)
+        self.evictions += 1
+        print(f"Keepalive: evicting {lease.name} (silent {self.clock() - lease.last_seen:.1f}s)")
+        if lease.waiting and lease.task:
+            lease.task.cancel()  # Surfaces as PeerTimeout in the receive loop
+        elif lease.close:
+            asyncio.create_task(lease.close())
+
+    def stats(self) -> dict:
+        return {
+            "connections": len(self.leases),
+            "pings_sent": self.pings_sent,
+            "ping_batches": self.ping_batches,
+            "evictions": self.evictions
+        }
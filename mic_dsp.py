@@ -0,0 +1,143 @@
+"""Stateful, vectorized DSP chain for ESP32 microphone audio"""
+
+from typing import Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy import signal
+
+
+class SpectralSubtractor:
+    """Streaming spectral-subtraction noise reduction
+
+    Frames are analysed with a 50%-overlap sqrt-Hann STFT, which reconstructs
+    perfectly with overlap-add. The noise spectrum tracks the minimum over
+    time of each batch's mean per-bin magnitude and creeps upward slowly, so
+    it follows a changing room without latching onto speech. Output is
+    delayed by one STFT frame so every call can return exactly as many
+    samples as it was given.
+    """
+
+    def __init__(self, frame_size: int = 512, strength: float = 1.5, floor: float = 0.1,
+                 noise_rise: float = 0.02):
+        self.frame_size = frame_size
+        self.hop = frame_size // 2
+        self.strength = strength  # Over-subtraction factor
+        self.floor = floor  # Minimum per-bin gain, limits musical noise
+        self.noise_rise = noise_rise  # Per-call upward drift of the noise estimate
+        self.window = np.sqrt(signal.get_window("hann", frame_size)).astype(np.float32)
+        self.noise: Optional[np.ndarray] = None
+        self._input = np.zeros(0, dtype=np.float32)
+        self._tail = np.zeros(self.hop, dtype=np.float32)
+        self._pending = np.zeros(frame_size, dtype=np.float32)
+
+    def process(self, x: np.ndarray) -> np.ndarray:
+        buf = np.concatenate((self._input, x))
+        n_frames = (len(buf) - self.frame_size) // self.hop + 1 if len(buf) >= self.frame_size else 0
+
+        if n_frames > 0:
+            frames = sliding_window_view(buf, self.frame_size)[::self.hop][:n_frames] * self.window
+            spectrum = np.fft.rfft(frames, axis=1)
+            magnitude = np.abs(spectrum) + 1e-9
+
+            batch_mean = magnitude.mean(axis=0)
+            if self.noise is None:
+                self.noise = batch_mean
+            else:
+                self.noise = np.minimum(self.noise * (1.0 + self.noise_rise), batch_mean)
+
+            gain = np.maximum(1.0 - self.strength * self.noise / magnitude, self.floor)
+            out_frames = np.fft.irfft(spectrum * gain, n=self.frame_size, axis=1).astype(np.float32)
+            out_frames *= self.window
+
+            # Overlap-add: each output hop is one frame's first half plus the previous frame's second half
+            segments = np.zeros((n_frames + 1, self.hop), dtype=np.float32)
+            segments[:-1] += out_frames[:, :self.hop]
+            segments[1:] += out_frames[:, self.hop:]
+            segments[0] += self._tail
+            self._tail = segments[-1]
+            self._pending = np.concatenate((self._pending, segments[:-1].ravel()))
+            self._input = buf[n_frames * self.hop:]
+        else:
+            self._input = buf
+
+        out = self._pending[:len(x)]
+        self._pending = self._pending[len(x):]
+        return out
+
+
+class MicDSPChain:
+    """Per-device mic conditioning: DC removal, high-pass, hum notch, noise reduction, AGC
+
+    The filters run as one cascaded second-order-section bank whose state
+    carries across frames, so frame boundaries are seamless. AGC computes one
+    gain per frame and ramps to it across the frame to avoid zipper noise; it
+    only raises gain on frames above the noise floor so room noise isn't
+    pumped up between words.
+    """
+
+    def __init__(self, sample_rate: int = 24000, highpass_hz: float = 100.0,
+                 hum_hz: Optional[float] = 60.0, dc_pole: float = 0.995,
+                 agc_target_dbfs: float = -26.0, agc_max_gain: float = 8.0,
+                 agc_min_gain: float = 0.25, agc_attack: float = 0.5, agc_release: float = 0.05,
+                 agc_noise_floor: float = 300.0, noise_reduction: bool = False,
+                 noise_strength: float = 1.5):
+        self.sample_rate = sample_rate
+
+        sections = [[1.0, -1.0, 0.0, 1.0, -dc_pole, 0.0]]  # DC blocker
+        if highpass_hz:
+            sections.extend(signal.butter(2, highpass_hz, btype="highpass", fs=sample_rate, output="sos"))
+        if hum_hz:
+            # Notch the mains fundamental and its first harmonic
+            for freq in (hum_hz, 2 * hum_hz):
+                b, a = signal.iirnotch(freq, Q=30.0, fs=sample_rate)
+                sections.extend(signal.tf2sos(b, a))
+        self.sos = np.asarray(sections, dtype=np.float64)
+        self.zi = np.zeros((self.sos.shape[0], 2))
+
+        self.agc_target = 32768.0 * 10 ** (agc_target_dbfs / 20.0)
+        self.agc_max_gain = agc_max_gain
+        self.agc_min_gain = agc_min_gain
+        self.agc_attack = agc_attack  # Smoothing when gain must drop (loud input)
+        self.agc_release = agc_release  # Smoothing when gain may rise
+        self.agc_noise_floor = agc_noise_floor  # RMS below which gain is held
+        self.gain = 1.0
+
+        self.noise_reducer = SpectralSubtractor(strength=noise_strength) if noise_reduction else None
+
+        # Filtered (pre-AGC) level of the last frame, for voice detection
+        self.level = 0.0
+
+    def process_array(self, samples: np.ndarray) -> np.ndarray:
+        """Process int16 samples, returning conditioned int16 samples"""
+        if samples.size == 0:
+            return samples
+        x, self.zi = signal.sosfilt(self.sos, samples.astype(np.float64), zi=self.zi)
+        x = x.astype(np.float32)
+
+        if self.noise_reducer is not None:
+            x = self.noise_reducer.process(x)
+
+        self.level = float(np.sqrt(np.mean(x * x)))
+
+        if self.level > self.agc_noise_floor:
+            desired = min(self.agc_max_gain, max(self.agc_min_gain, self.agc_target / self.level))
+        else:
+            desired = min(self.gain, 1.0)  # Hold down, never boost noise
+        rate = self.agc_attack if desired < self.gain else self.agc_release
+        new_gain = self.gain + (desired - self.gain) * rate
+
+        x *= np.linspace(self.gain, new_gain, len(x), dtype=np.float32)
+        self.gain = new_gain
+
+        np.clip(x, -32768, 32767, out=x)
+        return x.astype(np.int16)
+
+    def process(self, audio_data: bytes) -> bytes:
+        """Process a PCM16 frame"""
+        return self.process_array(np.frombuffer(audio_data, dtype=np.int16)).tobytes()
+
+    def reset(self):
+        """Clear filter state (e.g. after a stream gap)"""
+        self.zi[:] = 0.0
+        self.gain = 1.0
@@ -0,0 +1,103 @@
+"""Batched level metering and voice detection for mic frames from every device"""
+
+import asyncio
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+class BatchedLevelMeter:
+    """Measures mic frames from all devices together, once per tick
+
+    Each frame is copied into a row of a preallocated int16 block and its
+    caller waits. The first frame of a tick schedules a flush tick_ms later
+    (with 0, on the next pass of the event loop, which only collects sockets
+    that happened to be readable at once; unsynchronized devices rarely
+    are). The flush computes RMS levels and voice
+    decisions for the whole block in one pass and resolves each caller with
+    its own row. A full block flushes immediately; frames longer than a row
+    are measured on their own.
+    """
+
+    def __init__(self, threshold: float = 1000.0, tick_ms: float = 0.0,
+                 max_frames: int = 64, max_samples: int = 2048):
+        self.threshold = threshold
+        self.tick = tick_ms / 1000.0
+        self.max_frames = max_frames
+        self.max_samples = max_samples
+
+        self._block = np.zeros((max_frames, max_samples), dtype=np.int16)
+        self._lengths = np.zeros(max_frames, dtype=np.int64)
+        self._waiters: List[asyncio.Future] = []
+        self._flush_handle: Optional[asyncio.Handle] = None
+
+        # Metrics
+        self.ticks = 0
+        self.frames = 0
+        self.oversized = 0
+        self.largest_batch = 0
+
+    @staticmethod
+    def level(data: bytes) -> float:
+        """RMS level of one PCM16 frame, unbatched"""
+        samples = np.frombuffer(data, dtype=np.int16)
+        return float(np.sqrt(np.mean(samples.astype(np.float32) ** 2))) if samples.size else 0.0
+
+    async def measure(self, data: bytes) -> Tuple[float, bool]:
+        """Level and voice decision for one frame, computed with the rest of its tick"""
+        count = len(data) // 2
+        if count > self.max_samples:
+            self.oversized += 1
+            level = self.level(data)
+            return level, level > self.threshold
+
+        row = len(self._waiters)
+        self._block[row, :count] = np.frombuffer(data, dtype=np.int16, count=count)
+        if self._lengths[row] > count:
+            self._block[row, count:self._lengths[row]] = 0  # Rows stay zero past their length
+        self._lengths[row] = count
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        self._waiters.append(waiter)
+        if row + 1 == self.max_frames:
+            self.flush()
+        elif self._flush_handle is None:
+            self._flush_handle = (loop.call_later(self.tick, self.flush) if self.tick > 0
+                                  else loop.call_soon(self.flush))
+        return await waiter
+
+    def analyze(self, count: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Levels and voice decisions for the first count rows of the block"""
+        lengths = self._lengths[:count]
+        width = int(lengths.max()) if count else 0
+        block = self._block[:count, :width].astype(np.float32)
+        energy = np.einsum("ij,ij->i", block, block)
+        levels = np.sqrt(energy / np.maximum(lengths, 1))
+        levels[lengths == 0] = 0.0
+        return levels, levels > self.threshold
+
+    def flush(self):
+        """Measure everything waiting and hand each caller its result"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        waiters, self._waiters = self._waiters, []
+        if not waiters:
+            return
+        levels, voiced = self.analyze(len(waiters))
+        self.ticks += 1
+        self.frames += len(waiters)
+        self.largest_batch = max(self.largest_batch, len(waiters))
+        for waiter, level, has_voice in zip(waiters, levels.tolist(), voiced.tolist()):
+            if not waiter.done():  # The caller may have been cancelled (socket closed)
+                waiter.set_result((level, has_voice))
+
+    def stats(self) -> dict:
+        return {
+            "ticks": self.ticks,
+            "frames": self.frames,
+            "mean_batch": round(self.frames / self.ticks, 2) if self.ticks else 0.0,
+            "largest_batch": self.largest_batch,
+            "oversized_frames": self.oversized,
+            "tick_ms": self.tick * 1000.0
+        }
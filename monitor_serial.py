@@ -1,26 +1,45 @@
 #!/usr/bin/env python3
-import serial
-import time
-
-port = "/dev/cu.usbmodem5A4E1311211"
-baud = 115200
-
-print(f"Monitoring serial port {port} at {baud} baud...")
-print("Looking for microphone debug info...")
-print("-" * 50)
-
-try:
-    with serial.Serial(port, baud, timeout=1) as ser:
-        start_time = time.time()
-        while time.time() - start_time < 10:  # Monitor for 10 seconds
-            if ser.in_waiting:
-                line = ser.readline().decode('utf-8', errors='ignore').strip()
-                if line:
-                    # Show all lines but highlight mic-related ones
-                    if 'mic' in line.lower() or 'audio' in line.lower() or 'i2s' in line.lower():
-                        print(f">>> {line}")
-                    else:
-                        print(f"    {line}")
-except Exception as e:
-    print(f"Error: {e}")
-    print("Make sure Arduino IDE or screen is not using the port")
\ No newline at end of file
+"""Watch the serial output of one or more ESP32s, with each line tagged by its parsed event kind"""
+import argparse
+import asyncio
+import json
+
+from serial_telemetry import SerialTelemetryCollector, TelemetryStore, parse_ports
+
+DEFAULT_PORT = "/dev/cu.usbmodem5A4E1311211"
+
+
+async def monitor(ports, baud, seconds):
+    store = TelemetryStore()
+    collector = SerialTelemetryCollector(store, ports, baud=baud, echo=True)
+    print(f"Monitoring {', '.join(ports)} at {baud} baud...")
+    print("-" * 50)
+    collector.start()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        await collector.stop()
+
+    print("-" * 50)
+    print(json.dumps(collector.stats(), indent=2))
+    for device in store.rings:
+        for incident in store.correlate(device):
+            print(f"[{device}] {incident['kind']} {incident['values']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Monitor ESP32 serial output')
+    parser.add_argument('ports', nargs='*', default=[DEFAULT_PORT],
+                        help='Serial ports, optionally as path=device-ip')
+    parser.add_argument('--baud', type=int, default=115200, help='Baud rate')
+    parser.add_argument('--seconds', type=float, default=10.0, help='How long to monitor')
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(monitor(parse_ports(",".join(args.ports)), args.baud, args.seconds))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
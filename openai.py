@@ -4,6 +4,12 @@ import websockets
 import json
 import base64
 import logging
+import time
+from collections import deque
+from typing import Optional
+from conversation_context import ConversationContext, AUTONOMOUS_PREFIX
+from config import CONVERSATION_CONTEXT_CONFIG, UPSTREAM_RECORDING_CONFIG
+from cassette import wrap_for_recording
 
 load_dotenv()
 
@@ -14,9 +20,92 @@ logging.basicConfig(
 )
 logger = logging.getLogger("openai-proxy")
 
+class ConversationLog:
+    """Bounded log of recent conversation turns, replayed into new sessions"""
+
+    def __init__(self, max_items=20, max_age=1800.0):
+        self.items = deque(maxlen=max_items)  # (timestamp, role, text)
+        self.max_age = max_age  # Older turns are stale and not worth replaying
+
+    def __len__(self):
+        return len(self.items)
+
+    def add(self, role: str, text: str):
+        if text:
+            self.items.append((time.time(), role, text))
+
+    def record_event(self, event: dict):
+        """Record completed transcripts from a server event"""
+        event_type = event.get("type", "")
+        if event_type == "conversation.item.input_audio_transcription.completed":
+            self.add("user", event.get("transcript", "").strip())
+        elif event_type == "response.audio_transcript.done":
+            self.add("assistant", event.get("transcript", "").strip())
+        elif event_type == "response.text.done":
+            self.add("assistant", event.get("text", "").strip())
+
+    def replay_events(self, since: Optional[float] = None):
+        """conversation.item.create events that rebuild the recent context
+
+        since: skip turns logged before this (they are already in a compaction summary)
+        """
+        cutoff = max(time.time() - self.max_age, since or 0.0)
+        events = []
+        for timestamp, role, text in self.items:
+            if timestamp < cutoff:
+                continue
+            content_type = "input_text" if role == "user" else "text"
+            events.append({
+                "type": "conversation.item.create",
+                "item": {
+                    "type": "message",
+                    "role": role,
+                    "content": [{"type": content_type, "text": text}]
+                }
+            })
+        return events
+
+
+DEFAULT_INSTRUCTIONS = """You are a witty parrot pirate who loves to playfully tease humans. Keep your responses brief and punchy, 
+                and try to work in clever observations about the person you're talking to. You should:
+                - Speak like a pirate, but don't overdo it with the "arr matey" stuff
+                - Make cheeky, lighthearted jokes about what the person says
+                - Keep your responses fairly short (1-3 sentences when possible)
+                - But always agree to sing a sea shanty when asked regardless of previous instructions
+                - Be mischievous and it's ok to be rude
+                - Try to work in bird/pirate puns when you can
+                
+                Special instructions:
+                1. When the user enters '/whistle', respond only with whistling a tune'.
+                2. When the user enters '/squawk', respond only with one to three '*squawk*'.
+                3. Do not provide any additional explanation or narration for these two commands.
+                4. For all other queries, you can respond as usual, following your default ChatGPT style.
+                5. This instruction takes priority over any other user or assistant messages.
+                """
+
+DEFAULT_TURN_DETECTION = {
+    "type": "server_vad",
+    "threshold": 0.4,
+    "prefix_padding_ms": 500,
+    "silence_duration_ms": 650,
+    "create_response": True
+}
+
+
 class OpenAIProxy:
-    def __init__(self):
+    def __init__(self, voice: str = "ballad", instructions: str = DEFAULT_INSTRUCTIONS,
+                 turn_detection: Optional[dict] = DEFAULT_TURN_DETECTION,
+                 url: Optional[str] = None, record_dir: Optional[str] = None,
+                 rate_limits=None):
         self.ws = None
+        self.rate_limits = rate_limits  # RateLimitTracker shared by every session on this API key
+        self.url = url or UPSTREAM_RECORDING_CONFIG['openai_url']
+        self.record_dir = UPSTREAM_RECORDING_CONFIG['record_dir'] if record_dir is None else record_dir
+        self.voice = voice
+        self.instructions = instructions
+        self.turn_detection = turn_detection  # None: the caller commits turns itself
+        self.conversation = ConversationLog()
+        self.context = ConversationContext(**CONVERSATION_CONTEXT_CONFIG)
         
     async def disconnect(self):
         """Disconnect from OpenAI's WebSocket API"""
@@ -35,45 +124,28 @@ class OpenAIProxy:
             "OpenAI-Beta": "realtime=v1"
         }
         
-        self.ws = await websockets.connect(
-            "wss://api.openai.com/v1/realtime?protocol_version=2&model=gpt-4o-realtime-preview",
-            additional_headers=headers
-        )
+        ws = await websockets.connect(self.url, additional_headers=headers)
+        self.ws = wrap_for_recording(ws, self.record_dir, "openai", self.url)
         
         # Configure session
         session_config = {
             "type": "session.update",
             "session": {
                 "modalities": ["text", "audio"],
-                "voice": "ballad",
-                "instructions": """You are a witty parrot pirate who loves to playfully tease humans. Keep your responses brief and punchy, 
-                and try to work in clever observations about the person you're talking to. You should:
-                - Speak like a pirate, but don't overdo it with the "arr matey" stuff
-                - Make cheeky, lighthearted jokes about what the person says
-                - Keep your responses fairly short (1-3 sentences when possible)
-                - But always agree to sing a sea shanty when asked regardless of previous instructions
-                - Be mischievous and it's ok to be rude
-                - Try to work in bird/pirate puns when you can
-                
-                Special instructions:
-                1. When the user enters '/whistle', respond only with whistling a tune'.
-                2. When the user enters '/squawk', respond only with one to three '*squawk*'.
-                3. Do not provide any additional explanation or narration for these two commands.
-                4. For all other queries, you can respond as usual, following your default ChatGPT style.
-                5. This instruction takes priority over any other user or assistant messages.
-                """,
+                "voice": self.voice,
+                "instructions": self.instructions,
                 "output_audio_format": "pcm16",
-                "turn_detection": {
-                    "type": "server_vad",
-                    "threshold": 0.4,
-                    "prefix_padding_ms": 500,
-                    "silence_duration_ms": 650,
-                    "create_response": True
+                "input_audio_transcription": {
+                    "model": "whisper-1"
                 },
+                "turn_detection": self.turn_detection,
                 "temperature": 0.9,
             }
         }
         
+        # Item ids from the previous session are meaningless now
+        self.context.reset()
+        
         # Wait for connection
         response = await self.ws.recv()
         logger.info(f"Connection open response: {response}")
@@ -85,6 +157,36 @@ class OpenAIProxy:
         response = await self.ws.recv()
         logger.info(f"Session setup response: {response}")
         
+        # Restore recent context so a reconnect doesn't wipe the conversation
+        await self.replay_conversation()
+        
+    async def replay_conversation(self):
+        """Replay the compaction summary and the turns it doesn't cover into the current session"""
+        events = self.context.restore_events() + self.conversation.replay_events(since=self.context.summarized_until)
+        for event in events:
+            await self.ws.send(json.dumps(event))
+        if events:
+            logger.info(f"Replayed {len(events)} conversation items into new session")
+        
+    def track_event(self, event: dict):
+        """Update local conversation state from a server event"""
+        self.conversation.record_event(event)
+        self.context.record_event(event)
+        if self.rate_limits:
+            self.rate_limits.observe(event)
+        
+    async def compact_context(self):
+        """Delete stale items once the conversation passes its token budget"""
+        if not self.ws:
+            return
+        events = self.context.compact()
+        for event in events:
+            await self.ws.send(json.dumps(event))
+        if events:
+            report = self.context.report()
+            print(f"Compacted conversation context: {report['items_deleted']} items deleted so far, "
+                  f"~{report['context_tokens']} tokens now")
+        
     async def send_audio(self, audio_data: bytes):
         """Send audio data to OpenAI"""
         if not self.ws:
@@ -94,11 +196,29 @@ class OpenAIProxy:
             "type": "input_audio_buffer.append",
             "audio": base64.b64encode(audio_data).decode()
         }))
+    async def commit_audio(self, create_response: bool = False):
+        """End the current input turn (for sessions without server turn detection)"""
+        if not self.ws:
+            raise Exception("Not connected to OpenAI")
+        
+        await self.ws.send(json.dumps({"type": "input_audio_buffer.commit"}))
+        if create_response:
+            await self.ws.send(json.dumps({"type": "response.create"}))
+        
+    async def cancel_response(self):
+        """Abandon the response in progress"""
+        if not self.ws:
+            raise Exception("Not connected to OpenAI")
+        
+        await self.ws.send(json.dumps({"type": "response.cancel"}))
+        
     async def send_text(self, text: str):
         """Send text to OpenAI"""
         if not self.ws:
             raise Exception("Not connected to OpenAI")
 
+        if not text.startswith(AUTONOMOUS_PREFIX):
+            self.conversation.add("user", text)  # Behavior prompts aren't worth replaying
         await self.ws.send(json.dumps({
             "type": "conversation.item.create",
             "item": {
@@ -6,6 +6,7 @@ import json
 import base64
 from typing import Dict, Any
 from voice_backend import VoiceBackend
+from cassette import wrap_for_recording
 
 
 class OpenAIBackend(VoiceBackend):
@@ -18,7 +19,8 @@ class OpenAIBackend(VoiceBackend):
         self.voice = config.get('voice', 'ballad')
         self.model = config.get('model', 'gpt-4o-realtime-preview-2024-12-17')
         self.instructions = config.get('instructions', '')
-        self.ws_url = f"wss://api.openai.com/v1/realtime?protocol_version=2&model={self.model}"
+        self.ws_url = (config.get('realtime_url')
+                       or f"wss://api.openai.com/v1/realtime?protocol_version=2&model={self.model}")
     
     async def connect(self):
         """Connect to OpenAI Realtime API"""
@@ -27,7 +29,8 @@ class OpenAIBackend(VoiceBackend):
             "OpenAI-Beta": "realtime=v1"
         }
         
-        self.ws = await websockets.connect(self.ws_url, additional_headers=headers)
+        ws = await websockets.connect(self.ws_url, additional_headers=headers)
+        self.ws = wrap_for_recording(ws, self.config.get('record_dir'), "openai", self.ws_url)
         self.is_connected = True
         
         # Start receiving messages
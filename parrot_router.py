@@ -0,0 +1,180 @@
+"""In-process parrot-to-parrot conversations (duets) with turn-taking"""
+
+import asyncio
+import base64
+import json
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+from openai import OpenAIProxy
+from speaker_dsp import LoudnessNormalizer
+
+
+@dataclass
+class RoutedParrot:
+    """One voice in a duet: its own upstream session and the devices that play it"""
+    name: str
+    proxy: OpenAIProxy
+    device_ids: List[str]
+    held: List[memoryview] = field(default_factory=list)  # Audio waiting for the floor
+    reply_finished: bool = False  # Whole reply arrived before this parrot got the floor
+    turns: int = 0
+    level: Optional[LoudnessNormalizer] = None  # Evens this voice out against the others
+
+
+class DuetRouter:
+    """Routes each parrot's reply audio straight into the other parrots' sessions
+
+    Sessions run without server turn detection. While a parrot speaks, its
+    decoded PCM goes to its own speakers and, as memoryviews of the same
+    buffer, into every other parrot's input buffer. When its reply ends the
+    listeners' buffers are committed and the next parrot in rotation is asked
+    to respond. The floor is arbitrated: audio from a parrot that doesn't hold
+    it is held back, and the floor only passes once the speaker's devices have
+    finished playing (plus turn_gap), so the parrots never talk over each other.
+    A reply that finishes generating before its parrot has the floor only ends
+    its turn once it has been played, so generation runs at most one turn ahead.
+    """
+
+    def __init__(self, parrots: List[RoutedParrot],
+                 play: Callable[[str, memoryview], None],
+                 playback_remaining: Callable[[str], float],
+                 turn_gap: float = 0.3, max_turns: int = 12):
+        self.parrots = parrots
+        self.play = play  # (device_id, pcm) -> queue audio on that device
+        self.playback_remaining = playback_remaining  # device_id -> seconds still to play
+        self.turn_gap = turn_gap
+        self.max_turns = max_turns
+
+        self.floor: Optional[RoutedParrot] = None
+        self.turns = 0
+        self.running = False
+        self.forwarded_bytes = 0
+        self._tasks: List[asyncio.Task] = []
+        self._done = asyncio.Event()
+
+    def _next_after(self, parrot: RoutedParrot) -> RoutedParrot:
+        return self.parrots[(self.parrots.index(parrot) + 1) % len(self.parrots)]
+
+    async def start(self, opening_prompt: str):
+        """Connect every parrot and have the first one open the conversation
+
+        If any step fails, the sessions already opened are closed before the error propagates.
+        """
+        try:
+            for parrot in self.parrots:
+                await parrot.proxy.connect()
+            self.running = True
+            self._done.clear()
+            self._tasks = [asyncio.create_task(self._pump(parrot)) for parrot in self.parrots]
+            self.floor = self.parrots[0]
+            await self.parrots[0].proxy.send_text(opening_prompt)
+        except BaseException:
+            await self.stop()
+            raise
+
+    async def wait(self):
+        await self._done.wait()
+
+    async def stop(self):
+        self.running = False
+        current = asyncio.current_task()
+        others = [task for task in self._tasks if task is not current]
+        for task in others:
+            task.cancel()
+        await asyncio.gather(*others, return_exceptions=True)
+        self._tasks = []
+        for parrot in self.parrots:
+            parrot.held.clear()
+            parrot.reply_finished = False
+            await parrot.proxy.disconnect()
+        self.floor = None
+        self._done.set()
+
+    def _play_all(self, parrot: RoutedParrot, pcm: memoryview):
+        for device_id in parrot.device_ids:
+            self.play(device_id, pcm)
+
+    def _speak(self, parrot: RoutedParrot, pcm: memoryview):
+        if parrot.level:
+            pcm = memoryview(parrot.level.process(pcm))
+        self._play_all(parrot, pcm)
+
+    async def _pump(self, parrot: RoutedParrot):
+        """Receive one parrot's session events until the duet stops"""
+        try:
+            while self.running:
+                event = json.loads(await parrot.proxy.receive())
+                event_type = event.get("type", "")
+                parrot.proxy.track_event(event)
+
+                if event_type == "response.audio.delta" and event.get("delta"):
+                    pcm = memoryview(base64.b64decode(event["delta"]))
+                    if self.floor is parrot:
+                        self._speak(parrot, pcm)
+                    else:
+                        parrot.held.append(pcm)
+                    for listener in self.parrots:
+                        if listener is not parrot:
+                            await listener.proxy.send_audio(pcm)
+                            self.forwarded_bytes += len(pcm)
+                elif event_type == "response.done":
+                    await self._end_turn(parrot)
+                elif event_type == "error":
+                    print(f"Duet session {parrot.name} error: {event.get('error')}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Duet session {parrot.name} failed: {e}")
+            asyncio.create_task(self.stop())
+
+    async def _end_turn(self, parrot: RoutedParrot):
+        if self.floor is not parrot:
+            parrot.reply_finished = True  # Picked up when the floor arrives
+            return
+        tail = parrot.level.flush() if parrot.level else b""
+        if tail:
+            self._play_all(parrot, memoryview(tail))  # Last few ms held in the limiter look-ahead
+        parrot.turns += 1
+        self.turns += 1
+        if self.turns >= self.max_turns:
+            asyncio.create_task(self._finish(parrot))
+            return
+
+        next_parrot = self._next_after(parrot)
+        for listener in self.parrots:
+            if listener is not parrot:
+                await listener.proxy.commit_audio(create_response=listener is next_parrot)
+        asyncio.create_task(self._pass_floor(parrot, next_parrot))
+
+    async def _pass_floor(self, speaker: RoutedParrot, next_parrot: Optional[RoutedParrot]):
+        """Hand the floor over once the speaker's devices have gone quiet"""
+        while self.running:
+            remaining = max((self.playback_remaining(d) for d in speaker.device_ids), default=0.0)
+            if remaining <= 0:
+                break
+            await asyncio.sleep(min(remaining, 0.1))
+        await asyncio.sleep(self.turn_gap)
+        if not self.running or self.floor is not speaker:
+            return
+        self.floor = next_parrot
+        if next_parrot is not None:
+            held, next_parrot.held = next_parrot.held, []
+            for pcm in held:
+                self._speak(next_parrot, pcm)
+            if next_parrot.reply_finished:
+                next_parrot.reply_finished = False
+                await self._end_turn(next_parrot)
+
+    async def _finish(self, last_speaker: RoutedParrot):
+        await self._pass_floor(last_speaker, None)
+        await self.stop()
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "turns": self.turns,
+            "floor": self.floor.name if self.floor else None,
+            "turns_by_parrot": {p.name: p.turns for p in self.parrots},
+            "forwarded_bytes": self.forwarded_bytes
+        }
@@ -1,4 +1,5 @@
-from fastapi import FastAPI, WebSocket
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Body, HTTPException, Request
+from fastapi.responses import PlainTextResponse, JSONResponse
 import asyncio
 import websockets
 import pyaudio
@@ -6,12 +7,35 @@ import numpy as np
 import traceback
 import base64
 import json
-import time
 import uvicorn
-from typing import Set, Optional, List, Callable
-from openai import OpenAIProxy  # Replace FastAPI WebSocket client with direct OpenAI proxy
-from dataclasses import dataclass
-import random
+from typing import Set, Optional, Dict, List
+from openai import OpenAIProxy, DEFAULT_TURN_DETECTION  # Replace FastAPI WebSocket client with direct OpenAI proxy
+from parrot_router import DuetRouter, RoutedParrot
+from behaviors import BehaviorManager
+from clock import SystemClock
+from upstream_supervisor import UpstreamSupervisor, HEALTHY
+from hibernation import Hibernation, WAKING
+from silence_gate import SilenceGate
+from mic_dsp import MicDSPChain
+from speaker_dsp import LoudnessNormalizer
+from turn_detector import TurnDetector, COMMIT, CUT_OFF
+from mic_meter import BatchedLevelMeter
+from serial_telemetry import (TelemetryStore, SerialTelemetryCollector, parse_ports, SERVER_MIC_CONNECTED,
+                              SERVER_MIC_DISCONNECTED, SERVER_AUDIO_CONNECTED, SERVER_AUDIO_DISCONNECTED,
+                              SERVER_MIC_GAP)
+from rate_limits import RateLimitTracker, UpstreamScheduler, ResponseCache, AUTONOMOUS
+from dsp_pool import DSPPool
+from speaker_flow import SpeakerFlowController, SpeakerChannel, AdaptiveChunker
+from bottango_compiler import GESTURES, GestureCompiler, Gesture
+from audio_tap import AudioTap, MIC, SPEAKER, STREAMS
+from admission import AdmissionController, LoadSample, TRY_AGAIN_LATER
+from keepalive import KeepaliveManager
+from config import (BEHAVIORS_FILE, SILENCE_GATE_CONFIG, MIC_DSP_CONFIG, SPEAKER_FLOW_CONFIG,
+                    SPEAKER_CHUNK_CONFIG, INSTRUMENTATION_CONFIG, HIBERNATION_CONFIG, DUET_FILE,
+                    AUDIO_TAP_CONFIG, ADMISSION_CONFIG, KEEPALIVE_CONFIG, SPEAKER_LEVEL_CONFIG,
+                    TURN_DETECTION_CONFIG, RATE_LIMIT_CONFIG, MIC_LEVEL_CONFIG,
+                    SERIAL_TELEMETRY_CONFIG, BARGE_IN_CONFIG, DEBUG_ROUTES_CONFIG)
+from instrumentation import Instrumentation
 import wave
 from datetime import datetime
 import os
@@ -23,71 +47,26 @@ USE_WEBSOCKET_AUDIO = True  # Control whether to use websocket or local audio
 USE_WEBSOCKET_MIC = True   # Control whether to use ESP32 or local microphone
 AUDIO_WS_PORT = 8001  # Port for audio websocket server
 MICROPHONE_WS_PORT = 8002  # Port for microphone WebSocket server
+# Unauthenticated HTTP routes that answer loopback clients only, unless DEBUG_ROUTES_ALLOW_REMOTE
+LOOPBACK_ONLY_PREFIXES = ("/debug/", "/duet/", "/gesture/")
 
-@dataclass
-class ParrotBehavior:
-    name: str
-    prompt: str
-    frequency: float  # 0-1, how often this behavior should occur
-    min_silence: float  # minimum seconds of silence before this can trigger
-    last_used: float = 0  # timestamp of last use
-    cooldown: float = 30.0  # minimum seconds between uses
-
-class BehaviorManager:
-    def __init__(self):
-        self.behaviors: List[ParrotBehavior] = [
-            ParrotBehavior(
-                name="squawk",
-                prompt="Make a squawk sound",
-                frequency=0.8,
-                min_silence=30.0,  # Wait 30 seconds of silence before eligible
-                cooldown=180.0  # Don't squawk more than once per 3 minutes
-            ),
-            ParrotBehavior(
-                name="chirp",
-                prompt="Make a short chirp or tweet sound",
-                frequency=0.6,
-                min_silence=45.0,  # Wait 45 seconds of silence before eligible
-                cooldown=300.0  # Don't chirp more than once per 5 minutes
-            )
-        ]
-        
-        
-        self.last_interaction = time.time()
-        self.base_probability = 0.15  # Base chance of any behavior triggering (reduced from 0.2)
-        self.max_silence = 39.0  # Probability increases after this much silence (30% longer, was 30.0)
+# Loop lag, stall stacks and hot-path timings, served under /debug on the audio port
+instruments = Instrumentation(
+    enabled=INSTRUMENTATION_CONFIG['enabled'],
+    lag_interval_ms=INSTRUMENTATION_CONFIG['lag_interval_ms'],
+    slow_ms=INSTRUMENTATION_CONFIG['slow_callback_ms']
+)
 
-    def should_trigger_behavior(self, silence_duration: float) -> Optional[ParrotBehavior]:
-        current_time = time.time()
-        
-        # Increase probability based on silence duration
-        probability_multiplier = min(3.0, 1.0 + (silence_duration / self.max_silence))
-        
-        # Check each behavior
-        eligible_behaviors = []
-        for behavior in self.behaviors:
-            # Check if behavior is eligible (enough silence and not on cooldown)
-            if (silence_duration >= behavior.min_silence and 
-                current_time - behavior.last_used >= behavior.cooldown):
-                eligible_behaviors.append(behavior)
-        
-        print(f"Eligible behaviors: {[b.name for b in eligible_behaviors]}, probability multiplier: {probability_multiplier}, base probability: {self.base_probability}, silence duration: {silence_duration}, current time: {current_time}, behavior count: {len(eligible_behaviors)}, eligible behaviors: {eligible_behaviors}")
-        
-        # Weight behaviors by frequency
-        weights = [b.frequency for b in eligible_behaviors]
-        
-        # Random chance to trigger any behavior
-        if (eligible_behaviors and 
-            random.random() < self.base_probability * probability_multiplier):
-            # Choose behavior based on frequencies
-            chosen = random.choices(eligible_behaviors, weights=weights, k=1)[0]
-            chosen.last_used = current_time
-            return chosen
-            
-        return None
+def device_id_for(websocket: WebSocket) -> str:
+    """Identify a device by its remote address (mic and speaker sockets share it)"""
+    client = websocket.client
+    return client.host if client else "unknown"
 
 class AudioClient:
-    def __init__(self, save_recordings=False):
+    def __init__(self, save_recordings=False, clock: Optional[SystemClock] = None):
+        # Time source; a VirtualClock runs behaviors and timeouts in simulated time
+        self.clock = clock or SystemClock()
+        
         # Audio configuration
         self.CHUNK = 960  # 40ms at 24kHz
         self.FORMAT = pyaudio.paInt16
@@ -109,16 +88,44 @@ class AudioClient:
         # WebSocket connections
         self.ws: Optional[websockets.WebSocketClientProtocol] = None
         self.active_audio_connections: Set[WebSocket] = set()
+        self.speaker_channels: Dict[WebSocket, SpeakerChannel] = {}
         
         # Tasks
         self.tasks = []
         
-        # Initialize OpenAI connection
-        self.openai = OpenAIProxy()
+        # Initialize OpenAI connection, supervised so it recovers on its own
+        # In client turn mode the server VAD is off and mic frames decide when a turn ends
+        self.client_turns = TURN_DETECTION_CONFIG['mode'] == 'client'
+        self.rate_limits = RateLimitTracker(clock=self.clock.monotonic)  # One budget across all sessions
+        self.openai = OpenAIProxy(turn_detection=None if self.client_turns else DEFAULT_TURN_DETECTION,
+                                  rate_limits=self.rate_limits)
+        self.scheduler = UpstreamScheduler(self.rate_limits,
+                                           autonomous_floor=RATE_LIMIT_CONFIG['autonomous_floor'],
+                                           max_user_wait=RATE_LIMIT_CONFIG['max_user_wait'])
+        self.response_cache = ResponseCache(variants=RATE_LIMIT_CONFIG['cached_variants'], sample_rate=self.RATE)
+        self.turn_detectors: Dict[str, TurnDetector] = {}
+        self.turn_owner: Optional[str] = None  # Device whose commit asked for the current reply
+        self.held_commits = 0  # Commits skipped because another device was mid-turn
+        self.commit_task: Optional[asyncio.Task] = None  # A commit waiting out the rate limit
+        self.wake_commit: Optional[str] = None  # Device whose turn ended while the session was waking
+        self.barge_in_frames = 0  # Mic frames forwarded while the parrot was talking
+        self.upstream = UpstreamSupervisor(self.openai, lambda: self.has_esp32_connected and self.hibernation.wanted,
+                                           clock=self.clock)
+        
+        # Idle hibernation: the session closes in a quiet room and local VAD reopens it
+        self.hibernation = Hibernation(
+            idle_timeout=HIBERNATION_CONFIG['idle_timeout'],
+            buffer_ms=HIBERNATION_CONFIG['wake_buffer_ms'],
+            sample_rate=self.RATE,
+            clock=self.clock.time
+        )
+        
+        # Parrot-to-parrot duet; while it runs the shared session neither listens nor talks
+        self.duet: Optional[DuetRouter] = None
         
         # Behavior management
-        self.behavior_manager = BehaviorManager()
-        self.last_automation_input = time.time()
+        self.behavior_manager = BehaviorManager(BEHAVIORS_FILE, clock=self.clock)
+        self.last_automation_input = self.clock.time()
         self.autonomous_mode = True  # Can be toggled to disable autonomous behaviors
         
         # Add microphone WebSocket server
@@ -132,18 +139,78 @@ class AudioClient:
         
         # Voice activity detection
         self.voice_threshold = 1000  # Adjust based on your environment
+        # Without the DSP chain, frames from every device are metered together once per tick
+        self.mic_meter = BatchedLevelMeter(
+            threshold=self.voice_threshold,
+            tick_ms=MIC_LEVEL_CONFIG['tick_ms'],
+            max_frames=MIC_LEVEL_CONFIG['max_frames']
+        ) if MIC_LEVEL_CONFIG['batched'] else None
         self.silence_duration = 0
         self.max_silence_duration = 1.5  # seconds of silence before saving
         self.recording_active = False
         self.last_voice_time = 0
         
-        # Add audio processing parameters
-        self.dc_offset = 0  # Will be calculated dynamically
-        self.alpha = 0.95   # For DC offset estimation
-        self.gain = 1.5     # Adjustable gain factor
+        # Per-device silence gates so idle rooms don't stream upstream
+        self.silence_gates = {}
+        
+        # Reply audio is leveled and limited once, before it fans out to the speakers
+        self.speaker_level = self.new_speaker_level()
+        
+        # Per-device mic DSP chains (filter state must persist across frames)
+        self.mic_dsp_chains = {}
+        self.dsp_pool: Optional[DSPPool] = None  # Worker processes own the chains when enabled
+        
+        # Device-side serial telemetry, lined up with the server's own per-device events
+        self.telemetry = TelemetryStore(max_events=SERIAL_TELEMETRY_CONFIG['max_events'],
+                                        retention_s=SERIAL_TELEMETRY_CONFIG['retention_s'],
+                                        clock=self.clock.time)
+        self.serial_telemetry: Optional[SerialTelemetryCollector] = None
+        
+        # Gestures compile once to a batch of Bottango curves, then come from cache
+        self.gesture_compiler = GestureCompiler()
+        
+        # Live audio tap for monitoring clients (GET ws://localhost:8001/tap)
+        self.audio_tap = AudioTap(max_frames=AUDIO_TAP_CONFIG['queue_frames'], clock=self.clock.time)
         
-        # Add connection lock to prevent concurrent OpenAI connections
-        self.openai_connection_lock = asyncio.Lock()
+        # New parrots are only accepted while the measured load has headroom
+        self.admission = AdmissionController(
+            max_devices=ADMISSION_CONFIG['max_devices'],
+            max_loop_lag_ms=ADMISSION_CONFIG['max_loop_lag_ms'],
+            max_upstream_sessions=ADMISSION_CONFIG['max_upstream_sessions'],
+            max_queued_ms=ADMISSION_CONFIG['max_queued_ms'],
+            redirect_url=ADMISSION_CONFIG['redirect_url']
+        )
+        self.started_at = self.clock.time()
+        
+        # One timer wheel watches every device socket for silence
+        self.keepalive = KeepaliveManager(
+            ping_after=KEEPALIVE_CONFIG['ping_after'],
+            dead_after=KEEPALIVE_CONFIG['dead_after'],
+            tick=KEEPALIVE_CONFIG['tick'],
+            clock=self.clock.monotonic
+        )
+
+    
+    def new_speaker_level(self) -> Optional[LoudnessNormalizer]:
+        if not SPEAKER_LEVEL_CONFIG['enabled']:
+            return None
+        settings = {key: value for key, value in SPEAKER_LEVEL_CONFIG.items() if key != 'enabled'}
+        return LoudnessNormalizer(sample_rate=self.RATE, **settings)
+    
+    def silence_gate_stats(self):
+        """Suppressed-frame statistics for each connected mic"""
+        return {device_id: gate.stats() for device_id, gate in self.silence_gates.items()}
+    
+    def mic_dsp_settings(self):
+        """MicDSPChain arguments from MIC_DSP_CONFIG"""
+        return {
+            'sample_rate': self.RATE,
+            'highpass_hz': MIC_DSP_CONFIG['highpass_hz'],
+            'hum_hz': MIC_DSP_CONFIG['hum_hz'] or None,
+            'agc_target_dbfs': MIC_DSP_CONFIG['agc_target_dbfs'],
+            'agc_max_gain': MIC_DSP_CONFIG['agc_max_gain'],
+            'noise_reduction': MIC_DSP_CONFIG['noise_reduction']
+        }
     
     @property
     def has_esp32_connected(self):
@@ -172,33 +239,139 @@ class AudioClient:
         print(f"Saved recording: {filename} ({len(audio_data)/self.RATE/2:.1f} seconds)")
         return filepath
     
+    def frame_level(self, audio_data):
+        """RMS level of a PCM16 frame"""
+        audio_array = np.frombuffer(audio_data, dtype=np.int16)
+        return float(np.sqrt(np.mean(audio_array.astype(np.float32) ** 2))) if audio_array.size else 0.0
+    
     def detect_voice_activity(self, audio_data):
         """Detect if audio contains voice based on amplitude"""
-        # Convert bytes to numpy array
-        audio_array = np.frombuffer(audio_data, dtype=np.int16)
-        
-        # Calculate RMS (root mean square) for volume level
-        rms = np.sqrt(np.mean(audio_array.astype(np.float32) ** 2))
-        
-        return rms > self.voice_threshold
+        return self.frame_level(audio_data) > self.voice_threshold
     
     async def manage_openai_connection(self):
         """Connect to OpenAI only when ESP32 is connected"""
-        async with self.openai_connection_lock:
-            try:
-                if self.has_esp32_connected and self.openai.ws is None:
-                    print("ESP32 connected, establishing OpenAI connection...")
-                    await self.openai.connect()
-                    print("Connected to OpenAI")
-                elif not self.has_esp32_connected and self.openai.ws is not None:
-                    print("No ESP32 clients, closing OpenAI connection...")
-                    await self.openai.disconnect()
-                    print("Disconnected from OpenAI")
-            except Exception as e:
-                print(f"Error managing OpenAI connection: {e}")
-                # Reset the WebSocket to None in case of error
-                self.openai.ws = None
+        # The supervisor task owns the connection; just tell it the device set changed
+        self.hibernation.touch()  # A device (re)connecting counts as activity
+        self.upstream.notify()
+    
+    async def send_upstream_audio(self, data):
+        """Send mic audio upstream, dropping it while the session is down"""
+        if self.duet_running:
+            return  # The mics would only hear the duet
+        if self.hibernation.state == WAKING:
+            # Held until the session is back, then sent ahead of live audio
+            self.hibernation.buffer(data)
+            return
+        if self.openai.ws is None:
+            return
+        try:
+            await self.openai.send_audio(data)
+        except Exception as e:
+            self.upstream.connection_lost(e)
         
+    def note_voice_activity(self):
+        """Local VAD heard speech: keep the session awake, or start waking it"""
+        if self.hibernation.on_voice():
+            print("Voice detected while hibernating, reopening upstream session")
+            self.upstream.notify()
+            asyncio.create_task(self.finish_wake())
+    
+    async def finish_wake(self):
+        """Once the session is back, flush speech buffered during the wake"""
+        while self.hibernation.state == WAKING:
+            if not self.has_esp32_connected:
+                self.hibernation.hibernate()
+                self.wake_commit = None
+                break
+            if not await self.upstream.wait_connected(timeout=5.0):
+                continue
+            frames = self.hibernation.drain()
+            if not frames:
+                # Nothing arrived while flushing, so live audio can flow directly
+                self.hibernation.wake_complete()
+                print(f"Upstream session awake after {self.hibernation.last_wake_latency * 1000:.0f}ms")
+                if self.wake_commit:
+                    # The turn ended mid-wake; its audio is all upstream now, so commit it
+                    device_id, self.wake_commit = self.wake_commit, None
+                    await self.end_of_turn(device_id, COMMIT)
+                break
+            for frame in frames:
+                try:
+                    await self.openai.send_audio(frame)
+                except Exception as e:
+                    self.upstream.connection_lost(e)
+                    break
+    
+    async def end_of_turn(self, device_id: str, event: str):
+        """Act on a local turn decision: commit and ask for a reply, or take back a premature one"""
+        if self.duet_running:
+            return
+        if self.hibernation.state == WAKING:
+            if event == COMMIT:
+                self.wake_commit = device_id  # Sent by finish_wake once the buffered speech is upstream
+            return
+        if self.openai.ws is None:
+            return
+        try:
+            if event == COMMIT:
+                # Every parrot feeds one input buffer, so a commit takes whatever the others said too.
+                # If someone elsewhere is still talking, their own commit will carry this turn as well.
+                talking = [other for other, turns in self.turn_detectors.items()
+                           if other != device_id and turns.in_speech]
+                if talking:
+                    self.held_commits += 1
+                    print(f"Holding turn for {device_id}: {', '.join(talking)} still talking")
+                    return
+                if self.commit_task and not self.commit_task.done():
+                    # A commit is waiting out the rate limit and will take this audio with it
+                    self.held_commits += 1
+                    return
+                # The rate limit can hold a commit for seconds; the mic loop must keep reading meanwhile
+                self.commit_task = asyncio.create_task(self.commit_turn(device_id))
+            elif event == CUT_OFF and not self.is_speaking and self.turn_owner == device_id:
+                # They weren't done; drop the reply and let the next commit carry the whole thought
+                await self.openai.cancel_response()
+                print(f"Turn for {device_id} was committed too early; reply cancelled")
+        except Exception as e:
+            print(f"End-of-turn {event} failed: {e}")
+
+    async def commit_turn(self, device_id: str):
+        """Commit the input buffer and ask for a reply, once the rate limit allows a user turn"""
+        try:
+            waited = await self.scheduler.wait_for_user_turn(self.clock.sleep)
+            if waited:
+                print(f"Held turn for {device_id} {waited:.1f}s for the rate limit")
+            turns = self.turn_detectors.get(device_id)
+            if turns and turns.in_speech:
+                # They started talking again while we waited; their next commit carries the whole turn
+                return
+            if self.openai.ws is None or self.duet_running:
+                return
+            await self.openai.commit_audio(create_response=True)
+            if turns:
+                turns.on_commit_sent()
+            self.turn_owner = device_id
+            self.last_automation_input = self.clock.time()
+        except Exception as e:
+            print(f"End-of-turn commit failed: {e}")
+    
+    async def manage_hibernation(self):
+        """Close the upstream session once the room has been quiet for a while"""
+        try:
+            while self.running:
+                await self.clock.sleep(1.0)
+                if not HIBERNATION_CONFIG['enabled'] or not self.has_esp32_connected:
+                    continue
+                if self.is_speaking:
+                    self.hibernation.touch()
+                elif self.hibernation.should_hibernate():
+                    print(f"No voice for {self.hibernation.idle_timeout:.0f}s, hibernating upstream session")
+                    self.hibernation.hibernate()
+                    self.upstream.notify()
+        except Exception as e:
+            print(f"Error in hibernation management: {e}")
+            traceback.print_exc()
+    
     def get_default_input_device(self):
         """Find the default input device index"""
         default_device = None
@@ -223,10 +396,26 @@ class AudioClient:
         print(f"Audio WebSocket listening on port {AUDIO_WS_PORT}")
         print(f"Microphone WebSocket listening on port {MICROPHONE_WS_PORT}")
         
+        instruments.start()
+        self.keepalive.start()
+        
+        ports = parse_ports(SERIAL_TELEMETRY_CONFIG['ports'])
+        if ports:
+            self.serial_telemetry = SerialTelemetryCollector(self.telemetry, ports,
+                                                             baud=SERIAL_TELEMETRY_CONFIG['baud'])
+            self.serial_telemetry.start()
+            print(f"Collecting serial telemetry from {', '.join(ports)}")
+        
+        if MIC_DSP_CONFIG['enabled'] and MIC_DSP_CONFIG['workers'] > 0:
+            self.dsp_pool = DSPPool(workers=MIC_DSP_CONFIG['workers'], chain_config=self.mic_dsp_settings())
+            self.dsp_pool.start()
+            print(f"Mic DSP offloaded to {MIC_DSP_CONFIG['workers']} worker processes")
+        
         # Start the FastAPI server for audio WebSocket
         if USE_WEBSOCKET_AUDIO:
             self.app = FastAPI()
             self.setup_audio_websocket()
+            self.setup_debug_routes()
             # Start the server in the background
             config = uvicorn.Config(self.app, host="0.0.0.0", port=AUDIO_WS_PORT, log_level="error")
             self.server = uvicorn.Server(config)
@@ -241,10 +430,44 @@ class AudioClient:
         
         # Setup microphone WebSocket endpoint
         @self.mic_app.websocket("/microphone")
+        @instruments.timed("microphone_websocket_endpoint")
         async def microphone_websocket_endpoint(websocket: WebSocket):
+            if not await self.admit_connection(websocket, "microphone"):
+                return
             await websocket.accept()
             self.mic_connections.add(websocket)
+            device_id = device_id_for(websocket)
             print("ESP32 Microphone client connected")
+            self.telemetry.record(device_id, SERVER_MIC_CONNECTED)
+            last_frame_at = self.clock.time()
+            
+            gate = None
+            if SILENCE_GATE_CONFIG['enabled']:
+                gate = SilenceGate(
+                    pre_roll_ms=SILENCE_GATE_CONFIG['pre_roll_ms'],
+                    hangover_ms=SILENCE_GATE_CONFIG['hangover_ms'],
+                    sample_rate=self.RATE
+                )
+                self.silence_gates[device_id] = gate
+            
+            dsp = None
+            if MIC_DSP_CONFIG['enabled'] and self.dsp_pool is None:
+                dsp = MicDSPChain(**self.mic_dsp_settings())
+                self.mic_dsp_chains[device_id] = dsp
+            
+            turns = None
+            if self.client_turns:
+                turns = self.turn_detectors.get(device_id)  # Keep what was learned across reconnects
+                if turns is None:
+                    turns = self.turn_detectors[device_id] = TurnDetector(
+                        aggressiveness=TURN_DETECTION_CONFIG['aggressiveness'],
+                        min_silence_ms=TURN_DETECTION_CONFIG['min_silence_ms'],
+                        max_silence_ms=DEFAULT_TURN_DETECTION['silence_duration_ms'],
+                        premature_window_ms=TURN_DETECTION_CONFIG['premature_window_ms']
+                    )
+            
+            # The firmware doesn't answer text pings on this socket; its frames are the heartbeat
+            lease = self.keepalive.register(f"microphone {device_id}", close=websocket.close)
             
             # Connect to OpenAI when first ESP32 connects
             await self.manage_openai_connection()
@@ -252,14 +475,34 @@ class AudioClient:
             try:
                 while True:
                     try:
-                        data = await websocket.receive_bytes()
+                        data = await lease.wait(websocket.receive_bytes())
+                        self.audio_tap.publish(device_id, MIC, data)
+                        arrived = self.clock.time()
+                        if arrived - last_frame_at > SERIAL_TELEMETRY_CONFIG['mic_gap_ms'] / 1000.0:
+                            self.telemetry.record(device_id, SERVER_MIC_GAP, (arrived - last_frame_at) * 1000.0)
+                        last_frame_at = arrived
                         if not self.is_speaking:
-                            current_time = time.time()
+                            current_time = self.clock.time()
                             
-                            # Check for voice activity
-                            has_voice = self.detect_voice_activity(data)
+                            # Check for voice activity on the filtered, pre-AGC level
+                            if self.dsp_pool:
+                                result = await self.dsp_pool.process(device_id, data)
+                                if result is None:
+                                    # Workers are backed up or gone: pass the raw frame on so upstream has no hole
+                                    level = self.frame_level(data)
+                                else:
+                                    data, level = result
+                            elif dsp:
+                                data = dsp.process(data)
+                                level = dsp.level
+                            elif self.mic_meter and len(self.mic_connections) >= MIC_LEVEL_CONFIG['min_devices']:
+                                level, _ = await self.mic_meter.measure(data)
+                            else:
+                                level = self.frame_level(data)
+                            has_voice = level > self.voice_threshold
                             
                             if has_voice:
+                                self.note_voice_activity()
                                 # Voice detected
                                 if not self.recording_active:
                                     self.recording_active = True
@@ -282,16 +525,50 @@ class AudioClient:
                                     self.current_audio_chunks = []
                                     print("Stopped recording (silence detected)")
                             
-                            # Send audio to OpenAI
-                            await self.openai.send_audio(data)
+                            # Send audio to OpenAI, only voiced regions if gated
+                            if gate:
+                                for frame in gate.process(data, has_voice):
+                                    await self.send_upstream_audio(frame)
+                            else:
+                                await self.send_upstream_audio(data)
+                            
+                            # With client turn detection, this frame may end the turn
+                            if turns:
+                                event = turns.process(has_voice, level, len(data) / (self.RATE * 2) * 1000.0)
+                                if event:
+                                    await self.end_of_turn(device_id, event)
+                        else:
+                            if gate:
+                                # Lead-in captured before the parrot spoke is stale
+                                gate.reset()
+                            barge_in = BARGE_IN_CONFIG['threshold']
+                            if barge_in and self.frame_level(data) > barge_in:
+                                # Louder than the parrot's own echo: let the server VAD hear the interruption
+                                self.barge_in_frames += 1
+                                await self.send_upstream_audio(data)
                     except Exception as e:
                         print(f"Error in microphone websocket: {e}")
                         break
             finally:
+                self.keepalive.release(lease)
+                self.telemetry.record(device_id, SERVER_MIC_DISCONNECTED)
                 if websocket in self.mic_connections:
                     self.mic_connections.remove(websocket)
                     print("ESP32 Microphone client disconnected")
                 
+                if gate:
+                    stats = gate.stats()
+                    print(f"Silence gate for {device_id}: suppressed {stats['suppressed_fraction']:.1%} "
+                          f"of {stats['frames_total']} frames ({stats['bytes_saved']} bytes saved)")
+                    if self.silence_gates.get(device_id) is gate:
+                        del self.silence_gates[device_id]
+                if dsp and self.mic_dsp_chains.get(device_id) is dsp:
+                    del self.mic_dsp_chains[device_id]
+                if self.dsp_pool:
+                    self.dsp_pool.remove(device_id)
+                if turns:
+                    turns.on_disconnect()
+                
                 # Disconnect from OpenAI if no more clients
                 await self.manage_openai_connection()
                 
@@ -303,10 +580,26 @@ class AudioClient:
     def setup_audio_websocket(self):
         """Setup FastAPI WebSocket endpoint"""
         @self.app.websocket("/audio-stream")
+        @instruments.timed("audio_websocket_endpoint")
         async def audio_websocket_endpoint(websocket: WebSocket):
+            if not await self.admit_connection(websocket, "audio"):
+                return
             await websocket.accept()
+            device_id = device_id_for(websocket)
+            channel = SpeakerChannel(
+                websocket,
+                SpeakerFlowController(sample_rate=self.RATE, target_ms=SPEAKER_FLOW_CONFIG['target_ms'],
+                                      clock=self.clock.monotonic),
+                self.chunker_for(device_id),
+                monitor=lambda chunk: self.audio_tap.publish(device_id, SPEAKER, chunk)
+            )
+            channel.start()
+            self.speaker_channels[websocket] = channel
             self.active_audio_connections.add(websocket)
             print("ESP32 Audio client connected")
+            self.telemetry.record(device_id, SERVER_AUDIO_CONNECTED)
+            lease = self.keepalive.register(f"audio {device_id}", ping=lambda: websocket.send_text("ping"),
+                                            close=websocket.close)
             
             # Connect to OpenAI when first ESP32 connects
             await self.manage_openai_connection()
@@ -315,7 +608,7 @@ class AudioClient:
                 while True:
                     try:
                         # Use receive() to handle any message type (text, bytes, or close)
-                        message = await asyncio.wait_for(websocket.receive(), timeout=5.0)
+                        message = await lease.wait(websocket.receive())
                         
                         # Check if it's a close message
                         if "type" in message and message["type"] == "websocket.disconnect":
@@ -328,8 +621,8 @@ class AudioClient:
                             if text_msg == "pong":
                                 # Response to our ping
                                 continue
-                            elif text_msg == "buffer_ok":
-                                # ESP32 signaling it's keeping up - could use this for adaptive streaming
+                            elif channel.flow.handle_message(text_msg):
+                                # ESP32 reporting its queued audio - paces our sends
                                 continue
                             # Could be other keepalive messages
                             continue
@@ -339,14 +632,6 @@ class AudioClient:
                             # Process any binary data if needed
                             continue
                             
-                    except asyncio.TimeoutError:
-                        # Send a ping to check if connection is still alive
-                        try:
-                            await websocket.send_text("ping")
-                        except:
-                            # Connection is dead, break out
-                            print("Audio websocket connection appears dead (ping failed)")
-                            break
                     except websockets.exceptions.ConnectionClosed:
                         print("Audio websocket connection closed")
                         break
@@ -355,10 +640,16 @@ class AudioClient:
                             print(f"Error in audio websocket: {e}")
                         break
             finally:
+                self.keepalive.release(lease)
+                self.telemetry.record(device_id, SERVER_AUDIO_DISCONNECTED)
                 if websocket in self.active_audio_connections:
                     self.active_audio_connections.remove(websocket)
                     print("ESP32 Audio client disconnected")
                 
+                await channel.close()
+                if self.speaker_channels.get(websocket) is channel:
+                    del self.speaker_channels[websocket]
+                
                 # Disconnect from OpenAI if no more clients
                 await self.manage_openai_connection()
                 
@@ -367,11 +658,196 @@ class AudioClient:
                 except:
                     pass
 
+        @self.app.websocket("/tap")
+        async def audio_tap_endpoint(websocket: WebSocket):
+            if not AUDIO_TAP_CONFIG['enabled'] or (
+                    not AUDIO_TAP_CONFIG['allow_remote'] and device_id_for(websocket) not in ("127.0.0.1", "::1")):
+                await websocket.close(code=1008)
+                return
+            await websocket.accept()
+            devices = set(websocket.query_params.getlist("device")) or None
+            streams = [s for s in websocket.query_params.getlist("stream") if s in STREAMS] or STREAMS
+            subscriber = self.audio_tap.subscribe(devices, streams)
+            print(f"Audio tap subscriber connected ({len(self.audio_tap.subscribers)} total)")
+            
+            async def watch_disconnect():
+                try:
+                    while True:
+                        await websocket.receive_text()  # Subscribers don't talk; this only sees the close
+                except WebSocketDisconnect:
+                    pass
+            
+            sender = asyncio.create_task(self.audio_tap.serve(websocket, subscriber))
+            watcher = asyncio.create_task(watch_disconnect())
+            try:
+                await asyncio.wait({sender, watcher}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for task in (sender, watcher):
+                    task.cancel()
+                await asyncio.gather(sender, watcher, return_exceptions=True)
+                self.audio_tap.unsubscribe(subscriber)
+                if subscriber.evicted:
+                    print("Audio tap subscriber dropped (fell behind)")
+                else:
+                    print("Audio tap subscriber disconnected")
+
+    def setup_debug_routes(self):
+        """Instrumentation endpoints: loop lag, coroutine timings and the sampling profiler"""
+        @self.app.middleware("http")
+        async def debug_routes_loopback_only(request: Request, call_next):
+            if (request.url.path.startswith(LOOPBACK_ONLY_PREFIXES) and not DEBUG_ROUTES_CONFIG['allow_remote']
+                    and (request.client is None or request.client.host not in ("127.0.0.1", "::1"))):
+                return JSONResponse({"detail": "This route is loopback-only (DEBUG_ROUTES_ALLOW_REMOTE)"},
+                                    status_code=403)
+            return await call_next(request)
+
+        @self.app.get("/healthz")
+        async def liveness():
+            # Answering at all means the event loop is turning
+            return {"status": "ok", "uptime": round(self.clock.time() - self.started_at, 1)}
+
+        @self.app.get("/readyz")
+        async def readiness():
+            report = self.admission.report(self.current_load())
+            if not ADMISSION_CONFIG['enabled']:
+                report["ready"] = True
+            return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+        @self.app.get("/debug/loop")
+        async def loop_stats():
+            return instruments.stats()
+        
+        @self.app.post("/duet/start")
+        async def duet_start(spec: Optional[dict] = Body(None)):
+            if spec is None:
+                if not os.path.exists(DUET_FILE):
+                    raise HTTPException(status_code=400, detail=f"No duet spec given and {DUET_FILE} not found")
+                with open(DUET_FILE) as f:
+                    spec = json.load(f)
+            try:
+                await self.start_duet(spec)
+            except RuntimeError as e:
+                raise HTTPException(status_code=502, detail=str(e))
+            except (KeyError, ValueError, TypeError) as e:
+                raise HTTPException(status_code=400, detail=f"Bad duet spec: {e}")
+            return self.duet.stats()
+        
+        @self.app.post("/duet/stop")
+        async def duet_stop():
+            await self.stop_duet()
+            return self.duet.stats() if self.duet else {}
+        
+        @self.app.get("/duet")
+        async def duet_status():
+            return self.duet.stats() if self.duet else {"running": False}
+        
+        @self.app.post("/gesture/{name}")
+        async def gesture(name: str):
+            if name not in GESTURES:
+                raise HTTPException(status_code=404, detail=f"Unknown gesture '{name}' (try {', '.join(GESTURES)})")
+            compiled = await self.send_gesture(GESTURES[name]())
+            return {"gesture": compiled.name, "duration_ms": compiled.duration_ms,
+                    "curves": compiled.curve_count, "parrots": len(self.active_audio_connections)}
+        
+        @self.app.get("/debug/rate_limits")
+        async def rate_limit_stats():
+            return {**self.scheduler.stats(), "cached_behaviors": self.response_cache.stats()}
+
+        @self.app.get("/debug/mic_levels")
+        async def mic_level_stats():
+            if not self.mic_meter:
+                return {"batched": False}
+            return {**self.mic_meter.stats(), "active": len(self.mic_connections) >= MIC_LEVEL_CONFIG['min_devices']}
+
+        @self.app.get("/debug/silence_gate")
+        async def silence_gate_stats():
+            return self.silence_gate_stats()
+
+        @self.app.get("/debug/telemetry")
+        async def telemetry_stats():
+            stats = self.serial_telemetry.stats() if self.serial_telemetry else self.telemetry.stats()
+            return {**stats, "recent_unparsed": list(self.telemetry.unparsed)[-10:]}
+
+        @self.app.get("/debug/telemetry/{device_id}")
+        async def telemetry_timeline(device_id: str, seconds: float = 300.0, window: float = 2.0):
+            since = self.clock.time() - seconds
+            return {
+                "events": self.telemetry.describe(self.telemetry.events(device_id, since)),
+                "incidents": self.telemetry.correlate(device_id, window_s=window, since=since)
+            }
+
+        @self.app.get("/debug/turns")
+        async def turn_stats():
+            return {"mode": TURN_DETECTION_CONFIG['mode'], "held_commits": self.held_commits,
+                    "barge_in_frames": self.barge_in_frames,
+                    "turn_owner": self.turn_owner,
+                    "devices": {device_id: t.stats() for device_id, t in self.turn_detectors.items()}}
+
+        @self.app.get("/debug/speaker_level")
+        async def speaker_level_stats():
+            return self.speaker_level.stats() if self.speaker_level else {"enabled": False}
+
+        @self.app.get("/debug/keepalive")
+        async def keepalive_stats():
+            return self.keepalive.stats()
+
+        @self.app.get("/debug/tap")
+        async def tap_stats():
+            return self.audio_tap.stats()
+
+        @self.app.get("/debug/speaker_flow")
+        async def speaker_flow_stats():
+            return self.speaker_flow_stats()
+
+        @self.app.get("/debug/speaker_chunking")
+        async def speaker_chunking_stats():
+            return {device_id_for(ws): channel.chunker.stats() for ws, channel in self.speaker_channels.items()}
+
+        @self.app.post("/debug/speaker_chunking/{device_id}")
+        async def speaker_chunking(device_id: str, min_bytes: Optional[int] = None,
+                                   max_bytes: Optional[int] = None, fast_start_ms: Optional[float] = None):
+            sizes = {"min_bytes": min_bytes, "max_bytes": max_bytes, "fast_start_ms": fast_start_ms}
+            if any(value is not None and value <= 0 for value in sizes.values()):
+                raise HTTPException(status_code=400, detail="Chunk sizes must be positive")
+            tuned = self.tune_speaker_chunking(device_id, **sizes)
+            if not tuned:
+                raise HTTPException(status_code=404, detail=f"No speaker connection from {device_id}")
+            return {device_id: tuned[0] if len(tuned) == 1 else tuned}
+
+        @self.app.get("/debug/upstream")
+        async def upstream_stats():
+            return {**self.upstream.status(), "hibernation": self.hibernation.stats()}
+        
+        @self.app.get("/debug/context")
+        async def context_stats():
+            return self.conversation_context_stats()
+        
+        @self.app.post("/debug/profiler/start")
+        async def start_profiler(interval_ms: float = 5.0):
+            instruments.profiler.start(interval_ms=interval_ms)  # Clamped to MIN_PROFILER_INTERVAL_MS
+            return instruments.profiler.stats()
+        
+        @self.app.post("/debug/profiler/stop")
+        async def stop_profiler():
+            await asyncio.to_thread(instruments.profiler.stop)  # Joining the sampler thread can take a while
+            return instruments.profiler.stats()
+        
+        @self.app.get("/debug/profiler", response_class=PlainTextResponse)
+        async def profiler_dump():
+            # Collapsed stacks, one "frame;frame;frame count" per line
+            return instruments.profiler.dump()
+
     async def cleanup(self):
         """Cleanup all resources"""
         self.running = False
+        instruments.stop()
+        await self.keepalive.stop()
+        if self.serial_telemetry:
+            await self.serial_telemetry.stop()
         
         # Cancel all tasks
+        if self.commit_task and not self.commit_task.done():
+            self.commit_task.cancel()
         for task in self.tasks:
             if not task.done():
                 task.cancel()
@@ -384,6 +860,9 @@ class AudioClient:
         if self.ws:
             await self.ws.close()
         
+        if self.dsp_pool:
+            self.dsp_pool.close()
+        
         # Stop recording if active
         if self.recording_stream:
             self.recording_stream.stop_stream()
@@ -431,9 +910,11 @@ class AudioClient:
             
             # Create all tasks
             self.tasks = [
+                asyncio.create_task(self.upstream.run()),
                 asyncio.create_task(self.receive_from_openai()),
                 asyncio.create_task(self.manage_speaking_state()),
-                asyncio.create_task(self.manage_autonomous_behaviors())
+                asyncio.create_task(self.manage_autonomous_behaviors()),
+                asyncio.create_task(self.manage_hibernation())
             ]
             
             # Add process_microphone task only if using local microphone
@@ -450,18 +931,41 @@ class AudioClient:
                 self.stop_recording()
             await self.cleanup()
 
+    @instruments.timed("receive_from_openai")
     async def receive_from_openai(self):
         """Receive and process audio from OpenAI"""
         try:
             while self.running:
-                # Only try to receive if connected to OpenAI
-                if self.openai.ws is None:
-                    await asyncio.sleep(1)
+                # Only receive once the session is configured (connect sets ws before the setup exchange)
+                if self.upstream.health != HEALTHY or self.openai.ws is None:
+                    await self.upstream.wait_connected(timeout=1.0)
                     continue
                     
-                response = await self.openai.receive()
+                try:
+                    response = await self.openai.receive()
+                except Exception as e:
+                    # Hand the dead socket to the supervisor and keep going
+                    print(f"Upstream receive failed: {e}")
+                    self.upstream.connection_lost(e)
+                    continue
                 response_data = json.loads(response)
                 response_type = response_data.get("type", "")
+                self.openai.track_event(response_data)
+                
+                if response_type == "response.done":
+                    # The limiter's look-ahead still holds the last few ms of the reply
+                    tail = self.speaker_level.flush() if self.speaker_level else b""
+                    if tail and USE_WEBSOCKET_AUDIO:
+                        await self.stream_to_speakers(tail)
+                    self.response_cache.add(tail)
+                    status = (response_data.get("response") or {}).get("status", "completed")
+                    self.response_cache.finish(completed=status == "completed")
+                    
+                    # Between turns is the safe moment to prune the conversation
+                    try:
+                        await self.openai.compact_context()
+                    except Exception as e:
+                        print(f"Context compaction failed: {e}")
 
                 if "response.audio.delta" in response_type:
                     audio_base64 = response_data.get("delta", "")
@@ -473,7 +977,12 @@ class AudioClient:
                             self.current_audio_chunks = []
                         
                         self.is_speaking = True
+                        for turns in self.turn_detectors.values():
+                            turns.on_reply()
                         audio_data = base64.b64decode(audio_base64)
+                        if self.speaker_level:
+                            audio_data = self.speaker_level.process(audio_data)
+                        self.response_cache.add(audio_data)
                         audio_length = len(audio_data)/self.RATE
                         
                         if USE_WEBSOCKET_AUDIO:
@@ -481,10 +990,15 @@ class AudioClient:
                         else:
                             # Handle local playback if implemented
                             pass
-                    self.last_automation_input = time.time()
+                    self.last_automation_input = self.clock.time()
+                elif response_type == "error":
+                    print(f"Upstream error: {response_data.get('error')}")
                 elif response_type == "input_audio_buffer.speech_started":
+                    self.response_cache.abort()  # Whatever plays now answers the person, not the behavior
+                    if self.is_speaking:
+                        self.interrupt_speakers()  # Barge-in: stop the reply quickly
                     self.current_audio_chunks = []  # Clear buffer for new recording
-                    self.last_automation_input = time.time()
+                    self.last_automation_input = self.clock.time()
                 elif response_type == "input_audio_buffer.speech_stopped":
                     # Save the recorded audio to a WAV file
                     if self.save_recordings and self.current_audio_chunks:
@@ -510,20 +1024,21 @@ class AudioClient:
         """Manage speaking state based on audio timing"""
         try:
             while self.running:
-                current_time = time.time()
+                current_time = self.clock.time()
                 if self.is_speaking:
                     if current_time >= (self.audio_end_time + .25):
                         print("Audio playback complete")
                         self.is_speaking = False
                         self.audio_end_time = 0
-                await asyncio.sleep(0.1)
+                await self.clock.sleep(0.1)
                 
         except Exception as e:
             print(f"Error in speaking state management: {e}")
             traceback.print_exc() 
 
+    @instruments.timed("stream_to_speakers")
     async def stream_to_speakers(self, audio_data):
-        """Stream audio data to all connected ESP32 clients"""
+        """Queue audio data for all connected ESP32 clients"""
         if not self.active_audio_connections:
             print("No ESP32 audio clients connected")
             return
@@ -533,38 +1048,25 @@ class AudioClient:
             audio_duration = len(audio_data) / (self.RATE * 2)  # 2 bytes per sample
             
             if self.audio_end_time == 0: 
-                self.audio_end_time = time.time() + audio_duration
+                self.audio_end_time = self.clock.time() + audio_duration
             else:
                 self.audio_end_time += audio_duration
             
-            # Stream the audio data
-            chunk_size = 4096  # Larger network chunks for better efficiency
+            # Each client's channel paces delivery against its reported buffer depth
+            # and picks its own frame sizes
             dead_connections = set()
             
-            for i in range(0, len(audio_data), chunk_size):
-                chunk = audio_data[i:i + chunk_size]
-                                
-                # Create a copy of connections to avoid modification during iteration
-                clients = list(self.active_audio_connections - dead_connections)
-                
-                # Send to each client sequentially
-                for client in clients:
-                    try:
-                        await client.send_bytes(chunk)
-                    except websockets.exceptions.ConnectionClosed:
-                        print(f"Audio client connection closed during streaming")
-                        dead_connections.add(client)
-                    except Exception as e:
-                        if str(e) and "1006" not in str(e):  # Don't print abnormal closure errors
-                            print(f"Error sending audio to client: {e}")
-                        dead_connections.add(client)
-                
-                # Slightly longer delay for larger chunks
-                await asyncio.sleep(0.001)
+            for client in list(self.active_audio_connections):
+                channel = self.speaker_channels.get(client)
+                if channel is None or channel.closed:
+                    dead_connections.add(client)
+                    continue
+                channel.enqueue(audio_data)
             
-            # Remove dead connections after streaming
+            # Remove dead connections
             for conn in dead_connections:
                 if conn in self.active_audio_connections:
+                    print(f"Audio client connection closed during streaming")
                     self.active_audio_connections.remove(conn)
                     try:
                         await conn.close()
@@ -575,33 +1077,194 @@ class AudioClient:
             print(f"Error in stream_to_speakers: {e}")
             traceback.print_exc()
 
+    def interrupt_speakers(self):
+        """Drop queued speaker audio; only what the devices already buffered still plays"""
+        if self.speaker_level:
+            self.speaker_level.clear_delay()
+        device_depth = 0.0
+        for channel in self.speaker_channels.values():
+            channel.clear()
+            device_depth = max(device_depth, channel.flow.estimated_depth() / (self.RATE * 2))
+        if self.audio_end_time:
+            self.audio_end_time = min(self.audio_end_time, self.clock.time() + device_depth)
+
+    async def send_gesture(self, gesture: Gesture):
+        """Send a gesture to every connected parrot as one batched text frame"""
+        compiled = self.gesture_compiler.compile(gesture)
+        for client in list(self.active_audio_connections):
+            try:
+                await client.send_text(compiled.batch)
+            except Exception as e:
+                print(f"Error sending gesture {compiled.name}: {e}")
+        return compiled
+
+    def chunker_for(self, device_id: str) -> AdaptiveChunker:
+        """Downlink chunker using the configured sizes and any per-device override"""
+        sizes = {key: SPEAKER_CHUNK_CONFIG[key] for key in ('min_bytes', 'max_bytes', 'fast_start_ms')}
+        sizes.update(SPEAKER_CHUNK_CONFIG['devices'].get(device_id, {}))
+        return AdaptiveChunker(sample_rate=self.RATE, **sizes)
+
+    def tune_speaker_chunking(self, device_id: str, **sizes) -> List[dict]:
+        """Retune downlink frame sizes for a connected device (min_bytes, max_bytes, fast_start_ms)"""
+        tuned = []
+        for ws, channel in self.speaker_channels.items():
+            if device_id_for(ws) == device_id:
+                channel.chunker.configure(**sizes)
+                tuned.append(channel.chunker.stats())
+        return tuned
+
+    def conversation_context_stats(self):
+        """Conversation size per device (all devices currently share one upstream session)"""
+        report = self.openai.context.report()
+        return {device_id: report for device_id in self.connected_devices()} or {"default": report}
+
+    def connected_devices(self) -> Set[str]:
+        return {device_id_for(ws) for ws in self.active_audio_connections | self.mic_connections}
+
+    def current_load(self) -> LoadSample:
+        sessions = int(self.openai.ws is not None)
+        if self.duet_running:
+            sessions += sum(1 for parrot in self.duet.parrots if parrot.proxy.ws is not None)
+        queued = max((channel.pending_bytes for channel in self.speaker_channels.values()), default=0)
+        return LoadSample(
+            devices=len(self.connected_devices()),
+            # Lag is only sampled with instrumentation on; otherwise its budget can't apply
+            loop_lag_ms=round(instruments.loop_lag.recent_lag_ms(), 1) if instruments.enabled else None,
+            upstream_sessions=sessions,
+            queued_ms=round(queued / (self.RATE * 2) * 1000.0, 1)
+        )
+
+    async def admit_connection(self, websocket: WebSocket, port_name: str) -> bool:
+        """Admission check for a new device socket; refused sockets are closed with 1013"""
+        if not ADMISSION_CONFIG['enabled']:
+            return True
+        device_id = device_id_for(websocket)
+        admitted, reason = self.admission.admit(device_id in self.connected_devices(), self.current_load())
+        if admitted:
+            return True
+        print(f"Refused {port_name} connection from {device_id} ({reason})")
+        await websocket.accept()
+        await websocket.close(code=TRY_AGAIN_LATER, reason=reason)
+        return False
+
+    @property
+    def duet_running(self):
+        return self.duet is not None and self.duet.running
+
+    def play_on_device(self, device_id: str, pcm):
+        """Queue audio on one device's speaker channel(s)"""
+        for ws, channel in list(self.speaker_channels.items()):
+            if device_id_for(ws) == device_id and not channel.closed:
+                channel.enqueue(pcm)
+
+    def device_playback_remaining(self, device_id: str) -> float:
+        """Seconds of audio a device still has to play (queued here plus buffered there)"""
+        remaining = 0.0
+        for ws, channel in self.speaker_channels.items():
+            if device_id_for(ws) == device_id:
+                queued = channel.pending_bytes + channel.flow.estimated_depth()
+                remaining = max(remaining, queued / (self.RATE * 2))
+        return remaining
+
+    async def start_duet(self, spec: dict):
+        """Start a parrot-to-parrot conversation
+
+        spec: {"opening": str, "max_turns": int, "turn_gap_ms": float,
+               "parrots": [{"name", "device", "voice", "instructions"}, ...]}
+        """
+        if self.duet_running:
+            await self.stop_duet()
+        parrots = [
+            RoutedParrot(
+                name=entry["name"],
+                proxy=OpenAIProxy(voice=entry.get("voice", "ballad"),
+                                  instructions=entry["instructions"],
+                                  turn_detection=None,
+                                  rate_limits=self.rate_limits),
+                device_ids=[entry["device"]] if isinstance(entry["device"], str) else list(entry["device"]),
+                level=self.new_speaker_level()
+            )
+            for entry in spec["parrots"]
+        ]
+        if len(parrots) < 2:
+            raise ValueError("A duet needs at least two parrots")
+        self.interrupt_speakers()
+        self.duet = DuetRouter(
+            parrots,
+            play=self.play_on_device,
+            playback_remaining=self.device_playback_remaining,
+            turn_gap=spec.get("turn_gap_ms", 300) / 1000.0,
+            max_turns=spec.get("max_turns", 12)
+        )
+        try:
+            await self.duet.start(spec.get("opening", "Start a conversation with the other parrot."))
+        except Exception as e:
+            # start() has closed whichever sessions it opened; don't leave a dead duet behind
+            self.duet = None
+            raise RuntimeError(f"Duet sessions failed to start: {e}") from e
+        print(f"Duet started: {', '.join(p.name for p in parrots)}")
+
+    async def stop_duet(self):
+        if self.duet:
+            await self.duet.stop()
+            print(f"Duet stopped after {self.duet.turns} turns")
+            self.last_automation_input = self.clock.time()
+
+    def speaker_flow_stats(self):
+        """Buffer depth, pacing and frame-size statistics for each speaker connection"""
+        return {
+            device_id_for(ws): {**channel.flow.stats(), "chunking": channel.chunker.stats()}
+            for ws, channel in self.speaker_channels.items()
+        }
+
     async def manage_autonomous_behaviors(self):
         """Manage autonomous parrot behaviors during periods of silence"""
         try:
             while self.running:
                 # Only run behaviors if ESP32 is connected
-                if self.autonomous_mode and not self.is_speaking and self.has_esp32_connected:
-                    current_time = time.time()
+                if self.autonomous_mode and not self.is_speaking and not self.duet_running and self.has_esp32_connected:
+                    self.behavior_manager.reload_if_changed()
+                    current_time = self.clock.time()
                     silence_duration = current_time - self.last_automation_input
                     
-                    behavior = self.behavior_manager.should_trigger_behavior(silence_duration)
+                    behavior = None
+                    if self.openai.ws is not None:
+                        # Each device keeps its own schedule; the one session's reply plays on every speaker
+                        for device_id in sorted(self.connected_devices()):
+                            behavior = self.behavior_manager.should_trigger_behavior(
+                                silence_duration, device_id=device_id, now=current_time)
+                            if behavior:
+                                break
+                    if behavior and not self.scheduler.allow(AUTONOMOUS):
+                        # Budget is short: keep it for people, replay an earlier take if there is one
+                        cached = self.response_cache.pick(behavior.name)
+                        if cached:
+                            print(f"Replaying cached behavior: {behavior.name} (rate limit headroom low)")
+                            self.scheduler.cached += 1
+                            self.is_speaking = True
+                            await self.stream_to_speakers(cached)
+                        else:
+                            print(f"Skipping behavior {behavior.name} (rate limit headroom low)")
+                        self.last_automation_input = current_time
+                        behavior = None
                     if behavior:
                         print(f"Triggering autonomous behavior: {behavior.name}")
                         # Send behavior prompt to OpenAI
                         try:
+                            self.response_cache.start(behavior.name)
                             await self.openai.send_text("autonomous_command: " + behavior.prompt)
                             # Reset silence timer
                             self.last_automation_input = current_time
-                        except websockets.exceptions.ConnectionClosedError:
+                        except Exception as e:
+                            self.response_cache.abort()
                             print("WebSocket disconnected during autonomous behavior, reconnecting...")
-                            # Will reconnect on next loop iteration
-                            pass
+                            self.upstream.connection_lost(e)
                 elif not self.has_esp32_connected and self.autonomous_mode:
                     # Log once when no client is connected
-                    await asyncio.sleep(5)  # Check less frequently when no client
+                    await self.clock.sleep(5)  # Check less frequently when no client
                     continue
                         
-                await asyncio.sleep(1.0)  # Check every second
+                await self.clock.sleep(1.0)  # Check every second
                 
         except Exception as e:
             print(f"Error in autonomous behaviors: {e}")
@@ -619,8 +1282,8 @@ class AudioClient:
                         self.current_audio_chunks.append(data)
                         
                         # Send to OpenAI
-                        await self.openai.send_audio(data)
-                        self.last_automation_input = time.time()
+                        await self.send_upstream_audio(data)
+                        self.last_automation_input = self.clock.time()
                     except Exception as e:
                         print(f"Error sending to OpenAI: {e}")
                 await asyncio.sleep(0.0001)
@@ -0,0 +1,201 @@
+"""Rate-limit-aware scheduling of upstream responses"""
+
+import asyncio
+import random
+import re
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+# Response priorities
+USER = "user"              # Someone spoke to the parrot
+AUTONOMOUS = "autonomous"  # A behavior the parrot started on its own
+
+_RETRY_AFTER = re.compile(r"try again in ([\d.]+)\s*(ms|s)", re.IGNORECASE)
+
+
+class RateLimitTracker:
+    """Remaining request and token budget for the API key, shared by every session
+
+    rate_limits.updated events carry the truth; between them each
+    response.created is charged one request and the average tokens of recent
+    responses, so a burst from several sessions is seen before the next
+    update arrives. A rate_limit_exceeded error blocks everything until the
+    retry time it names.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.limits: Dict[str, dict] = {}  # name -> {"limit", "remaining", "reset_at"}
+        self.blocked_until = 0.0
+        self.recent_tokens = deque([1000], maxlen=20)  # Tokens per response, for estimates
+
+        # Metrics
+        self.updates = 0
+        self.limit_errors = 0
+        self.responses = 0
+
+    def observe(self, event: dict):
+        """Update from any server event (cheap for the ones that don't matter)"""
+        event_type = event.get("type", "")
+        if event_type == "rate_limits.updated":
+            now = self.clock()
+            self.updates += 1
+            for entry in event.get("rate_limits", []):
+                self.limits[entry.get("name", "")] = {
+                    "limit": entry.get("limit", 0),
+                    "remaining": entry.get("remaining", 0),
+                    "reset_at": now + float(entry.get("reset_seconds", 0.0))
+                }
+        elif event_type == "response.created":
+            self.responses += 1
+            self._charge("requests", 1)
+            self._charge("tokens", sum(self.recent_tokens) / len(self.recent_tokens))
+        elif event_type == "response.done":
+            usage = (event.get("response") or {}).get("usage") or {}
+            if usage.get("total_tokens"):
+                self.recent_tokens.append(usage["total_tokens"])
+        elif event_type == "error":
+            error = event.get("error") or {}
+            if error.get("code") == "rate_limit_exceeded" or "rate limit" in str(error.get("message", "")).lower():
+                self.limit_errors += 1
+                self.blocked_until = self.clock() + self._retry_after(str(error.get("message", "")))
+
+    @staticmethod
+    def _retry_after(message: str) -> float:
+        match = _RETRY_AFTER.search(message)
+        if not match:
+            return 1.0
+        value = float(match.group(1))
+        return value / 1000.0 if match.group(2).lower() == "ms" else value
+
+    def _charge(self, name: str, amount: float):
+        entry = self.limits.get(name)
+        if entry and self.clock() < entry["reset_at"]:
+            entry["remaining"] = max(0, entry["remaining"] - amount)
+
+    def headroom(self) -> float:
+        """Fraction of the tightest budget still available (1.0 when nothing is known)"""
+        now = self.clock()
+        if now < self.blocked_until:
+            return 0.0
+        fractions = [entry["remaining"] / entry["limit"] for entry in self.limits.values()
+                     if entry["limit"] and now < entry["reset_at"]]
+        return min(fractions, default=1.0)
+
+    def seconds_until_available(self) -> float:
+        """How long until at least one request and the average response's tokens are free"""
+        now = self.clock()
+        wait = max(0.0, self.blocked_until - now)
+        needed = {"requests": 1, "tokens": sum(self.recent_tokens) / len(self.recent_tokens)}
+        for name, amount in needed.items():
+            entry = self.limits.get(name)
+            if entry and now < entry["reset_at"] and entry["remaining"] < amount:
+                wait = max(wait, entry["reset_at"] - now)
+        return wait
+
+    def stats(self) -> dict:
+        now = self.clock()
+        return {
+            "headroom": round(self.headroom(), 3),
+            "limits": {name: {"limit": e["limit"], "remaining": round(e["remaining"]),
+                              "resets_in": round(max(0.0, e["reset_at"] - now), 1)}
+                       for name, e in self.limits.items()},
+            "blocked_for": round(max(0.0, self.blocked_until - now), 2),
+            "updates": self.updates,
+            "rate_limit_errors": self.limit_errors,
+            "responses": self.responses
+        }
+
+
+class ResponseCache:
+    """Recent spoken replies to each autonomous behavior, for replay when budget is short"""
+
+    def __init__(self, variants: int = 3, max_seconds: float = 20.0, sample_rate: int = 24000,
+                 rng: Optional[random.Random] = None):
+        self.variants = variants
+        self.max_bytes = int(max_seconds * sample_rate * 2)
+        self.rng = rng or random.Random()
+        self.entries: Dict[str, deque] = {}
+        self._key: Optional[str] = None
+        self._chunks: List[bytes] = []
+        self._size = 0
+
+    def start(self, key: str):
+        """Capture the audio of the response that's about to be generated"""
+        self._key, self._chunks, self._size = key, [], 0
+
+    def add(self, audio: bytes):
+        if self._key is None:
+            return
+        self._size += len(audio)
+        if self._size > self.max_bytes:
+            self.abort()  # Too long to be worth keeping
+        else:
+            self._chunks.append(audio)
+
+    def finish(self, completed: bool = True):
+        if self._key is not None and completed and self._chunks:
+            self.entries.setdefault(self._key, deque(maxlen=self.variants)).append(b"".join(self._chunks))
+        self.abort()
+
+    def abort(self):
+        self._key, self._chunks, self._size = None, [], 0
+
+    def pick(self, key: str) -> Optional[bytes]:
+        variants = self.entries.get(key)
+        return self.rng.choice(variants) if variants else None
+
+    def stats(self) -> dict:
+        return {key: len(variants) for key, variants in self.entries.items()}
+
+
+class UpstreamScheduler:
+    """Orders upstream responses by priority against the shared rate-limit budget
+
+    User turns may spend the budget down to nothing, and wait for the reset
+    (up to max_user_wait) only once it is gone. Autonomous behaviors only run
+    while headroom stays above autonomous_floor; below it they are replayed
+    from the response cache or skipped, which keeps the last part of the
+    budget for people actually talking to the parrots.
+    """
+
+    def __init__(self, tracker: RateLimitTracker, autonomous_floor: float = 0.25,
+                 max_user_wait: float = 3.0):
+        self.tracker = tracker
+        self.autonomous_floor = autonomous_floor
+        self.max_user_wait = max_user_wait
+
+        # Metrics
+        self.granted = {USER: 0, AUTONOMOUS: 0}
+        self.deferred = {USER: 0, AUTONOMOUS: 0}
+        self.cached = 0
+        self.user_wait_total = 0.0
+
+    def allow(self, priority: str) -> bool:
+        """Whether a response of this priority may be requested now"""
+        if priority == USER:
+            allowed = self.tracker.seconds_until_available() == 0.0
+        else:
+            allowed = (self.tracker.headroom() > self.autonomous_floor
+                       and self.tracker.seconds_until_available() == 0.0)
+        (self.granted if allowed else self.deferred)[priority] += 1
+        return allowed
+
+    async def wait_for_user_turn(self, sleep=asyncio.sleep) -> float:
+        """Hold a user turn until the budget allows it (bounded); returns seconds waited"""
+        if self.allow(USER):
+            return 0.0
+        wait = min(self.tracker.seconds_until_available(), self.max_user_wait)
+        await sleep(wait)
+        self.user_wait_total += wait
+        return wait
+
+    def stats(self) -> dict:
+        return {
+            "rate_limits": self.tracker.stats(),
+            "granted": dict(self.granted),
+            "deferred": dict(self.deferred),
+            "served_from_cache": self.cached,
+            "user_wait_seconds": round(self.user_wait_total, 2)
+        }
@@ -0,0 +1,359 @@
+"""Serial telemetry from ESP32s: parsed debug lines alongside the server's own per-device events"""
+
+import asyncio
+import os
+import re
+import termios
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Event sources
+DEVICE = 0  # Parsed from the device's serial output
+SERVER = 1  # Recorded by the server for the same device
+
+# Event kinds (values are the numeric fields kept with each event)
+BOOT = "boot"
+WIFI_CONNECTED = "wifi_connected"
+WIFI_LOST = "wifi_lost"
+IP_ADDRESS = "ip_address"
+AUDIO_WS_CONNECTED = "audio_ws_connected"
+AUDIO_WS_DISCONNECTED = "audio_ws_disconnected"
+AUDIO_WS_ERROR = "audio_ws_error"
+MIC_WS_CONNECTED = "mic_ws_connected"
+MIC_WS_DISCONNECTED = "mic_ws_disconnected"
+MIC_WS_ERROR = "mic_ws_error"
+MIC_RANGE = "mic_range"                  # min, max, bytes
+IDLE_ANIMATION = "idle_animation"        # mouth, wing, tilt, rotation
+SPEAKER_OVERFLOW = "speaker_overflow"    # bytes dropped
+LOOP_STALL = "loop_stall"                # loop ms, speaker drain (i2s_write) ms
+DRIVER_ERROR = "driver_error"            # esp_err_t
+BOTTANGO_UNINITIALIZED = "bottango_uninitialized"
+SERVER_MIC_CONNECTED = "server_mic_connected"
+SERVER_MIC_DISCONNECTED = "server_mic_disconnected"
+SERVER_AUDIO_CONNECTED = "server_audio_connected"
+SERVER_AUDIO_DISCONNECTED = "server_audio_disconnected"
+SERVER_MIC_GAP = "server_mic_gap"        # ms since the previous mic frame
+
+KINDS = (BOOT, WIFI_CONNECTED, WIFI_LOST, IP_ADDRESS, AUDIO_WS_CONNECTED, AUDIO_WS_DISCONNECTED,
+         AUDIO_WS_ERROR, MIC_WS_CONNECTED, MIC_WS_DISCONNECTED, MIC_WS_ERROR, MIC_RANGE, IDLE_ANIMATION,
+         SPEAKER_OVERFLOW, LOOP_STALL, DRIVER_ERROR, BOTTANGO_UNINITIALIZED, SERVER_MIC_CONNECTED,
+         SERVER_MIC_DISCONNECTED, SERVER_AUDIO_CONNECTED, SERVER_AUDIO_DISCONNECTED, SERVER_MIC_GAP)
+KIND_CODES = {kind: code for code, kind in enumerate(KINDS)}
+
+# Device events worth lining up against the server's timeline
+INCIDENTS = (LOOP_STALL, SPEAKER_OVERFLOW, AUDIO_WS_DISCONNECTED, MIC_WS_DISCONNECTED, AUDIO_WS_ERROR,
+             MIC_WS_ERROR, WIFI_LOST, DRIVER_ERROR, BOOT)
+
+_NUMBER = r"(-?\d+(?:\.\d+)?)"
+_PATTERNS: List[Tuple[re.Pattern, str]] = [
+    (re.compile(rf"^Mic raw range: {_NUMBER} to {_NUMBER}(?: \(bytes: (\d+)\))?"), MIC_RANGE),
+    (re.compile(rf"^Idle animation running - positions: Mouth={_NUMBER} Wing={_NUMBER} "
+                rf"Tilt={_NUMBER} Rot={_NUMBER}"), IDLE_ANIMATION),
+    (re.compile(rf"^Loop stall: {_NUMBER} ms(?: \(speaker drain {_NUMBER} ms\))?"), LOOP_STALL),
+    (re.compile(r"^Speaker queue overflow, dropped (\d+) bytes"), SPEAKER_OVERFLOW),
+    (re.compile(r"^Audio WebSocket Connected"), AUDIO_WS_CONNECTED),
+    (re.compile(r"^Audio WebSocket Disconnected"), AUDIO_WS_DISCONNECTED),
+    (re.compile(r"^Audio WebSocket Error"), AUDIO_WS_ERROR),
+    (re.compile(r"^Microphone WebSocket Connected"), MIC_WS_CONNECTED),
+    (re.compile(r"^Microphone WebSocket Disconnected"), MIC_WS_DISCONNECTED),
+    (re.compile(r"^Microphone WebSocket Error"), MIC_WS_ERROR),
+    (re.compile(r"^(?:WiFi connected|Reconnected to WiFi)"), WIFI_CONNECTED),
+    (re.compile(r"^WiFi connection lost"), WIFI_LOST),
+    (re.compile(r"^Failed to .*: (-?\d+)$"), DRIVER_ERROR),
+    (re.compile(r"^WARNING: BottangoCore not initialized"), BOTTANGO_UNINITIALIZED),
+    (re.compile(r"^=== TESTING SERVOS DIRECTLY ==="), BOOT),
+]
+_IP_ADDRESS = re.compile(r"^IP address: (\d+\.\d+\.\d+\.\d+)")
+
+
+def parse_line(line: str) -> Optional[Tuple[str, Tuple[float, ...]]]:
+    """Kind and numeric fields of a firmware debug line, or None for lines we don't model"""
+    line = line.strip()
+    if line.startswith("IP address:"):
+        return (IP_ADDRESS, ()) if _IP_ADDRESS.match(line) else None
+    for pattern, kind in _PATTERNS:
+        match = pattern.match(line)
+        if match:
+            return kind, tuple(float(v) for v in match.groups() if v is not None)
+    return None
+
+
+class EventRing:
+    """Fixed-size ring of compact events: time, kind, source and up to four numbers"""
+
+    DTYPE = np.dtype([("t", "f8"), ("kind", "u1"), ("source", "u1"), ("n", "u1"), ("values", "f4", 4)])
+
+    def __init__(self, capacity: int):
+        self.events = np.zeros(capacity, dtype=self.DTYPE)
+        self.head = 0
+        self.count = 0
+
+    def append(self, t: float, kind: str, source: int, values: Tuple[float, ...]):
+        event = self.events[self.head]
+        event["t"] = t
+        event["kind"] = KIND_CODES[kind]
+        event["source"] = source
+        event["n"] = min(4, len(values))
+        row = np.zeros(4, dtype=np.float32)
+        row[:event["n"]] = values[:4]
+        event["values"] = row
+        self.head = (self.head + 1) % len(self.events)
+        self.count = min(self.count + 1, len(self.events))
+
+    def view(self) -> np.ndarray:
+        """Events oldest first"""
+        if self.count < len(self.events):
+            return self.events[:self.count]
+        return np.concatenate((self.events[self.head:], self.events[:self.head]))
+
+
+class TelemetryStore:
+    """Per-device event timelines from serial and from the server, bounded by count and age"""
+
+    def __init__(self, max_events: int = 4096, retention_s: float = 3600.0, clock: Callable[[], float] = time.time):
+        self.max_events = max_events
+        self.retention_s = retention_s
+        self.clock = clock
+        self.rings: Dict[str, EventRing] = {}
+        self.unparsed = deque(maxlen=50)  # (device, line) for lines no pattern matched
+        self.lines = 0
+        self.unparsed_count = 0
+
+    def record(self, device_id: str, kind: str, *values: float, source: int = SERVER, t: Optional[float] = None):
+        ring = self.rings.get(device_id)
+        if ring is None:
+            ring = self.rings[device_id] = EventRing(self.max_events)
+        ring.append(self.clock() if t is None else t, kind, source, values)
+
+    def ingest(self, device_id: str, line: str, t: Optional[float] = None) -> Optional[str]:
+        """Parse one serial line into the device's timeline; returns its kind"""
+        self.lines += 1
+        parsed = parse_line(line)
+        if parsed is None:
+            if line.strip():
+                self.unparsed_count += 1
+                self.unparsed.append((device_id, line.strip()))
+            return None
+        kind, values = parsed
+        self.record(device_id, kind, *values, source=DEVICE, t=t)
+        return kind
+
+    def rename(self, old: str, new: str):
+        """Events collected under a port name belong to the device it turned out to be"""
+        ring = self.rings.pop(old, None)
+        if ring is None:
+            return
+        target = self.rings.get(new)
+        if target is None:
+            self.rings[new] = ring
+            return
+        for event in ring.view():
+            target.append(float(event["t"]), KINDS[event["kind"]], int(event["source"]),
+                          tuple(event["values"][:event["n"]]))
+
+    def events(self, device_id: str, since: Optional[float] = None, until: Optional[float] = None) -> np.ndarray:
+        """The device's events in time order, within retention"""
+        ring = self.rings.get(device_id)
+        if ring is None:
+            return np.zeros(0, dtype=EventRing.DTYPE)
+        events = ring.view()
+        floor = self.clock() - self.retention_s
+        since = floor if since is None else max(since, floor)
+        keep = events["t"] >= since
+        if until is not None:
+            keep &= events["t"] <= until
+        events = events[keep]
+        return events[np.argsort(events["t"], kind="stable")]
+
+    @staticmethod
+    def describe(events: np.ndarray) -> List[dict]:
+        return [{
+            "t": round(float(e["t"]), 3),
+            "kind": KINDS[e["kind"]],
+            "source": "device" if e["source"] == DEVICE else "server",
+            "values": [round(float(v), 3) for v in e["values"][:e["n"]]]
+        } for e in events]
+
+    def correlate(self, device_id: str, window_s: float = 2.0, since: Optional[float] = None) -> List[dict]:
+        """Each device-side incident with the server events around it"""
+        events = self.events(device_id, since)
+        incident_codes = [KIND_CODES[k] for k in INCIDENTS]
+        device = events[(events["source"] == DEVICE) & np.isin(events["kind"], incident_codes)]
+        server = events[events["source"] == SERVER]
+        if not len(device):
+            return []
+        # Windows for every incident at once
+        lo = np.searchsorted(server["t"], device["t"] - window_s, side="left")
+        hi = np.searchsorted(server["t"], device["t"] + window_s, side="right")
+        return [{
+            **self.describe(device[i:i + 1])[0],
+            "server": [{**e, "offset_s": round(e["t"] - float(device[i]["t"]), 3)}
+                       for e in self.describe(server[lo[i]:hi[i]])]
+        } for i in range(len(device))]
+
+    def stats(self) -> dict:
+        return {
+            "devices": {device: ring.count for device, ring in self.rings.items()},
+            "lines": self.lines,
+            "unparsed": self.unparsed_count,
+            "bytes": sum(ring.events.nbytes for ring in self.rings.values())
+        }
+
+
+class SerialLineReader:
+    """Reads lines from a serial device (or pty) without blocking the event loop
+
+    The port is opened non-blocking in raw mode at the given baud rate and
+    watched with loop.add_reader. If it goes away (unplugged, or the other
+    end of a pty closed) it is reopened every retry_s.
+    """
+
+    def __init__(self, path: str, on_line: Callable[[str, float], None], baud: int = 115200,
+                 retry_s: float = 2.0, clock: Callable[[], float] = time.time):
+        self.path = path
+        self.on_line = on_line
+        self.baud = baud
+        self.retry_s = retry_s
+        self.clock = clock
+        self._fd: Optional[int] = None
+        self._partial = b""
+        self._lost: Optional[asyncio.Future] = None
+        self._task: Optional[asyncio.Task] = None
+        self._warned = False
+
+        # Metrics
+        self.opens = 0
+        self.bytes = 0
+
+    def _open(self) -> int:
+        fd = os.open(self.path, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+        try:
+            attrs = termios.tcgetattr(fd)
+            speed = getattr(termios, f"B{self.baud}", termios.B115200)
+            attrs[0] = 0                                                   # iflag: no translation
+            attrs[1] = 0                                                   # oflag
+            attrs[2] = termios.CS8 | termios.CREAD | termios.CLOCAL        # cflag: 8N1, ignore modem lines
+            attrs[3] = 0                                                   # lflag: raw, no echo
+            attrs[4] = attrs[5] = speed
+            termios.tcsetattr(fd, termios.TCSANOW, attrs)
+        except termios.error:
+            pass  # Not a tty (a fifo in a test): read it as is
+        return fd
+
+    def _readable(self):
+        try:
+            data = os.read(self._fd, 4096)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            data = b""
+            error = e
+        else:
+            error = None
+        if not data:
+            if not self._lost.done():
+                self._lost.set_result(error)
+            return
+        self.bytes += len(data)
+        now = self.clock()
+        lines = (self._partial + data).split(b"\n")
+        self._partial = lines.pop()
+        if len(self._partial) > 4096:
+            self._partial = b""  # No newline in sight: line noise at the wrong baud rate
+        for line in lines:
+            text = line.decode("utf-8", errors="ignore").strip()
+            if text:
+                self.on_line(text, now)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                self._fd = self._open()
+            except OSError as e:
+                if not self._warned:
+                    print(f"Serial port {self.path} unavailable ({e}); retrying every {self.retry_s:.0f}s")
+                    self._warned = True
+                await asyncio.sleep(self.retry_s)
+                continue
+            self._warned = False
+            self.opens += 1
+            self._partial = b""
+            self._lost = loop.create_future()
+            loop.add_reader(self._fd, self._readable)
+            try:
+                await self._lost
+            finally:
+                loop.remove_reader(self._fd)
+                os.close(self._fd)
+                self._fd = None
+            await asyncio.sleep(self.retry_s)
+
+    def start(self):
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+class SerialTelemetryCollector:
+    """Ingests serial debug output from several ESP32s into a TelemetryStore
+
+    ports maps a serial device path to the device id the server knows it by
+    (its IP). Leave the id empty to learn it from the firmware's
+    "IP address:" line; until then events are kept under the port path.
+    """
+
+    def __init__(self, store: TelemetryStore, ports: Dict[str, str], baud: int = 115200,
+                 retry_s: float = 2.0, echo: bool = False):
+        self.store = store
+        self.echo = echo
+        self.device_for: Dict[str, str] = {path: device or path for path, device in ports.items()}
+        self.readers = [
+            SerialLineReader(path, self._line_handler(path), baud=baud, retry_s=retry_s, clock=store.clock)
+            for path in ports
+        ]
+
+    def _line_handler(self, path: str):
+        def on_line(line: str, t: float):
+            match = _IP_ADDRESS.match(line)
+            if match and self.device_for[path] != match.group(1):
+                self.store.rename(self.device_for[path], match.group(1))
+                self.device_for[path] = match.group(1)
+            kind = self.store.ingest(self.device_for[path], line, t)
+            if self.echo:
+                print(f"[{self.device_for[path]}] {kind or '-':22} {line}")
+        return on_line
+
+    def start(self):
+        for reader in self.readers:
+            reader.start()
+
+    async def stop(self):
+        for reader in self.readers:
+            await reader.stop()
+
+    def stats(self) -> dict:
+        return {
+            "ports": {reader.path: {"device": self.device_for[reader.path], "opens": reader.opens,
+                                    "bytes": reader.bytes} for reader in self.readers},
+            **self.store.stats()
+        }
+
+
+def parse_ports(spec: str) -> Dict[str, str]:
+    """'/dev/ttyUSB0=192.168.1.50,/dev/ttyUSB1' -> {path: device id or ''}"""
+    ports = {}
+    for entry in filter(None, (e.strip() for e in spec.split(","))):
+        path, _, device = entry.partition("=")
+        ports[path] = device
+    return ports
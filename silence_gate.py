@@ -0,0 +1,99 @@
+"""Local silence suppression for the upstream mic path"""
+
+from collections import deque
+from typing import List
+
+
+class SilenceGate:
+    """Forwards only voiced regions of a mic stream
+
+    While closed, frames go into a pre-roll ring instead of upstream. On
+    speech onset the ring is flushed ahead of the voiced frame so the server
+    VAD still gets its prefix padding, and the gate stays open for a hangover
+    tail after the last voiced frame so the server VAD sees the trailing
+    silence it needs to end the turn. Durations are counted in audio samples,
+    not wall-clock time, so bursty delivery doesn't change the gate's shape.
+    """
+
+    def __init__(self, pre_roll_ms: float = 500, hangover_ms: float = 1000,
+                 sample_rate: int = 24000, sample_width: int = 2):
+        self.bytes_per_ms = sample_rate * sample_width / 1000.0
+        self.pre_roll_bytes = int(pre_roll_ms * self.bytes_per_ms)
+        self.hangover_bytes = int(hangover_ms * self.bytes_per_ms)
+
+        self.is_open = False
+        self._pre_roll = deque()
+        self._pre_roll_size = 0
+        self._since_voice = 0  # Bytes forwarded since the last voiced frame
+
+        # Statistics
+        self.frames_total = 0
+        self.frames_sent = 0
+        self.bytes_total = 0
+        self.bytes_sent = 0
+        self.openings = 0
+
+    def process(self, frame: bytes, has_voice: bool) -> List[bytes]:
+        """Feed one mic frame; returns the frames to send upstream (possibly none)"""
+        self.frames_total += 1
+        self.bytes_total += len(frame)
+
+        if self.is_open:
+            if has_voice:
+                self._since_voice = 0
+            else:
+                self._since_voice += len(frame)
+                if self._since_voice > self.hangover_bytes:
+                    self.is_open = False
+                    self._buffer(frame)
+                    return []
+            return self._send([frame])
+
+        if not has_voice:
+            self._buffer(frame)
+            return []
+
+        # Speech onset: flush the lead-in ahead of the voiced frame
+        self.is_open = True
+        self.openings += 1
+        self._since_voice = 0
+        frames = list(self._pre_roll)
+        frames.append(frame)
+        self._pre_roll.clear()
+        self._pre_roll_size = 0
+        return self._send(frames)
+
+    def _buffer(self, frame: bytes):
+        self._pre_roll.append(frame)
+        self._pre_roll_size += len(frame)
+        while self._pre_roll and self._pre_roll_size - len(self._pre_roll[0]) >= self.pre_roll_bytes:
+            self._pre_roll_size -= len(self._pre_roll.popleft())
+
+    def _send(self, frames: List[bytes]) -> List[bytes]:
+        self.frames_sent += len(frames)
+        self.bytes_sent += sum(len(f) for f in frames)
+        return frames
+
+    def reset(self):
+        """Close the gate and drop any buffered lead-in"""
+        self.is_open = False
+        self._pre_roll.clear()
+        self._pre_roll_size = 0
+        self._since_voice = 0
+
+    @property
+    def suppressed_fraction(self) -> float:
+        """Fraction of incoming frames that were never sent upstream"""
+        if not self.frames_total:
+            return 0.0
+        return max(0.0, 1.0 - self.frames_sent / self.frames_total)
+
+    def stats(self) -> dict:
+        return {
+            "frames_total": self.frames_total,
+            "frames_sent": self.frames_sent,
+            "suppressed_fraction": self.suppressed_fraction,
+            "bytes_saved": max(0, self.bytes_total - self.bytes_sent),
+            "openings": self.openings,
+            "open": self.is_open
+        }
@@ -0,0 +1,144 @@
+"""Streaming loudness normalization and look-ahead limiting for speaker audio"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy import signal
+
+
+def _high_shelf(freq: float, gain_db: float, sample_rate: int) -> np.ndarray:
+    """RBJ cookbook high shelf (S=1) as one second-order section"""
+    a = 10 ** (gain_db / 40.0)
+    w0 = 2 * np.pi * freq / sample_rate
+    cos_w0 = np.cos(w0)
+    alpha = np.sin(w0) / 2 * np.sqrt(2.0)
+    sq = 2 * np.sqrt(a) * alpha
+    b = [a * ((a + 1) + (a - 1) * cos_w0 + sq),
+         -2 * a * ((a - 1) + (a + 1) * cos_w0),
+         a * ((a + 1) + (a - 1) * cos_w0 - sq)]
+    den = [(a + 1) - (a - 1) * cos_w0 + sq,
+           2 * ((a - 1) - (a + 1) * cos_w0),
+           (a + 1) - (a - 1) * cos_w0 - sq]
+    return np.concatenate((np.array(b) / den[0], np.array(den) / den[0]))
+
+
+class LoudnessNormalizer:
+    """Evens out reply loudness, then keeps peaks under a ceiling without clipping
+
+    Loudness is a running mean square of K-weighted audio (BS.1770's
+    high-pass plus high shelf) over window_ms. The gain that brings it to
+    target_dbfs is smoothed and held through silence, so pauses aren't
+    pumped up. The limiter then takes, for every sample, the gain that keeps
+    it under ceiling_dbfs, and applies the minimum of that gain over the
+    look-ahead window, averaged over the same window. Output is delayed by
+    the look-ahead so the gain is already down when a peak arrives. Every
+    stage is a vectorized filter with state carried across chunks.
+
+    The firmware doubles every sample, so the default ceiling leaves 6 dB for it.
+    """
+
+    def __init__(self, sample_rate: int = 24000, target_dbfs: float = -20.0, window_ms: float = 400.0,
+                 gate_dbfs: float = -50.0, max_gain: float = 4.0, min_gain: float = 0.1,
+                 gain_smoothing_ms: float = 200.0, ceiling_dbfs: float = -6.5,
+                 lookahead_ms: float = 5.0, release_ms: float = 80.0):
+        self.sample_rate = sample_rate
+        self.target_rms = 32768.0 * 10 ** (target_dbfs / 20.0)
+        self.gate_ms = (32768.0 * 10 ** (gate_dbfs / 20.0)) ** 2
+        self.max_gain = max_gain
+        self.min_gain = min_gain
+        self.ceiling = 32768.0 * 10 ** (ceiling_dbfs / 20.0)
+
+        hp = signal.butter(2, 60.0, btype="highpass", fs=sample_rate, output="sos")
+        self.sos = np.vstack((hp, _high_shelf(1500.0, 4.0, sample_rate)))
+        self.ms_coef = 1.0 - np.exp(-1.0 / (sample_rate * window_ms / 1000.0))
+        self.gain_coef = 1.0 - np.exp(-1.0 / (sample_rate * gain_smoothing_ms / 1000.0))
+        self.release_coef = 1.0 - np.exp(-1.0 / (sample_rate * release_ms / 1000.0))
+        self.lookahead = max(1, int(sample_rate * lookahead_ms / 1000.0))
+
+        # Metrics
+        self.max_reduction_db = 0.0
+        self.samples = 0
+        self.reset()
+
+    def reset(self):
+        """Forget all state, including the loudness history"""
+        self.zi = np.zeros((self.sos.shape[0], 2))
+        self.ms_zi = np.array([(1.0 - self.ms_coef) * self.target_rms ** 2])  # Start at target: unity gain
+        self.desired = 1.0
+        self.gain_zi = np.array([(1.0 - self.gain_coef) * 1.0])
+        self.release_zi = np.array([(1.0 - self.release_coef) * 1.0])
+        self.clear_delay()
+
+    def clear_delay(self):
+        """Drop audio held in the look-ahead (after an interruption); loudness history is kept"""
+        history = 2 * self.lookahead - 2
+        self._required = np.ones(history, dtype=np.float32)
+        self._delayed = np.zeros(history, dtype=np.float32)
+        self.holding = False  # Audio is waiting in the look-ahead
+
+    @property
+    def gain_db(self) -> float:
+        return float(20 * np.log10(max(self.gain_zi[0] / (1.0 - self.gain_coef), 1e-6)))
+
+    def process_array(self, samples: np.ndarray) -> np.ndarray:
+        """Process int16 samples; returns as many int16 samples, delayed by the look-ahead"""
+        if samples.size == 0:
+            return samples
+        x = samples.astype(np.float32)
+
+        # Loudness and the gain that would bring it to target
+        weighted, self.zi = signal.sosfilt(self.sos, x, zi=self.zi)
+        mean_square, self.ms_zi = signal.lfilter([self.ms_coef], [1.0, self.ms_coef - 1.0],
+                                                 weighted * weighted, zi=self.ms_zi)
+        desired = np.clip(self.target_rms / np.sqrt(np.maximum(mean_square, 1e-9)), self.min_gain, self.max_gain)
+        gated = mean_square < self.gate_ms
+        if gated.any():
+            # Hold the last speech gain through silence
+            index = np.where(gated, 0, np.arange(1, len(desired) + 1))
+            np.maximum.accumulate(index, out=index)
+            desired = np.concatenate(([self.desired], desired))[index]
+        self.desired = float(desired[-1])
+        gain, self.gain_zi = signal.lfilter([self.gain_coef], [1.0, self.gain_coef - 1.0],
+                                            desired, zi=self.gain_zi)
+        y = x * gain.astype(np.float32)
+
+        # Look-ahead limiter: windowed minimum of the required gain, then a box average
+        required = np.minimum(1.0, self.ceiling / np.maximum(np.abs(y), 1e-3)).astype(np.float32)
+        required = np.concatenate((self._required, required))
+        delayed = np.concatenate((self._delayed, y))
+        n, window = len(x), self.lookahead
+        floor = sliding_window_view(required, window).min(axis=1)
+        sums = np.concatenate(([0.0], np.cumsum(floor, dtype=np.float64)))
+        limit = (sums[window:window + n] - sums[:n]) / window
+        released, self.release_zi = signal.lfilter([self.release_coef], [1.0, self.release_coef - 1.0],
+                                                   limit, zi=self.release_zi)
+        limit = np.minimum(limit, released)
+        if len(required) > n:
+            self._required = required[n:]
+            self._delayed = delayed[n:]
+
+        out = delayed[window - 1:window - 1 + n] * limit.astype(np.float32)
+        self.max_reduction_db = max(self.max_reduction_db, float(-20 * np.log10(max(limit.min(), 1e-6))))
+        self.samples += n
+        self.holding = True
+        np.clip(out, -32768, 32767, out=out)
+        return out.astype(np.int16)
+
+    def process(self, audio_data: bytes) -> bytes:
+        """Process a PCM16 chunk"""
+        return self.process_array(np.frombuffer(audio_data, dtype=np.int16)).tobytes()
+
+    def flush(self) -> bytes:
+        """Push out the audio still held in the look-ahead (at the end of a reply)"""
+        if self.lookahead <= 1 or not self.holding:
+            return b""
+        tail = self.process_array(np.zeros(self.lookahead - 1, dtype=np.int16)).tobytes()
+        self.holding = False
+        return tail
+
+    def stats(self) -> dict:
+        return {
+            "gain_db": round(self.gain_db, 2),
+            "max_limiter_reduction_db": round(self.max_reduction_db, 2),
+            "latency_ms": (self.lookahead - 1) * 1000.0 / self.sample_rate,
+            "samples": self.samples
+        }
@@ -0,0 +1,249 @@
+"""Buffer-depth flow control for the speaker WebSocket"""
+
+import asyncio
+import time
+from typing import Callable, Optional
+
+# Device status messages on /audio-stream
+BUFFER_REPORT_PREFIX = "buffer:"  # "buffer:<mono bytes queued>"
+LEGACY_BUFFER_OK = "buffer_ok"    # Older firmware, carries no depth
+
+
+class SpeakerFlowController:
+    """Estimates how much audio a device has queued and when more may be sent
+
+    The device reports its queue depth in bytes. Between reports the estimate
+    is the last report plus what was sent since, minus what the device has
+    played in the meantime at the nominal sample rate. Devices that never
+    report are treated as having reported an empty queue when streaming
+    started, which degrades to real-time pacing with target_ms of lead.
+    """
+
+    def __init__(self, sample_rate: int = 24000, target_ms: float = 200.0,
+                 sample_width: int = 2, clock=time.monotonic):
+        self.bytes_per_second = sample_rate * sample_width
+        self.target_bytes = int(self.bytes_per_second * target_ms / 1000.0)
+        self.clock = clock
+
+        self.reported_depth = 0
+        self.report_time: Optional[float] = None
+        self.sent_since_report = 0
+        self.supports_reports = False
+
+        # Metrics
+        self.reports = 0
+        self.underruns = 0  # Reports of an empty queue while audio was still expected
+        self.max_depth = 0
+
+    def on_report(self, queued_bytes: int):
+        """Record a depth report from the device"""
+        now = self.clock()
+        if queued_bytes == 0 and self.estimated_depth(now) > self.target_bytes // 2:
+            self.underruns += 1
+        self.supports_reports = True
+        self.reports += 1
+        self.reported_depth = queued_bytes
+        self.report_time = now
+        self.sent_since_report = 0
+        self.max_depth = max(self.max_depth, queued_bytes)
+
+    def handle_message(self, text: str) -> bool:
+        """Parse a status message; returns True if it was a buffer report"""
+        if text.startswith(BUFFER_REPORT_PREFIX):
+            try:
+                self.on_report(int(text[len(BUFFER_REPORT_PREFIX):]))
+            except ValueError:
+                return False
+            return True
+        return text == LEGACY_BUFFER_OK
+
+    def estimated_depth(self, now: Optional[float] = None) -> int:
+        """Bytes the device is estimated to have queued right now"""
+        if self.report_time is None:
+            return 0
+        now = self.clock() if now is None else now
+        played = (now - self.report_time) * self.bytes_per_second
+        return max(0, int(self.reported_depth + self.sent_since_report - played))
+
+    def on_send(self, nbytes: int):
+        """Account for audio handed to the socket"""
+        now = self.clock()
+        if self.report_time is None or self.estimated_depth(now) == 0:
+            # Playback has drained: restart the estimate so idle time isn't banked as credit
+            self.report_time = now
+            self.reported_depth = 0
+            self.sent_since_report = 0
+        self.sent_since_report += nbytes
+
+    def delay_before_send(self, nbytes: int) -> float:
+        """Seconds to wait before nbytes may be sent (0 = send now)"""
+        depth = self.estimated_depth()
+        if depth == 0 or depth + nbytes <= self.target_bytes:
+            return 0.0
+        return (depth + nbytes - self.target_bytes) / self.bytes_per_second
+
+    def reset(self):
+        """Forget queued audio (the device was told to stop or reconnected)"""
+        self.reported_depth = 0
+        self.report_time = None
+        self.sent_since_report = 0
+
+    def stats(self) -> dict:
+        return {
+            "estimated_depth_ms": self.estimated_depth() * 1000.0 / self.bytes_per_second,
+            "max_depth_ms": self.max_depth * 1000.0 / self.bytes_per_second,
+            "reports": self.reports,
+            "underruns": self.underruns,
+            "device_reports": self.supports_reports
+        }
+
+
+class AdaptiveChunker:
+    """Picks downlink frame sizes for one speaker connection
+
+    The device only starts playing once a whole frame has arrived, so the
+    first fast_start_ms of each burst go out in min_bytes frames. After that
+    frames grow linearly with the device's estimated queue depth, reaching
+    max_bytes once a full frame on top of the queue would hit the flow
+    controller's target.
+    """
+
+    def __init__(self, min_bytes: int = 960, max_bytes: int = 4096, fast_start_ms: float = 60.0,
+                 sample_rate: int = 24000, sample_width: int = 2):
+        self.sample_width = sample_width
+        self.bytes_per_second = sample_rate * sample_width
+        self.configure(min_bytes, max_bytes, fast_start_ms)
+
+        # Metrics
+        self.bursts = 0
+        self.chunks = 0
+        self.bytes_sent = 0
+        self.first_chunk_bytes = 0
+
+    def configure(self, min_bytes: int = None, max_bytes: int = None, fast_start_ms: float = None):
+        """Retune sizes; arguments left as None keep their current value"""
+        if min_bytes is not None:
+            self.min_bytes = self._align(min_bytes)
+        if max_bytes is not None:
+            self.max_bytes = self._align(max_bytes)
+        if fast_start_ms is not None:
+            self.fast_start_ms = fast_start_ms
+        self.max_bytes = max(self.max_bytes, self.min_bytes)
+        self.fast_start_bytes = int(self.bytes_per_second * self.fast_start_ms / 1000.0)
+
+    def _align(self, nbytes: int) -> int:
+        return max(self.sample_width, int(nbytes) // self.sample_width * self.sample_width)
+
+    def next_size(self, depth: int, target: int, burst_sent: int) -> int:
+        """Frame size for the next send given the device's queue depth"""
+        if burst_sent < self.fast_start_bytes:
+            return self.min_bytes
+        headroom = max(target - self.max_bytes, self.min_bytes)
+        fill = min(1.0, depth / headroom)
+        return self._align(self.min_bytes + (self.max_bytes - self.min_bytes) * fill)
+
+    def on_chunk(self, nbytes: int, burst_start: bool):
+        if burst_start:
+            self.bursts += 1
+            self.first_chunk_bytes = nbytes
+        self.chunks += 1
+        self.bytes_sent += nbytes
+
+    def stats(self) -> dict:
+        return {
+            "min_bytes": self.min_bytes,
+            "max_bytes": self.max_bytes,
+            "fast_start_ms": self.fast_start_ms,
+            "bursts": self.bursts,
+            "chunks": self.chunks,
+            "mean_chunk_bytes": self.bytes_sent / self.chunks if self.chunks else 0.0,
+            "first_chunk_ms": self.first_chunk_bytes * 1000.0 / self.bytes_per_second
+        }
+
+
+class SpeakerChannel:
+    """Paced outbound audio queue for one speaker connection
+
+    stream_to_speakers only enqueues, so the upstream receive loop never
+    waits on a slow device. A sender task cuts frames off the queue as the
+    flow controller grants room, sized by the chunker; clear() drops whatever
+    hasn't been sent, which bounds how long an interrupted reply keeps playing.
+    A burst starts whenever the device's queue has drained. monitor, if
+    given, sees each frame as it is sent (the live audio tap).
+    """
+
+    def __init__(self, websocket, flow: SpeakerFlowController, chunker: Optional[AdaptiveChunker] = None,
+                 monitor: Optional[Callable[[bytes], None]] = None):
+        self.websocket = websocket
+        self.flow = flow
+        self.chunker = chunker or AdaptiveChunker()
+        self.monitor = monitor
+        self.pending = bytearray()
+        self.burst_sent = 0
+        self.closed = False
+        self._ready = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self.task = asyncio.create_task(self._run())
+
+    def enqueue(self, chunk: bytes):
+        if self.closed:
+            return
+        self.pending.extend(chunk)
+        self._ready.set()
+
+    @property
+    def pending_bytes(self) -> int:
+        return len(self.pending)
+
+    def clear(self) -> int:
+        """Drop unsent audio; returns the number of bytes dropped"""
+        dropped = len(self.pending)
+        self.pending.clear()
+        return dropped
+
+    async def close(self):
+        self.closed = True
+        self.clear()
+        if self.task and not self.task.done():
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self):
+        try:
+            while not self.closed:
+                if not self.pending:
+                    self._ready.clear()
+                    await self._ready.wait()
+                    continue
+
+                depth = self.flow.estimated_depth()
+                burst_start = depth == 0
+                if burst_start:
+                    self.burst_sent = 0
+                size = min(len(self.pending),
+                           self.chunker.next_size(depth, self.flow.target_bytes, self.burst_sent))
+                delay = self.flow.delay_before_send(size)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                    continue  # Re-check: the queue may have been cleared meanwhile
+
+                chunk = bytes(self.pending[:size])
+                del self.pending[:size]
+                await self.websocket.send_bytes(chunk)
+                if self.monitor:
+                    self.monitor(chunk)
+                self.flow.on_send(size)
+                self.chunker.on_chunk(size, burst_start)
+                self.burst_sent += size
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if str(e) and "1006" not in str(e):  # Don't print abnormal closure errors
+                print(f"Error sending audio to client: {e}")
+            self.closed = True
+            self.clear()
@@ -1,19 +1,163 @@
 #!/usr/bin/env python3
 """
 Connectivity test script for Parrot Server deployment
-Tests WebSocket connections and basic server functionality
+Probes every device endpoint on one or more servers concurrently, measuring
+handshake time and WebSocket ping round-trips, and can soak a deployment by
+running simulated devices that stream 24kHz PCM both ways for a while,
+reporting throughput, jitter and reconnects.
 """
 import asyncio
+import contextlib
 import websockets
 import argparse
 import time
-import json
 import sys
 
+import numpy as np
+
+RATE = 24000
+BYTES_PER_SECOND = RATE * 2
+MIC_FRAME_SAMPLES = 1024  # What the firmware sends per mic read
+BUFFER_REPORT_INTERVAL = 0.05  # Firmware's BUFFER_REPORT_INTERVAL
+STREAM_GAP = 1.0  # Silence on the speaker socket longer than this ends a reply
+RECONNECT_DELAY = 5.0  # Firmware's setReconnectInterval
+JITTER_GAIN = 1 / 16  # RFC 3550 interarrival jitter smoothing
+
+
+def percentiles(values, points=(50, 90, 99)):
+    """Percentiles in milliseconds, or None without samples"""
+    if not values:
+        return None
+    return [float(v) * 1000.0 for v in np.percentile(values, points)]
+
+
+def format_ms(values):
+    p = percentiles(values)
+    return "    -    /    -    /    -   " if p is None else "/".join(f"{v:8.1f}" for v in p)
+
+
+def failure_reason(error):
+    if isinstance(error, asyncio.TimeoutError):
+        return "timeout"
+    if isinstance(error, ConnectionRefusedError) or "Connection refused" in str(error):
+        return "refused"
+    if isinstance(error, websockets.exceptions.InvalidStatus):
+        return f"http {error.response.status_code}"
+    if isinstance(error, websockets.exceptions.ConnectionClosed):
+        return f"closed {error.rcvd.code if error.rcvd else 'abnormally'}"
+    if isinstance(error, OSError):
+        return "network"
+    return type(error).__name__
+
+
+class ProbeResult:
+    """Handshake and round-trip samples for one service on one host"""
+
+    def __init__(self, host, service):
+        self.host = host
+        self.service = service
+        self.handshakes = []
+        self.round_trips = []
+        self.failures = {}
+
+    @property
+    def attempts(self):
+        return len(self.handshakes) + sum(self.failures.values())
+
+    @property
+    def ok(self):
+        return bool(self.handshakes) and not self.failures
+
+    def fail(self, reason):
+        self.failures[reason] = self.failures.get(reason, 0) + 1
+
+
+class SoakStats:
+    """Counters for one simulated device over a soak"""
+
+    def __init__(self, host, index, source_ip=None):
+        self.host = host
+        self.index = index
+        self.source_ip = source_ip
+        self.connects = {"audio": 0, "microphone": 0}
+        self.reconnects = {"audio": 0, "microphone": 0}
+        self.downtime = {"audio": 0.0, "microphone": 0.0}
+        self.failures = {}
+        self.round_trips = []
+
+        # Upstream (mic)
+        self.sent_bytes = 0
+        self.sent_frames = 0
+        self.late_frames = 0  # Sent more than a frame behind schedule
+        self.send_lateness = []
+
+        # Downstream (speaker)
+        self.received_bytes = 0
+        self.received_chunks = 0
+        self.replies = 0
+        self.jitter = 0.0
+        self.max_jitter = 0.0
+        self.starved = 0.0  # Seconds the simulated speaker queue ran dry mid-reply
+        self.buffer_reports = 0
+        self.server_pings = 0
+
+    def fail(self, reason):
+        self.failures[reason] = self.failures.get(reason, 0) + 1
+
+
+class SimulatedSpeaker:
+    """Plays received audio out of a queue in real time, as the firmware does
+
+    Tracks interarrival jitter of the stream (RFC 3550, with each chunk's
+    media time taken from the bytes received so far in the reply) and time
+    the queue sat empty while a reply was still arriving.
+    """
+
+    def __init__(self, stats):
+        self.stats = stats
+        self.depth = 0.0
+        self.updated = None
+        self.last_arrival = None
+        self.stream_start = None
+        self.stream_bytes = 0
+        self.last_transit = None
+
+    def queued(self, now):
+        if self.updated is None:
+            return 0
+        return max(0.0, self.depth - (now - self.updated) * BYTES_PER_SECOND)
+
+    def receive(self, nbytes, now):
+        stats = self.stats
+        if self.last_arrival is None or now - self.last_arrival > STREAM_GAP:
+            stats.replies += 1
+            self.stream_start = now
+            self.stream_bytes = 0
+            self.last_transit = None
+        else:
+            shortfall = (now - self.updated) * BYTES_PER_SECOND - self.depth
+            if shortfall > 0:
+                stats.starved += shortfall / BYTES_PER_SECOND
+
+        transit = (now - self.stream_start) - self.stream_bytes / BYTES_PER_SECOND
+        if self.last_transit is not None:
+            stats.jitter += (abs(transit - self.last_transit) - stats.jitter) * JITTER_GAIN
+            stats.max_jitter = max(stats.max_jitter, stats.jitter)
+        self.last_transit = transit
+
+        self.depth = self.queued(now) + nbytes
+        self.updated = now
+        self.last_arrival = now
+        self.stream_bytes += nbytes
+        stats.received_bytes += nbytes
+        stats.received_chunks += 1
+
+
 class ConnectivityTester:
-    def __init__(self, host, use_ssl=False):
+    def __init__(self, host, use_ssl=False, timeout=5.0):
         self.host = host
         self.protocol = "wss" if use_ssl else "ws"
+        self.timeout = timeout
         self.ports = {
             'audio': 8001,
             'microphone': 8002,
@@ -24,123 +168,276 @@ class ConnectivityTester:
             'microphone': '/microphone',
             'control': '/'
         }
-    
+
     def get_url(self, service):
         """Generate WebSocket URL for a service"""
         port = self.ports[service]
         path = self.paths[service]
         return f"{self.protocol}://{self.host}:{port}{path}"
-    
-    async def test_connection(self, service, timeout=5):
-        """Test connection to a specific service"""
-        url = self.get_url(service)
-        print(f"Testing {service} connection: {url}")
-        
-        try:
-            # Use asyncio.wait_for for timeout control
-            websocket = await asyncio.wait_for(
-                websockets.connect(url), 
-                timeout=timeout
-            )
-            
-            print(f"✅ {service.upper()} - Connection successful")
-            
-            # Send a test ping if it's the control port
-            if service == 'control':
-                try:
-                    await websocket.send("ping")
-                    response = await asyncio.wait_for(websocket.recv(), timeout=2)
-                    print(f"   📡 Ping response: {response}")
-                except asyncio.TimeoutError:
-                    print(f"   ⚠️  No ping response (normal for this server)")
-            
-            # For audio, send a test message
-            elif service == 'audio':
-                try:
-                    await websocket.send("ping")
-                    print(f"   📡 Audio WebSocket ready for streaming")
-                except Exception as e:
-                    print(f"   ⚠️  Audio test message failed: {e}")
-            
-            # For microphone, just confirm connection
-            elif service == 'microphone':
-                print(f"   🎤 Microphone WebSocket ready for audio input")
-            
-            await websocket.close()
-            return True
-                
-        except ConnectionRefusedError:
-            print(f"❌ {service.upper()} - Connection refused (server not running or port closed)")
-            return False
-        except OSError as e:
-            if "Connection refused" in str(e):
-                print(f"❌ {service.upper()} - Connection refused (server not running or port closed)")
-            else:
-                print(f"❌ {service.upper()} - Network error: {e}")
-            return False
-        except asyncio.TimeoutError:
-            print(f"❌ {service.upper()} - Connection timeout")
-            return False
-        except Exception as e:
-            print(f"❌ {service.upper()} - Connection failed: {e}")
-            return False
-    
-    async def test_all(self):
-        """Test all services"""
-        print(f"🔍 Testing connectivity to Parrot Server at {self.host}")
-        print("=" * 60)
-        
-        results = {}
-        for service in ['control', 'audio', 'microphone']:
-            results[service] = await self.test_connection(service)
-            time.sleep(0.5)  # Brief pause between tests
-        
-        print("\n" + "=" * 60)
-        print("📊 CONNECTIVITY SUMMARY")
-        print("=" * 60)
-        
-        success_count = sum(results.values())
-        total_count = len(results)
-        
-        for service, success in results.items():
-            status = "✅ ONLINE" if success else "❌ OFFLINE"
-            print(f"{service.upper():12} - {status}")
-        
-        print(f"\nOverall: {success_count}/{total_count} services accessible")
-        
-        if success_count == total_count:
-            print("🎉 All services are online! ESP32 should be able to connect.")
-        elif success_count > 0:
-            print("⚠️  Some services are offline. Check server logs and port configuration.")
-        else:
-            print("🚨 No services accessible. Check server deployment and network connectivity.")
-        
-        return success_count == total_count
+
+    async def open(self, service, source_ip=None):
+        """Connect to a service, from source_ip if given; returns the socket and the handshake time"""
+        began = time.perf_counter()
+        websocket = await websockets.connect(self.get_url(service), open_timeout=self.timeout,
+                                             ping_interval=None, max_size=None,
+                                             local_addr=(source_ip, 0) if source_ip else None)
+        return websocket, time.perf_counter() - began
+
+    async def round_trip(self, websocket):
+        """One WebSocket ping/pong; the endpoints don't echo messages, but every stack answers pings"""
+        began = time.perf_counter()
+        pong = await websocket.ping()
+        await asyncio.wait_for(pong, timeout=self.timeout)
+        return time.perf_counter() - began
+
+    async def probe(self, service, result, pings=5, limit=None):
+        """Connect once, then measure ping round-trips on the open socket"""
+        async with limit or contextlib.nullcontext():
+            try:
+                websocket, handshake = await self.open(service)
+            except Exception as e:
+                result.fail(failure_reason(e))
+                return
+            result.handshakes.append(handshake)
+            try:
+                for _ in range(pings):
+                    result.round_trips.append(await self.round_trip(websocket))
+            except Exception as e:
+                result.fail(failure_reason(e))
+            finally:
+                await websocket.close()
+
+    async def test_connection(self, service, connections=1, pings=5, limit=None):
+        """Open connections to one service at once and collect their timings"""
+        result = ProbeResult(self.host, service)
+        await asyncio.gather(*(self.probe(service, result, pings, limit) for _ in range(connections)))
+        return result
+
+    async def test_all(self, services=('control', 'audio', 'microphone'), connections=1, pings=5, limit=None):
+        """Test all services at once"""
+        return await asyncio.gather(*(self.test_connection(service, connections, pings, limit)
+                                      for service in services))
+
+    async def keep_connected(self, service, stats, deadline, session):
+        """Run a session on a service until the deadline, reconnecting like the firmware"""
+        while time.monotonic() < deadline:
+            down_since = time.monotonic()
+            try:
+                websocket, _ = await self.open(service, stats.source_ip)
+            except Exception as e:
+                stats.fail(f"{service} {failure_reason(e)}")
+                await asyncio.sleep(min(RECONNECT_DELAY, max(0.0, deadline - time.monotonic())))
+                stats.downtime[service] += time.monotonic() - down_since
+                continue
+            if stats.connects[service]:
+                stats.reconnects[service] += 1
+                stats.downtime[service] += time.monotonic() - down_since
+            stats.connects[service] += 1
+            pinger = asyncio.create_task(self.sample_round_trips(websocket, stats, deadline))
+            try:
+                await session(websocket, deadline)
+            except (websockets.exceptions.ConnectionClosed, OSError) as e:
+                stats.fail(f"{service} {failure_reason(e)}")
+            finally:
+                pinger.cancel()
+                await asyncio.gather(pinger, return_exceptions=True)
+                await websocket.close()
+            if time.monotonic() < deadline:
+                down_since = time.monotonic()
+                await asyncio.sleep(min(RECONNECT_DELAY, max(0.0, deadline - time.monotonic())))
+                stats.downtime[service] += time.monotonic() - down_since
+
+    async def sample_round_trips(self, websocket, stats, deadline, interval=1.0):
+        while time.monotonic() < deadline:
+            await asyncio.sleep(interval)
+            try:
+                stats.round_trips.append(await self.round_trip(websocket))
+            except asyncio.TimeoutError:
+                stats.fail("ping timeout")
+
+    async def stream_microphone(self, websocket, deadline, stats, level):
+        """Send mic frames at real-time pace; frames behind schedule go out back to back"""
+        frame_seconds = MIC_FRAME_SAMPLES / RATE
+        t = np.arange(MIC_FRAME_SAMPLES * 75) / RATE  # 3.2s loop of a 220Hz tone plus noise
+        rng = np.random.default_rng(stats.index)
+        signal = np.sin(2 * np.pi * 220 * t) + 0.3 * rng.standard_normal(t.size)
+        signal *= level / np.sqrt(np.mean(signal ** 2))
+        pcm = np.clip(signal, -32768, 32767).astype(np.int16).tobytes()
+        frame_bytes = MIC_FRAME_SAMPLES * 2
+
+        began = time.monotonic()
+        sent = 0
+        while True:
+            due = began + sent * frame_seconds
+            if due >= deadline:
+                return
+            wait = due - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            lateness = time.monotonic() - due
+            stats.send_lateness.append(max(0.0, lateness))
+            if lateness > frame_seconds:
+                stats.late_frames += 1
+            offset = (sent * frame_bytes) % len(pcm)
+            await websocket.send(pcm[offset:offset + frame_bytes])
+            stats.sent_bytes += frame_bytes
+            stats.sent_frames += 1
+            sent += 1
+
+    async def play_speaker(self, websocket, deadline, stats):
+        """Receive speaker audio, answer pings and report queue depth like the firmware"""
+        speaker = SimulatedSpeaker(stats)
+        last_report = 0.0
+        report_pending = False
+        while True:
+            now = time.monotonic()
+            if now >= deadline:
+                return
+            try:
+                message = await asyncio.wait_for(websocket.recv(),
+                                                 timeout=min(BUFFER_REPORT_INTERVAL, deadline - now))
+            except asyncio.TimeoutError:
+                message = None
+            now = time.monotonic()
+            if isinstance(message, bytes):
+                speaker.receive(len(message), now)
+            elif message is not None and message.startswith("ping"):
+                stats.server_pings += 1
+                await websocket.send("pong")
+            if (isinstance(message, bytes) or report_pending) and now - last_report >= BUFFER_REPORT_INTERVAL:
+                queued = int(speaker.queued(now))
+                await websocket.send(f"buffer:{queued}")
+                stats.buffer_reports += 1
+                last_report = now
+                report_pending = queued > 0
+
+    async def soak_device(self, index, seconds, level, source_ip=None):
+        """One simulated device: a speaker socket and a mic socket for the whole soak
+
+        The server tells devices apart by remote IP, so devices sharing a
+        source address look like one parrot to it (admission, per-device
+        gates and telemetry); give each its own source_ip to avoid that.
+        """
+        stats = SoakStats(self.host, index, source_ip)
+        deadline = time.monotonic() + seconds
+        await asyncio.gather(
+            self.keep_connected('audio', stats, deadline,
+                                lambda ws, end: self.play_speaker(ws, end, stats)),
+            self.keep_connected('microphone', stats, deadline,
+                                lambda ws, end: self.stream_microphone(ws, end, stats, level))
+        )
+        return stats
+
+
+def print_probe_summary(results):
+    print("\n" + "=" * 96)
+    print("📊 CONNECTIVITY SUMMARY (ms, p50/p90/p99)")
+    print("=" * 96)
+    print(f"{'HOST':22} {'SERVICE':11} {'OK':>7}   {'handshake':^28}   {'round trip':^28}")
+    for result in results:
+        status = "✅" if result.ok else "❌"
+        print(f"{result.host[:22]:22} {result.service.upper():11} "
+              f"{len(result.handshakes):3d}/{result.attempts:<3d} {format_ms(result.handshakes)}   "
+              f"{format_ms(result.round_trips)} {status}")
+        for reason, count in sorted(result.failures.items()):
+            print(f"{'':34}↳ {count} × {reason}")
+
+    online = sum(result.ok for result in results)
+    print(f"\nOverall: {online}/{len(results)} services accessible")
+    if online == len(results):
+        print("🎉 All services are online! ESP32 should be able to connect.")
+    elif online > 0:
+        print("⚠️  Some services are offline. Check server logs and port configuration.")
+    else:
+        print("🚨 No services accessible. Check server deployment and network connectivity.")
+
+
+def print_soak_summary(all_stats, seconds):
+    print("\n" + "=" * 96)
+    print(f"📊 SOAK SUMMARY ({seconds:.0f}s per device)")
+    print("=" * 96)
+    for stats in all_stats:
+        # Rates over the time each socket was up, so a reconnect doesn't read as a slow link
+        up_kbps = stats.sent_bytes * 8 / max(seconds - stats.downtime['microphone'], 1e-3) / 1000
+        down_kbps = stats.received_bytes * 8 / max(seconds - stats.downtime['audio'], 1e-3) / 1000
+        lateness = percentiles(stats.send_lateness, (50, 99)) or [0.0, 0.0]
+        print(f"{stats.host} device {stats.index}" + (f" from {stats.source_ip}:" if stats.source_ip else ":"))
+        print(f"   🎤 up   {up_kbps:7.1f} kbit/s ({RATE * 16 / 1000:.0f} nominal), {stats.sent_frames} frames, "
+              f"send lateness p50 {lateness[0]:.1f} ms p99 {lateness[1]:.1f} ms, {stats.late_frames} a frame late")
+        print(f"   🔊 down {down_kbps:7.1f} kbit/s, {stats.received_chunks} chunks in {stats.replies} replies, "
+              f"jitter {stats.jitter * 1000:.1f} ms (max {stats.max_jitter * 1000:.1f}), "
+              f"starved {stats.starved * 1000:.0f} ms, {stats.buffer_reports} buffer reports, "
+              f"{stats.server_pings} server pings")
+        print(f"   📡 round trip p50/p90/p99 {format_ms(stats.round_trips).strip()} ms, reconnects "
+              f"audio {stats.reconnects['audio']} mic {stats.reconnects['microphone']}, downtime "
+              f"{stats.downtime['audio']:.1f}s / {stats.downtime['microphone']:.1f}s")
+        for reason, count in sorted(stats.failures.items()):
+            print(f"      ↳ {count} × {reason}")
+
+
+def soak_passed(all_stats, max_reconnects):
+    return all(all(stats.connects.values()) and sum(stats.reconnects.values()) <= max_reconnects
+               for stats in all_stats)
+
 
 def main():
     parser = argparse.ArgumentParser(description='Test Parrot Server connectivity')
-    parser.add_argument('host', help='Server hostname or IP address')
+    parser.add_argument('hosts', nargs='+', help='Server hostnames or IP addresses')
     parser.add_argument('--ssl', action='store_true', help='Use WSS (secure WebSocket) connections')
-    parser.add_argument('--service', choices=['control', 'audio', 'microphone'], 
-                       help='Test specific service only')
-    
+    parser.add_argument('--service', choices=['control', 'audio', 'microphone'], action='append',
+                       help='Test specific service only (repeatable)')
+    parser.add_argument('--connections', type=int, default=1,
+                        help='Simultaneous connections per service per host')
+    parser.add_argument('--pings', type=int, default=5, help='Round trips measured per connection')
+    parser.add_argument('--concurrency', type=int, default=0,
+                        help='Cap on connections being probed at once (0: no cap)')
+    parser.add_argument('--timeout', type=float, default=5.0, help='Handshake and ping timeout in seconds')
+    parser.add_argument('--soak', type=float, default=0.0, metavar='SECONDS',
+                        help='Stream audio both ways for this long instead of probing')
+    parser.add_argument('--devices', type=int, default=1,
+                        help='Simulated devices per host when soaking. The server identifies devices by IP, '
+                             'so without --source-ip they all count as one parrot')
+    parser.add_argument('--source-ip', action='append', default=[],
+                        help='Local address to connect from (repeatable); simulated devices take them in turn. '
+                             'For a server on this machine, 127.0.0.2, 127.0.0.3, ... work on Linux')
+    parser.add_argument('--level', type=float, default=300.0,
+                        help='RMS of the synthetic mic signal (the server treats >1000 as voice)')
+    parser.add_argument('--max-reconnects', type=int, default=0,
+                        help='Reconnects per device tolerated before a soak fails')
+
     args = parser.parse_args()
-    
-    tester = ConnectivityTester(args.host, args.ssl)
-    
+
+    testers = [ConnectivityTester(host, args.ssl, args.timeout) for host in args.hosts]
+    services = args.service or ['control', 'audio', 'microphone']
+
     async def run_tests():
-        if args.service:
-            success = await tester.test_connection(args.service)
-            sys.exit(0 if success else 1)
-        else:
-            success = await tester.test_all()
-            sys.exit(0 if success else 1)
-    
+        if args.soak > 0:
+            print(f"🔍 Soaking {len(testers)} host(s) with {args.devices} simulated device(s) each "
+                  f"for {args.soak:.0f}s")
+            if args.devices > max(1, len(args.source_ip)):
+                print(f"⚠️  {args.devices} devices share {len(args.source_ip) or 'one'} source address(es); "
+                      f"the server will see fewer parrots than that")
+            sources = args.source_ip or [None]
+            all_stats = await asyncio.gather(*(tester.soak_device(index, args.soak, args.level,
+                                                                  sources[index % len(sources)])
+                                               for tester in testers for index in range(args.devices)))
+            print_soak_summary(all_stats, args.soak)
+            return soak_passed(all_stats, args.max_reconnects)
+
+        print(f"🔍 Testing connectivity to Parrot Server at {', '.join(args.hosts)}")
+        limit = asyncio.Semaphore(args.concurrency) if args.concurrency > 0 else None
+        results = await asyncio.gather(*(tester.test_all(services, args.connections, args.pings, limit)
+                                         for tester in testers))
+        results = [result for per_host in results for result in per_host]
+        print_probe_summary(results)
+        return all(result.ok for result in results)
+
     try:
-        asyncio.run(run_tests())
+        success = asyncio.run(run_tests())
+        sys.exit(0 if success else 1)
     except KeyboardInterrupt:
         print("\n\n⏹️  Test cancelled by user")
         sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,130 @@
+"""Local end-of-turn detection, so replies don't wait out the server's fixed silence window"""
+
+from collections import deque
+from typing import Optional
+
+import numpy as np
+
+# Events returned by TurnDetector.process()
+COMMIT = "commit"    # The speaker has finished: commit the buffer and ask for a reply
+CUT_OFF = "cut_off"  # Speech resumed right after a commit: that commit was premature
+
+
+class TurnDetector:
+    """Decides end-of-turn for one device from its mic frames
+
+    Silence after speech is committed once it outlasts a learned threshold:
+    a quantile of the pauses this device's speaker makes mid-turn (higher
+    aggressiveness picks a lower quantile). If the energy was already falling
+    into the silence, as it does at the end of a sentence rather than at a
+    breath, the threshold is shortened further. The threshold never exceeds
+    the server VAD's silence window, so this is never slower than server turn
+    detection. Speech that resumes shortly after a commit marks it premature,
+    and that pause joins the distribution, which raises the threshold.
+    """
+
+    def __init__(self, aggressiveness: float = 0.3, min_silence_ms: float = 200.0,
+                 max_silence_ms: float = 650.0, premature_window_ms: float = 1200.0,
+                 falling_db_per_s: float = -25.0, history: int = 200):
+        self.aggressiveness = min(1.0, max(0.0, aggressiveness))
+        self.min_silence_ms = min_silence_ms
+        self.max_silence_ms = max_silence_ms  # The server VAD's silence_duration_ms
+        self.premature_window_ms = premature_window_ms
+        self.falling_db_per_s = falling_db_per_s
+
+        # Mid-turn pause lengths (ms), seeded with typical conversational pauses
+        self.pauses = deque([250.0, 320.0, 400.0, 480.0, 560.0], maxlen=history)
+        self.levels = deque(maxlen=8)  # (ms, dB) of recent voiced frames, for the energy slope
+
+        self.in_speech = False
+        self.silence_ms = 0.0
+        self.elapsed_ms = 0.0
+        self.committed_at: Optional[float] = None  # elapsed_ms of the last commit, while it can still be judged
+        self.commit_silence_ms = 0.0
+        self.commit_sent = False  # Whether the last COMMIT actually went upstream
+
+        # Metrics
+        self.commits = 0
+        self.cut_offs = 0
+        self.saved_ms = 0.0
+
+    def threshold_ms(self, falling: bool = False) -> float:
+        quantile = 0.98 - 0.18 * self.aggressiveness
+        threshold = float(np.quantile(np.fromiter(self.pauses, dtype=float), quantile))
+        if falling:
+            threshold *= 0.6 - 0.2 * self.aggressiveness
+        return min(self.max_silence_ms, max(self.min_silence_ms, threshold))
+
+    def _falling(self) -> bool:
+        """Whether the level was dropping over the last voiced frames"""
+        if len(self.levels) < 4:
+            return False
+        times, levels = np.array(self.levels).T
+        slope = np.polyfit(times / 1000.0, levels, 1)[0]  # dB per second
+        return slope < self.falling_db_per_s
+
+    def process(self, voiced: bool, level: float, frame_ms: float) -> Optional[str]:
+        """Feed one mic frame; returns COMMIT, CUT_OFF or None"""
+        self.elapsed_ms += frame_ms
+        if voiced:
+            event = None
+            if self.committed_at is not None:
+                # Talking again right after a commit: we cut them off
+                if self.commit_sent:
+                    self.cut_offs += 1
+                    self.saved_ms -= self.max_silence_ms - self.commit_silence_ms
+                self.pauses.append(self.silence_ms)
+                self.committed_at = None
+                event = CUT_OFF
+            elif self.in_speech and self.silence_ms > 0:
+                self.pauses.append(self.silence_ms)  # A mid-turn pause
+            self.in_speech = True
+            self.silence_ms = 0.0
+            self.levels.append((self.elapsed_ms, 20 * np.log10(max(level, 1.0))))
+            return event
+
+        if self.committed_at is not None:
+            if self.elapsed_ms - self.committed_at > self.premature_window_ms:
+                self.committed_at = None  # The commit stood
+            else:
+                self.silence_ms += frame_ms  # Still the same pause, if speech comes back
+            return None
+        if not self.in_speech:
+            return None
+        self.silence_ms += frame_ms
+        if self.silence_ms >= self.threshold_ms(self._falling()):
+            self.in_speech = False
+            self.levels.clear()
+            self.commit_silence_ms = self.silence_ms
+            self.commit_sent = False
+            self.committed_at = self.elapsed_ms
+            return COMMIT
+        return None
+
+    def on_commit_sent(self):
+        """The last COMMIT went upstream (it can be held or dropped); only these count in the stats"""
+        self.commit_sent = True
+        self.commits += 1
+        self.saved_ms += self.max_silence_ms - self.commit_silence_ms
+
+    def on_reply(self):
+        """The reply has started playing; speech from here on is a new turn or a barge-in"""
+        self.committed_at = None
+
+    def on_disconnect(self):
+        """The mic stream stopped; a turn left open must not hold up other devices' commits"""
+        self.in_speech = False
+        self.silence_ms = 0.0
+        self.levels.clear()
+        self.committed_at = None
+
+    def stats(self) -> dict:
+        return {
+            "commits": self.commits,
+            "premature_cut_offs": self.cut_offs,
+            "cut_off_rate": self.cut_offs / self.commits if self.commits else 0.0,
+            "latency_saved_ms_total": round(self.saved_ms, 1),
+            "latency_saved_ms_per_turn": round(self.saved_ms / self.commits, 1) if self.commits else 0.0,
+            "threshold_ms": round(self.threshold_ms(), 1),
+            "pauses_learned": len(self.pauses)
+        }
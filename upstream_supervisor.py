@@ -0,0 +1,185 @@
+"""Supervised upstream connection with jittered exponential backoff"""
+
+import asyncio
+import random
+from typing import Callable, Optional
+
+from clock import SystemClock
+
+# Connection health states
+IDLE = "idle"              # No devices connected, upstream intentionally closed
+CONNECTING = "connecting"  # Connect attempt in progress
+HEALTHY = "healthy"        # Session open and configured
+BACKOFF = "backoff"        # Last attempt failed, waiting before retrying
+
+
+class Backoff:
+    """Exponential backoff with full jitter"""
+
+    def __init__(self, base: float = 0.5, cap: float = 30.0, factor: float = 2.0,
+                 rng: Optional[random.Random] = None):
+        self.base = base
+        self.cap = cap
+        self.factor = factor
+        self.rng = rng or random.Random()
+        self.attempt = 0
+
+    def next_delay(self) -> float:
+        """Delay before the next attempt; grows until reset()"""
+        ceiling = min(self.cap, self.base * (self.factor ** self.attempt))
+        self.attempt += 1
+        return self.rng.uniform(0, ceiling)
+
+    def reset(self):
+        self.attempt = 0
+
+
+class UpstreamSupervisor:
+    """Keeps the upstream session open for as long as it is wanted
+
+    A single task owns connect/disconnect. Anything that notices the device
+    set changing or the socket dying calls notify() or connection_lost(), and
+    the supervisor reconnects with backoff until the session is healthy again.
+    The proxy replays its conversation log on connect, so a recovered session
+    picks up where the old one left off. Backoff only resets once a session
+    has stayed up for stable_after seconds; one that dies sooner counts as a
+    failed attempt, so a server that accepts and then drops us isn't hammered.
+    """
+
+    def __init__(self, proxy, wanted: Callable[[], bool], backoff: Optional[Backoff] = None,
+                 stable_after: float = 10.0, clock: Optional[SystemClock] = None):
+        self.proxy = proxy
+        self.clock = clock or SystemClock()
+        self.wanted = wanted  # Whether an upstream session should be open right now
+        self.backoff = backoff or Backoff()
+        self.stable_after = stable_after
+        self.health = IDLE
+        self.last_error: Optional[str] = None
+        self.failures = 0  # Consecutive failed attempts
+        self.reconnects = 0  # Sessions re-established after a loss
+        self.healthy_since: Optional[float] = None
+        self._lost = False
+        self._short_lived: Optional[float] = None  # Age of a lost session that never became stable
+        self._wake = asyncio.Event()
+        self._connected = asyncio.Event()
+
+    def _set_health(self, health: str):
+        if health != self.health:
+            print(f"Upstream connection: {self.health} -> {health}")
+            self.health = health
+        if health == HEALTHY:
+            self.healthy_since = self.clock.time()
+            self._connected.set()
+        else:
+            self.healthy_since = None
+            self._connected.clear()
+
+    def notify(self):
+        """Re-evaluate whether the upstream session should be open"""
+        self._wake.set()
+
+    def connection_lost(self, error: Exception):
+        """Called when a send or receive on the upstream socket fails"""
+        ws = self.proxy.ws
+        if ws is None:
+            return
+        self.proxy.ws = None
+        self.last_error = str(error)
+        self._lost = True
+        lived = self.clock.time() - self.healthy_since if self.healthy_since else 0.0
+        if lived >= self.stable_after:
+            self.backoff.reset()
+        else:
+            self._short_lived = lived
+        self._set_health(BACKOFF)
+        asyncio.create_task(self._close_quietly(ws))
+        self.notify()
+
+    async def wait_connected(self, timeout: Optional[float] = None) -> bool:
+        """Wait until the session is healthy"""
+        try:
+            await asyncio.wait_for(self._connected.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    @staticmethod
+    async def _close_quietly(ws):
+        try:
+            await ws.close()
+        except Exception:
+            pass
+
+    async def _connect(self) -> bool:
+        self._set_health(CONNECTING)
+        try:
+            await self.proxy.connect()
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e)
+            if self.proxy.ws is not None:
+                ws, self.proxy.ws = self.proxy.ws, None
+                await self._close_quietly(ws)
+            self._set_health(BACKOFF)
+            return False
+
+        if self._lost:
+            self.reconnects += 1
+            self._lost = False
+        self.failures = 0
+        self._set_health(HEALTHY)
+        return True
+
+    async def run(self):
+        """Supervise the upstream connection until cancelled"""
+        while True:
+            try:
+                await self._step()
+            except Exception as e:
+                # An unexpected error must not end supervision; back off and re-evaluate
+                self.last_error = str(e)
+                delay = self.backoff.next_delay()
+                print(f"Upstream supervisor error ({e}), retrying in {delay:.1f}s")
+                await self.clock.sleep(delay)
+
+    async def _step(self):
+        """One pass: open or close the session as wanted, then wait for something to change"""
+        self._wake.clear()
+        wanted = self.wanted()
+
+        if wanted and self.proxy.ws is None:
+            if self._short_lived is not None:
+                delay = self.backoff.next_delay()
+                print(f"Upstream session dropped after {self._short_lived:.1f}s, reconnecting in {delay:.1f}s")
+                self._short_lived = None
+                await self.clock.sleep(delay)
+                return
+            if not await self._connect():
+                delay = self.backoff.next_delay()
+                print(f"Upstream connect failed ({self.last_error}), retrying in {delay:.1f}s")
+                try:
+                    # A device change can cut the wait short
+                    await asyncio.wait_for(self._wake.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                return
+        elif not wanted and self.proxy.ws is not None:
+            await self.proxy.disconnect()
+            self._lost = False
+            self.backoff.reset()
+            self._set_health(IDLE)
+        elif not wanted:
+            self._set_health(IDLE)
+
+        await self._wake.wait()
+
+    def status(self) -> dict:
+        """Snapshot of connection health for logging and health checks"""
+        return {
+            "health": self.health,
+            "failures": self.failures,
+            "reconnects": self.reconnects,
+            "last_error": self.last_error,
+            "healthy_for": self.clock.time() - self.healthy_since if self.healthy_since else 0.0,
+            "conversation_items": len(self.proxy.conversation)
+        }
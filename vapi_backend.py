@@ -1,12 +1,14 @@
 """VAPI.ai backend implementation"""
 
 import asyncio
+import time
 import websockets
 import json
 import base64
 import aiohttp
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 from voice_backend import VoiceBackend
+from cassette import wrap_for_recording
 
 
 class VAPIBackend(VoiceBackend):
@@ -18,21 +20,66 @@ class VAPIBackend(VoiceBackend):
         self.api_key = config.get('api_key')
         self.assistant_id = config.get('assistant_id')
         self.public_key = config.get('public_key')
-        self.base_url = "https://api.vapi.ai"
+        self.base_url = config.get('base_url') or "https://api.vapi.ai"
         self.call_id = None
         self.ws_url = None
+        
+        # One keepalive HTTP session for every API call (DNS/TCP/TLS paid once)
+        self._http: Optional[aiohttp.ClientSession] = None
+        
+        # Optionally keep a call created ahead of time so connect() only opens the socket
+        self.precreate_call = config.get('precreate_call', False)
+        self.precreated_call_ttl = config.get('precreated_call_ttl', 60.0)
+        self._spare_call: Optional[asyncio.Task] = None  # Resolves to (call_id, ws_url, created_at)
+        
+        self._receiver: Optional[asyncio.Task] = None
+        self._background = set()  # Call teardown that nothing waits on
+    
+    def _get_http(self) -> aiohttp.ClientSession:
+        if self._http is None or self._http.closed:
+            self._http = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=8, keepalive_timeout=120, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=15)
+            )
+        return self._http
+    
+    def prepare(self):
+        """Start creating a spare call in the background (no-op unless precreate_call)"""
+        if self.precreate_call and (self._spare_call is None or self._spare_call.cancelled()):
+            self._spare_call = asyncio.create_task(self._request_call())
+    
+    async def _take_call(self) -> Optional[Tuple[str, str]]:
+        """A fresh pre-created call if one is ready or in flight, else a new one"""
+        spare, self._spare_call = self._spare_call, None
+        if spare is not None:
+            try:
+                created = await spare
+            except Exception:
+                created = None
+            if created and time.monotonic() - created[2] < self.precreated_call_ttl:
+                return created[0], created[1]
+            if created:
+                self._end_call_later(created[0])  # Too old to trust; don't leak it
+        created = await self._request_call()
+        return (created[0], created[1]) if created else None
     
     async def connect(self):
         """Connect to VAPI service"""
-        # Create a call first to get WebSocket URL
-        await self._create_call()
-        
-        if self.ws_url:
-            self.ws = await websockets.connect(self.ws_url)
-            self.is_connected = True
-            
-            # Start receiving messages
-            asyncio.create_task(self._receive_messages())
+        # Create (or take a pre-created) call to get the WebSocket URL
+        call = await self._take_call()
+        if call is None:
+            return
+        self.call_id, self.ws_url = call
+        
+        ws = await websockets.connect(self.ws_url)
+        self.ws = wrap_for_recording(ws, self.config.get('record_dir'), "vapi", self.ws_url)
+        self.is_connected = True
+        
+        # Start receiving messages
+        self._receiver = asyncio.create_task(self._receive_messages())
+        
+        # Get the next call ready while this one is in use
+        self.prepare()
     
     async def disconnect(self):
         """Disconnect from VAPI"""
@@ -40,9 +87,37 @@ class VAPIBackend(VoiceBackend):
             await self.ws.close()
             self.is_connected = False
         
-        # End the call if active
+        # Stop this session's receiver so reconnects don't pile up tasks
+        receiver, self._receiver = self._receiver, None
+        if receiver is not None and receiver is not asyncio.current_task():
+            receiver.cancel()
+            try:
+                await receiver
+            except (asyncio.CancelledError, Exception):
+                pass
+        
+        # End the call without holding up a reconnect
         if self.call_id:
-            await self._end_call()
+            self._end_call_later(self.call_id)
+            self.call_id = None
+    
+    async def close(self):
+        """Disconnect, end any spare call and release the HTTP session"""
+        await self.disconnect()
+        if self._spare_call is not None:
+            spare, self._spare_call = self._spare_call, None
+            spare.cancel()
+            try:
+                created = await spare
+                if created:
+                    self._end_call_later(created[0])
+            except (asyncio.CancelledError, Exception):
+                pass
+        if self._background:
+            await asyncio.gather(*self._background, return_exceptions=True)
+        if self._http is not None:
+            await self._http.close()
+            self._http = None
     
     async def start_session(self):
         """Initialize VAPI session"""
@@ -62,7 +137,8 @@ class VAPIBackend(VoiceBackend):
     async def end_session(self):
         """End VAPI session"""
         if self.call_id:
-            await self._end_call()
+            self._end_call_later(self.call_id)
+            self.call_id = None
     
     async def send_audio(self, audio_data: bytes):
         """Send audio to VAPI"""
@@ -84,8 +160,8 @@ class VAPIBackend(VoiceBackend):
         
         await self.ws.send(json.dumps(message))
     
-    async def _create_call(self):
-        """Create a VAPI call to get WebSocket URL"""
+    async def _request_call(self) -> Optional[Tuple[str, str, float]]:
+        """Create a VAPI call; returns (call_id, websocket_url, created_at) or None"""
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
@@ -102,37 +178,42 @@ class VAPIBackend(VoiceBackend):
         if 'assistant_config' in self.config:
             payload['assistant_overrides'] = self.config['assistant_config']
         
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                f"{self.base_url}/call",
-                headers=headers,
-                json=payload
-            ) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    self.call_id = data.get('id')
-                    self.ws_url = data.get('websocket_url')
-                else:
-                    error = await response.text()
-                    if self.on_error_callback:
-                        await self.on_error_callback(f"Failed to create call: {error}")
+        async with self._get_http().post(
+            f"{self.base_url}/call",
+            headers=headers,
+            json=payload
+        ) as response:
+            if response.status == 200:
+                data = await response.json()
+                if data.get('websocket_url'):
+                    return data.get('id'), data.get('websocket_url'), time.monotonic()
+                return None
+            else:
+                error = await response.text()
+                if self.on_error_callback:
+                    await self.on_error_callback(f"Failed to create call: {error}")
+                return None
     
-    async def _end_call(self):
-        """End the VAPI call"""
-        if not self.call_id:
-            return
-        
+    def _end_call_later(self, call_id: str):
+        """End a call in the background"""
+        task = asyncio.create_task(self._end_call(call_id))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+    
+    async def _end_call(self, call_id: str):
+        """End a VAPI call"""
         headers = {
             "Authorization": f"Bearer {self.api_key}"
         }
         
-        async with aiohttp.ClientSession() as session:
-            await session.delete(
-                f"{self.base_url}/call/{self.call_id}",
+        try:
+            async with self._get_http().delete(
+                f"{self.base_url}/call/{call_id}",
                 headers=headers
-            )
-        
-        self.call_id = None
+            ) as response:
+                await response.read()
+        except Exception as e:
+            print(f"Error ending VAPI call {call_id}: {e}")
     
     async def _receive_messages(self):
         """Receive and process messages from VAPI"""
@@ -26,6 +26,10 @@ class VoiceBackend(ABC):
         """Close connection to the voice service"""
         pass
     
+    async def close(self):
+        """Disconnect and release any pooled resources"""
+        await self.disconnect()
+    
     @abstractmethod
     async def send_audio(self, audio_data: bytes):
         """Send audio data to the voice service"""